@@ -0,0 +1,78 @@
+'''
+compare the training time and the disk writes of the best model export
+schedules: an export at each better model, at most one export per interval,
+and one deferred export at the end of the training
+
+e.g.: python scripts/benchmark_best_export.py cfg/staffing_agent_tf.json
+'''
+import os
+import copy
+import time
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.classifiers import TFClassifier
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the best export schedules')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--min_interval_secs',
+                        help='interval of the rate limited schedule',
+                        type=int, default=60)
+    return parser.parse_args()
+
+
+def _count_exports(model_path):
+    export_dir = os.path.join(model_path, 'export', 'best_exporter')
+    if not os.path.isdir(export_dir):
+        return 0
+    return len(os.listdir(export_dir))
+
+
+def _benchmark(config):
+    classifier = TFClassifier(config)
+    classifier.load_embedding()
+    classifier.build_graph()
+    # load the data sets before measuring
+    classifier.load_data_set(config['datasets']['train'])
+    classifier.load_data_set(config['datasets']['eval'])
+    written = BenchmarkHelper.written_bytes()
+    start = time.time()
+    classifier.train()
+    train_time = time.time() - start
+    if written is not None:
+        written = BenchmarkHelper.written_bytes() - written
+    return train_time, written, _count_exports(config['model_path'])
+
+
+def main():
+    args = get_args()
+    base_config = load_config(args.config)
+    schedules = {
+        'every_better': {'deferred': False, 'min_interval_secs': 0},
+        'rate_limited': {'deferred': False,
+                         'min_interval_secs': args.min_interval_secs},
+        'deferred': {'deferred': True}
+    }
+    print("{:<14}\t{:>10}\t{:>12}\t{:>8}".format(
+        'schedule', 'train(s)', 'written(MB)', 'exports'))
+    for name, schedule in schedules.items():
+        config = copy.deepcopy(base_config)
+        config['model_path'] = tempfile.mkdtemp()
+        config['best_export'] = schedule
+        try:
+            train_time, written, exports = _benchmark(config)
+        finally:
+            shutil.rmtree(config['model_path'])
+        print("{:<14}\t{:>10.1f}\t{:>12}\t{:>8}".format(
+            name, train_time,
+            'n/a' if written is None else '{:.1f}'.format(written / 2 ** 20),
+            exports))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+'''
+compare training step time and prediction throughput, with and without
+length bucketing, for each tensorflow architecture
+
+e.g.: python scripts/benchmark_bucketing.py cfg/staffing_agent_tf.json
+'''
+import copy
+import time
+import shutil
+import tempfile
+import functools
+from argparse import ArgumentParser
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.classifiers import TFClassifier
+
+ARCHITECTURES = ['tf_cnn_simple', 'tf_lstm_simple', 'tf_lstm_multi']
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark length bucketing')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--steps', help='number of training steps',
+                        type=int, default=200)
+    parser.add_argument('--token_budget', help='tokens per bucketed batch',
+                        type=int)
+    parser.add_argument('--architectures', help='comma separated model types',
+                        type=str, default=','.join(ARCHITECTURES))
+    return parser.parse_args()
+
+
+def _benchmark(config, steps):
+    classifier = TFClassifier(config)
+    classifier.load_embedding()
+    classifier.build_graph()
+    train_path = config['datasets']['train']
+    eval_path = config['datasets']['eval']
+    # load the data sets before timing
+    classifier.load_data_set(train_path)
+    _, labels, _ = classifier.load_data_set(eval_path)
+
+    # the first steps include graph construction and warm up
+    classifier.classifier.train(
+        input_fn=functools.partial(classifier.input_fn, train_path,
+                                   shuffle_and_repeat=True),
+        steps=10)
+    start = time.time()
+    classifier.classifier.train(
+        input_fn=functools.partial(classifier.input_fn, train_path,
+                                   shuffle_and_repeat=True),
+        steps=steps)
+    step_time = (time.time() - start) / steps
+
+    start = time.time()
+    nr_predicted = sum(1 for _ in classifier.classifier.predict(
+        input_fn=functools.partial(classifier.input_fn, eval_path,
+                                   bucketing=True)))
+    throughput = nr_predicted / (time.time() - start)
+    return step_time, throughput
+
+
+def main():
+    args = get_args()
+    base_config = load_config(args.config)
+    print("{:<16}\t{:>10}\t{:>10}\t{:>10}\t{:>10}\t{:>8}\t{:>8}".format(
+        'model_type', 'step(ms)', 'step_b(ms)', 'docs/s', 'docs/s_b',
+        'step_x', 'docs_x'))
+    for model_type in args.architectures.split(','):
+        results = []
+        for bucketing in [False, True]:
+            config = copy.deepcopy(base_config)
+            config['model_type'] = model_type
+            config['model_path'] = tempfile.mkdtemp()
+            config['bucketing'] = {'enabled': bucketing,
+                                   'token_budget': args.token_budget}
+            try:
+                results.append(_benchmark(config, args.steps))
+            finally:
+                shutil.rmtree(config['model_path'])
+        (step_time, throughput), (b_step_time, b_throughput) = results
+        print("{:<16}\t{:>10.1f}\t{:>10.1f}\t{:>10.1f}\t{:>10.1f}"
+              "\t{:>8.2f}\t{:>8.2f}".format(
+                  model_type, step_time * 1000, b_step_time * 1000,
+                  throughput, b_throughput,
+                  step_time / b_step_time, b_throughput / throughput))
+
+
+if __name__ == '__main__':
+    main()
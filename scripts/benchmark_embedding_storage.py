@@ -0,0 +1,81 @@
+'''
+compare the graph build time, the checkpoint size and the saved model size,
+with the frozen embedding in the checkpoints (as before), or in a file of the
+model bundle
+
+e.g.: python scripts/benchmark_embedding_storage.py cfg/staffing_agent_tf.json
+'''
+import os
+import copy
+import glob
+import time
+import shutil
+import tempfile
+import functools
+from argparse import ArgumentParser
+import tensorflow as tf
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.classifiers import TFClassifier
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
+
+STORAGES = ['checkpoint', 'file']
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the embedding storage')
+    parser.add_argument('config', help='config file', type=str)
+    return parser.parse_args()
+
+
+def _file_size(pattern):
+    return sum(os.path.getsize(path) for path in glob.glob(pattern))
+
+
+def _benchmark(config):
+    classifier = TFClassifier(config)
+    classifier.load_embedding()
+    classifier.build_graph()
+    train_path = config['datasets']['train']
+    classifier.load_data_set(train_path)
+
+    start = time.time()
+    with tf.Graph().as_default():
+        features, labels = classifier.input_fn(train_path)
+        classifier.model_fn(features, labels, tf.estimator.ModeKeys.TRAIN,
+                            {})
+    build_time = time.time() - start
+
+    # one step, and the checkpoint of the step
+    classifier.classifier.train(
+        input_fn=functools.partial(classifier.input_fn, train_path),
+        steps=1)
+    checkpoint_size = _file_size(
+        os.path.join(config['model_path'], 'model.ckpt-1.*'))
+    export_dir = classifier.classifier.export_saved_model(
+        os.path.join(config['model_path'], 'export', 'benchmark'),
+        classifier.serving_input_receiver_fn)
+    export_size = BenchmarkHelper.folder_size(export_dir.decode('utf-8'))
+    return build_time, checkpoint_size, export_size
+
+
+def main():
+    args = get_args()
+    base_config = load_config(args.config)
+    print("{:<12}\t{:>10}\t{:>16}\t{:>16}".format(
+        'storage', 'build(s)', 'checkpoint(MB)', 'saved_model(MB)'))
+    for storage in STORAGES:
+        config = copy.deepcopy(base_config)
+        config['model_path'] = tempfile.mkdtemp()
+        config['embedding']['storage'] = storage
+        try:
+            build_time, checkpoint_size, export_size = _benchmark(config)
+        finally:
+            shutil.rmtree(config['model_path'])
+        print("{:<12}\t{:>10.2f}\t{:>16.1f}\t{:>16.1f}".format(
+            storage, build_time, checkpoint_size / 2 ** 20,
+            export_size / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+'''
+compare the throughput and the accuracy of the fast bag of n-grams model
+(tf_fast_bow) with tf_cnn_simple, trained on the same data sets
+
+the models are trained in --model_dir/<model_type>, an already trained model
+(with a best export) is reused; the throughput is measured per core, with one
+intra op thread
+
+e.g.: python scripts/benchmark_fast_bow.py cfg/staffing_agent_tf.json \
+          --model_dir models/fast_bow_benchmark
+'''
+import os
+import copy
+import glob
+from argparse import ArgumentParser
+from tk_nn_classifier.model import Model
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.data_loader import DataReader
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
+
+MODEL_TYPES = ['tf_cnn_simple', 'tf_fast_bow']
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the fast bow model')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--model_dir', help='folder of the trained models',
+                        type=str, default='models/fast_bow_benchmark')
+    parser.add_argument('--batch_size', help='documents per prediction',
+                        type=int, default=128)
+    parser.add_argument('--nr_batches', help='number of timed batches',
+                        type=int, default=50)
+    parser.add_argument('--model_types', help='comma separated model types',
+                        type=str, default=','.join(MODEL_TYPES))
+    return parser.parse_args()
+
+
+def _train(config):
+    if glob.glob(os.path.join(config['model_path'], 'export',
+                              'best_exporter', '*')):
+        return
+    config = copy.deepcopy(config)
+    config['action'] = 'train'
+    Model(config).build_and_train()
+
+
+def _load_model(config):
+    config = copy.deepcopy(config)
+    config['action'] = 'predict'
+    config['prediction_cache'] = {'enabled': False}
+    config['use_tuned_config'] = False
+    config['inference'] = {'intra_op_threads': 1, 'inter_op_threads': 1}
+    model = Model(config)
+    model.load()
+    return model
+
+
+def _accuracy(model, data_reader, records, batch_size):
+    all_probabilities = model.process_batch(
+        [text for text, *_ in records], batch_size)
+    correct = sum(
+        data_reader.label_mapper.label_name(
+            max(range(len(probabilities)),
+                key=probabilities.__getitem__)) == category
+        for (_, category, *_), probabilities
+        in zip(records, all_probabilities))
+    return correct / max(1, len(records))
+
+
+def main():
+    args = get_args()
+    base_config = load_config(args.config)
+    data_reader = DataReader(base_config)
+    test_sets = {
+        name: data_reader.get_data_set_with_detail(data_path)
+        for name, data_path in base_config['datasets']['test'].items()}
+    texts = [text for text, *_ in next(iter(test_sets.values()))]
+    batches = [texts[start:start + args.batch_size]
+               for start in range(0, len(texts), args.batch_size)]
+    batches = batches[:args.nr_batches]
+
+    print('\t'.join(['{:<14}'.format('model_type'), 'docs/s/core',
+                     'p50(ms)', 'p99(ms)'] +
+                    ['acc_' + name for name in test_sets]))
+    for model_type in args.model_types.split(','):
+        config = copy.deepcopy(base_config)
+        config['model_type'] = model_type
+        config['model_path'] = os.path.join(args.model_dir, model_type)
+        _train(config)
+        model = _load_model(config)
+        latency = BenchmarkHelper.measure_latency(
+            lambda batch: model.process_batch(batch, args.batch_size),
+            batches)
+        accuracies = [_accuracy(model, data_reader, records, args.batch_size)
+                      for records in test_sets.values()]
+        print('\t'.join(['{:<14}'.format(model_type),
+                         '{:.1f}'.format(latency['docs_per_sec']),
+                         '{:.2f}'.format(latency['p50']),
+                         '{:.2f}'.format(latency['p99'])] +
+                        ['{:.4f}'.format(accuracy)
+                         for accuracy in accuracies]))
+
+
+if __name__ == '__main__':
+    main()
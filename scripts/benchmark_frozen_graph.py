@@ -0,0 +1,77 @@
+'''
+compare the prediction latency and throughput of the saved model, and of its
+frozen graph export (tk-nn-classifier export), at several batch sizes
+
+e.g.: python scripts/benchmark_frozen_graph.py cfg/staffing_agent_tf.json \
+          --test_set eval --xla
+'''
+import copy
+from argparse import ArgumentParser
+from tk_nn_classifier.model import Model
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.data_loader import DataReader
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
+
+BATCH_SIZES = [1, 32, 128]
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the frozen graph export')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--test_set', help='name of test set in the config',
+                        type=str, default='eval')
+    parser.add_argument('--batch_sizes', help='comma separated batch sizes',
+                        type=str, default=','.join(map(str, BATCH_SIZES)))
+    parser.add_argument('--nr_batches', help='number of batches per run',
+                        type=int, default=50)
+    parser.add_argument('--xla', help='serve the frozen graph with XLA JIT',
+                        action='store_true')
+    return parser.parse_args()
+
+
+def _load_model(base_config, inference_graph):
+    config = copy.deepcopy(base_config)
+    config['action'] = 'predict'
+    config['inference_graph'] = inference_graph
+    # every batch needs to be predicted
+    config['prediction_cache'] = {'enabled': False}
+    model = Model(config)
+    model.load()
+    return model
+
+
+def main():
+    args = get_args()
+    config = load_config(args.config)
+    texts = [text for text, *_ in DataReader(config).get_data_set_with_detail(
+        config['datasets']['test'][args.test_set])]
+    models = {
+        'saved_model': _load_model(config, 'saved_model'),
+        'frozen': _load_model(config, 'frozen')
+    }
+    if args.xla:
+        xla_model = _load_model(config, 'frozen')
+        from tk_nn_classifier.classifiers.tf_frozen_export import \
+            FrozenGraphPredictor
+        xla_model.classifier.model = FrozenGraphPredictor(
+            xla_model.classifier.loaded_model_path, xla=True)
+        models['frozen+xla'] = xla_model
+
+    print("{:<12}\t{:>6}\t{:>10}\t{:>10}\t{:>10}".format(
+        'graph', 'batch', 'p50(ms)', 'p99(ms)', 'docs/s'))
+    for batch_size in map(int, args.batch_sizes.split(',')):
+        batches = [texts[start:start + batch_size]
+                   for start in range(0, len(texts), batch_size)]
+        batches = batches[:args.nr_batches]
+        for name, model in models.items():
+            result = BenchmarkHelper.measure_latency(
+                lambda batch: model.process_batch(batch, batch_size),
+                batches)
+            print("{:<12}\t{:>6}\t{:>10.2f}\t{:>10.2f}\t{:>10.1f}".format(
+                name, batch_size, result['p50'], result['p99'],
+                result['docs_per_sec']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''
+measure the cold start time (in a fresh python process) of the cli, and of
+loading the classifier of each backend
+
+e.g.: python scripts/benchmark_import_time.py --repeat 5
+'''
+import sys
+import statistics
+import subprocess
+from argparse import ArgumentParser
+
+BACKENDS = ['spacy', 'tf', 'tf_multi_feat', 'keras']
+
+STATEMENTS = {
+    'cli --help': 'import sys; sys.argv = ["tk-nn-classifier", "--help"]\n'
+                  'from tk_nn_classifier.__main__ import main\n'
+                  'try:\n    main()\nexcept SystemExit:\n    pass',
+    'model': 'import tk_nn_classifier.model',
+}
+for backend in BACKENDS:
+    STATEMENTS['model + ' + backend] = (
+        'from tk_nn_classifier.classifiers import get_classifier_class; '
+        'get_classifier_class("{}")'.format(backend))
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{}
+print(time.perf_counter() - start)
+'''
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the import time')
+    parser.add_argument('--repeat', help='number of runs per statement',
+                        type=int, default=5)
+    return parser.parse_args()
+
+
+def cold_start_time(statement):
+    '''seconds to run the statement in a new interpreter'''
+    output = subprocess.run(
+        [sys.executable, '-c', TIMER.format(statement)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        check=True, universal_newlines=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    args = get_args()
+    print("{:<24}\t{:>10}\t{:>10}".format('import', 'median(s)', 'min(s)'))
+    for name, statement in STATEMENTS.items():
+        try:
+            times = [cold_start_time(statement) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError:
+            print("{:<24}\t{:>10}".format(name, 'failed'))
+            continue
+        print("{:<24}\t{:>10.3f}\t{:>10.3f}".format(
+            name, statistics.median(times), min(times)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+'''
+compare the preprocessing time and the memory of the data sets of the keras
+models, on the token ids and on the token vectors
+
+e.g.: python scripts/benchmark_keras_input.py cfg/staffing_agent_keras.json
+'''
+import copy
+import time
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.classifiers import KerasClassifier
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the keras input')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--data_set', help='name of the data set',
+                        type=str, default='train')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    base_config = load_config(args.config)
+    print("{:<8}\t{:>10}\t{:>12}\t{:>12}".format(
+        'input', 'load(s)', 'size(MB)', 'KB/doc'))
+    for keras_input in ['ids', 'vectors']:
+        config = copy.deepcopy(base_config)
+        config['keras'] = {'input': keras_input}
+        config['model_path'] = tempfile.mkdtemp()
+        try:
+            classifier = KerasClassifier(config)
+            classifier.load_embedding()
+            # the documents are read before timing
+            classifier.data_reader.get_data(config['datasets'][args.data_set])
+            start = time.time()
+            data, _, _ = classifier.load_data_set(
+                config['datasets'][args.data_set])
+            seconds = time.time() - start
+            print("{:<8}\t{:>10.2f}\t{:>12.1f}\t{:>12.1f}".format(
+                keras_input, seconds, data.nbytes / 2 ** 20,
+                data.nbytes / 2 ** 10 / max(1, len(data))))
+        finally:
+            shutil.rmtree(config['model_path'])
+
+
+if __name__ == '__main__':
+    main()
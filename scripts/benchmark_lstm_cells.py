@@ -0,0 +1,115 @@
+'''
+compare the training step time and the prediction latency of the lstm
+architectures, with the standard, block and fused lstm cells
+
+e.g.: python scripts/benchmark_lstm_cells.py cfg/staffing_agent_tf.json \
+          --max_sequence_lengths 512,1024
+'''
+import os
+import copy
+import time
+import shutil
+import tempfile
+import functools
+from argparse import ArgumentParser
+from tk_nn_classifier.model import Model
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.data_loader import DataReader
+from tk_nn_classifier.classifiers import TFClassifier
+from tk_nn_classifier.classifiers.graph_selector import LSTM_CELLS
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
+
+ARCHITECTURES = ['tf_lstm_simple', 'tf_lstm_multi']
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the lstm cells')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--steps', help='number of training steps',
+                        type=int, default=100)
+    parser.add_argument('--max_sequence_lengths',
+                        help='comma separated max sequence lengths',
+                        type=str, default='512,1024')
+    parser.add_argument('--batch_size', help='documents per prediction',
+                        type=int, default=32)
+    parser.add_argument('--nr_batches', help='number of predicted batches',
+                        type=int, default=50)
+    parser.add_argument('--architectures', help='comma separated model types',
+                        type=str, default=','.join(ARCHITECTURES))
+    return parser.parse_args()
+
+
+def _step_time(classifier, config, steps):
+    train_path = config['datasets']['train']
+    classifier.load_data_set(train_path)
+    # the first steps include graph construction and warm up
+    classifier.classifier.train(
+        input_fn=functools.partial(classifier.input_fn, train_path,
+                                   shuffle_and_repeat=True),
+        steps=10)
+    start = time.time()
+    classifier.classifier.train(
+        input_fn=functools.partial(classifier.input_fn, train_path,
+                                   shuffle_and_repeat=True),
+        steps=steps)
+    return (time.time() - start) / steps
+
+
+def _latency(config, batches, batch_size):
+    config = copy.deepcopy(config)
+    config['action'] = 'predict'
+    config['prediction_cache'] = {'enabled': False}
+    model = Model(config)
+    model.load()
+    return BenchmarkHelper.measure_latency(
+        lambda batch: model.process_batch(batch, batch_size), batches)
+
+
+def _benchmark(config, steps, batches, batch_size):
+    classifier = TFClassifier(config)
+    classifier.load_embedding()
+    classifier.build_graph()
+    step_time = _step_time(classifier, config, steps)
+    # the predictions use the saved model, as in production
+    classifier.classifier.export_saved_model(
+        os.path.join(config['model_path'], 'export', 'best_exporter'),
+        classifier.serving_input_receiver_fn)
+    return step_time, _latency(config, batches, batch_size)
+
+
+def main():
+    args = get_args()
+    base_config = load_config(args.config)
+    records = DataReader(base_config).get_data_set_with_detail(
+        base_config['datasets']['eval'])
+    texts = [text for text, *_ in records]
+    batches = [texts[start:start + args.batch_size]
+               for start in range(0, len(texts), args.batch_size)]
+    batches = batches[:args.nr_batches]
+
+    print("{:<16}\t{:>6}\t{:<8}\t{:>10}\t{:>10}\t{:>10}\t{:>10}".format(
+        'model_type', 'length', 'cell', 'step(ms)', 'p50(ms)', 'p99(ms)',
+        'docs/s'))
+    for model_type in args.architectures.split(','):
+        for length in map(int, args.max_sequence_lengths.split(',')):
+            for cell in LSTM_CELLS:
+                config = copy.deepcopy(base_config)
+                config['model_type'] = model_type
+                config['max_sequence_length'] = length
+                config['model_path'] = tempfile.mkdtemp()
+                config['lstm'] = dict(config['lstm'], cell=cell)
+                try:
+                    step_time, latency = _benchmark(
+                        config, args.steps, batches, args.batch_size)
+                finally:
+                    shutil.rmtree(config['model_path'])
+                print("{:<16}\t{:>6}\t{:<8}\t{:>10.1f}\t{:>10.2f}\t{:>10.2f}"
+                      "\t{:>10.1f}".format(
+                          model_type, length, cell, step_time * 1000,
+                          latency['p50'], latency['p99'],
+                          latency['docs_per_sec']))
+
+
+if __name__ == '__main__':
+    main()
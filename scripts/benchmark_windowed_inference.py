@@ -0,0 +1,94 @@
+'''
+compare the prediction latency, throughput and tokens per document of the
+saved model on the full documents, and with windowed inference at several
+thresholds, and the agreement of the windowed predictions with the full ones
+
+e.g.: python scripts/benchmark_windowed_inference.py \
+          cfg/staffing_agent_tf.json --test_set eval --window_size 128
+'''
+import copy
+from argparse import ArgumentParser
+from tk_nn_classifier.model import Model
+from tk_nn_classifier.config import load_config
+from tk_nn_classifier.data_loader import DataReader
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
+
+THRESHOLDS = [0.8, 0.9, 0.95]
+
+
+def get_args():
+    '''get arguments'''
+    parser = ArgumentParser(description='benchmark the windowed inference')
+    parser.add_argument('config', help='config file', type=str)
+    parser.add_argument('--test_set', help='name of test set in the config',
+                        type=str, default='eval')
+    parser.add_argument('--window_size', help='tokens of the first window',
+                        type=int, default=128)
+    parser.add_argument('--growth', help='growth of the next windows',
+                        type=float, default=2)
+    parser.add_argument('--thresholds', help='comma separated thresholds',
+                        type=str, default=','.join(map(str, THRESHOLDS)))
+    parser.add_argument('--batch_size', help='documents per batch',
+                        type=int, default=128)
+    return parser.parse_args()
+
+
+def _load_model(base_config, windowed_inference):
+    config = copy.deepcopy(base_config)
+    config['action'] = 'predict'
+    config['windowed_inference'] = windowed_inference
+    # every batch needs to be predicted
+    config['prediction_cache'] = {'enabled': False}
+    model = Model(config)
+    model.load()
+    return model
+
+
+def _classes(all_probabilities):
+    return [max(range(len(probabilities)), key=probabilities.__getitem__)
+            for probabilities in all_probabilities]
+
+
+def main():
+    args = get_args()
+    config = load_config(args.config)
+    texts = [text for text, *_ in DataReader(config).get_data_set_with_detail(
+        config['datasets']['test'][args.test_set])]
+    batches = [texts[start:start + args.batch_size]
+               for start in range(0, len(texts), args.batch_size)]
+
+    full_model = _load_model(config, {'enabled': False})
+    full_classes = _classes(full_model.process_batch(texts))
+    runs = [('full', full_model)]
+    for threshold in map(float, args.thresholds.split(',')):
+        runs.append(('window@%.2f' % threshold, _load_model(config, {
+            'enabled': True,
+            'window_size': args.window_size,
+            'growth': args.growth,
+            'threshold': threshold})))
+
+    print("{:<12}\t{:>10}\t{:>10}\t{:>10}\t{:>10}\t{:>8}".format(
+        'inference', 'p50(ms)', 'docs/s', 'tokens/doc', 'exits(%)',
+        'agree(%)'))
+    for name, model in runs:
+        windowed = model.classifier.windowed
+        result = BenchmarkHelper.measure_latency(
+            lambda batch: model.process_batch(batch, args.batch_size),
+            batches)
+        classes = _classes(model.process_batch(texts))
+        agreement = sum(
+            predicted == full for predicted, full in zip(classes, full_classes)
+        ) / max(1, len(texts))
+        if windowed is None:
+            tokens, exits = float('nan'), 0.0
+        else:
+            stats = windowed.stats()
+            tokens = stats['tokens_per_doc']
+            exits = stats['early_exit_rate']
+        print("{:<12}\t{:>10.2f}\t{:>10.1f}\t{:>10.1f}\t{:>10.1f}\t"
+              "{:>8.1f}".format(name, result['p50'], result['docs_per_sec'],
+                                tokens, exits * 100, agreement * 100))
+
+
+if __name__ == '__main__':
+    main()
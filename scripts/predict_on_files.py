@@ -1,8 +1,9 @@
 import os
+import tensorflow as tf
 from tensorflow.contrib import predictor
 from xml_miner.miner import TRXMLMiner
 from argparse import ArgumentParser
-from tk_nn_classifier.data_loader import WordVector
+from tk_nn_classifier.data_loader import WordVector, tokenize
 from easy_tokenizer.tokenizer import Tokenizer
 from tensorflow.python.keras.preprocessing import sequence
 
@@ -22,17 +23,32 @@ def _input_text_to_pad_id(text, vocab_to_ids, tokenizer):
     return {'input':data}
 
 
+def _input_text_to_pad_tokens(text):
+    # models exported with the "tokens" serving input look up the ids
+    data = sequence.pad_sequences([tokenize(text)],
+                                  maxlen=MAXLEN,
+                                  dtype=object,
+                                  truncating='post',
+                                  padding='post',
+                                  value='')
+    return {'input':data}
+
+
 def get_args():
     '''get arguments'''
     parser = ArgumentParser(description='process trxml file/files:')
     parser.add_argument('input', help='input trxml/trxml folder to predict', type=str)
     parser.add_argument('model_path', help='trained classifier', type=str)
-    parser.add_argument('embedding_path', help='path of the embedding file', type=str)
+    parser.add_argument('embedding_path', help='path of the embedding file, '
+                        'not needed if the model takes tokens',
+                        type=str, nargs='?')
     return parser.parse_args()
 
 
 def _load_model_and_vocab(args):
     model = predictor.from_saved_model(args.model_path)
+    if model.feed_tensors['input'].dtype == tf.string:
+        return model, None
     vocab, _ = WordVector.read_embeddings(args.embedding_path)
     vocab_to_ids = WordVector.create_vocab_index_dict(vocab)
     return model, vocab_to_ids
@@ -55,7 +71,10 @@ def main():
     for file in files:
         selected_value = list(trxml_miner.mine(file))
         input_text = selected_value[0]['values'][TEXT_FIELD]
-        data = _input_text_to_pad_id(input_text, vocab_to_ids, tokenizer)
+        if vocab_to_ids is None:
+            data = _input_text_to_pad_tokens(input_text)
+        else:
+            data = _input_text_to_pad_id(input_text, vocab_to_ids, tokenizer)
         result = model(data)
         probabilities = result['probabilities'][0]
         print(file, probabilities)
@@ -0,0 +1,108 @@
+"""unit tests for the known advertiser index"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.advertiser_index import normalize_org_name
+from tk_nn_classifier.advertiser_index import normalize_domain
+from tk_nn_classifier.advertiser_index import build_index, AdvertiserIndex
+from tk_nn_classifier.advertiser_index import AdvertiserLookup
+from tk_nn_classifier.advertiser_index import labelled_advertisers
+from tk_nn_classifier.cascade import decided_by
+
+
+class FakeLabelMapper:
+    classid_to_label = {0: 'employer', 1: 'agency'}
+
+    def class_id(self, label):
+        return {'employer': 0, 'agency': 1}[label]
+
+
+DETAIL_FIELDS = ['text', 'class', 'doc_id', 'org', 'url']
+
+
+def records():
+    # 4 records of Randstad, from 2 urls
+    for index in range(4):
+        yield ['text', 'agency', str(index), 'Randstad B.V.',
+               'https://www.randstad.nl/jobs/%d' % index]
+    # 3 records of Acme: 2 employer, 1 agency
+    for index, label in enumerate(['employer', 'employer', 'agency']):
+        yield ['text', label, 'acme%d' % index, 'ACME Inc.', None]
+    # a single record of Foo
+    yield ['text', 'employer', 'foo', 'Foo', 'foo.com']
+    # unlabelled records of Randstad
+    yield ['text', None, 'unlabelled', 'Randstad', 'randstad.nl']
+    yield ['text', '', 'empty', 'Randstad', 'randstad.nl']
+
+
+class AdvertiserIndexTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.tmp_dir, 'advertisers.idx')
+        build_index(
+            labelled_advertisers(records(), DETAIL_FIELDS, 'org', 'url'),
+            self.index_file, min_count=2)
+        self.index = AdvertiserIndex(self.index_file)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_skip_unlabelled(self):
+        advertisers = list(
+            labelled_advertisers(records(), DETAIL_FIELDS, 'org', 'url'))
+        self.assertEqual(len(advertisers), 8)
+        self.assertTrue(all(label for _, _, label in advertisers))
+
+    def test_normalize(self):
+        self.assertEqual(normalize_org_name('Randstad Nederland B.V.'),
+                         'randstad nederland')
+        self.assertEqual(normalize_org_name('  Café  Müller GmbH '),
+                         'cafe muller')
+        # a legal form alone is kept
+        self.assertEqual(normalize_org_name('Ltd'), 'ltd')
+        self.assertEqual(normalize_org_name(None), '')
+        self.assertEqual(normalize_domain('https://WWW.Example.com:8080/x'),
+                         'example.com')
+        self.assertEqual(normalize_domain('jobs.example.com/a?b=c'),
+                         'jobs.example.com')
+        self.assertEqual(normalize_domain(''), '')
+
+    def test_lookup(self):
+        # the org name and the domain of randstad, the org name of acme
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.lookup('RANDSTAD bv', None),
+                         ('agency', 1.0, 4))
+        self.assertEqual(self.index.lookup(None, 'randstad.nl'),
+                         ('agency', 1.0, 4))
+        label, confidence, count = self.index.lookup('Acme', None)
+        self.assertEqual((label, count), ('employer', 3))
+        self.assertAlmostEqual(confidence, 2 / 3, places=5)
+        self.assertIsNone(self.index.lookup('Acme', None, 0.9))
+        # below min_count
+        self.assertIsNone(self.index.lookup('Foo', 'foo.com'))
+        self.assertIsNone(self.index.lookup(None, None))
+        # the most confident of the org name and domain
+        self.assertEqual(self.index.lookup('Acme', 'randstad.nl')[0],
+                         'agency')
+
+    def test_advertiser_lookup(self):
+        lookup = AdvertiserLookup(self.index, DETAIL_FIELDS, 'org', 'url',
+                                  FakeLabelMapper(), 2, min_confidence=0.95)
+        results = lookup([
+            ['text', None, '1', 'Randstad', None],
+            ['text', None, '2', 'Acme', None],
+            ['text', None, '3']])
+        self.assertEqual(results[0], [0.0, 1.0])
+        self.assertEqual(decided_by(results[0]), 'index')
+        self.assertEqual(results[1:], [None, None])
+        self.assertEqual((lookup.hits, lookup.lookups), (1, 3))
+
+    def test_not_an_index(self):
+        with open(self.index_file + '.txt', 'wb') as output_fh:
+            output_fh.write(b'not an index')
+        with self.assertRaises(ValueError):
+            AdvertiserIndex(self.index_file + '.txt')
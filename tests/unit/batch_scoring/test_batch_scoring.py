@@ -0,0 +1,119 @@
+"""unit tests for the chunked batch scoring"""
+import os
+import csv
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.batch_scoring import ChunkedScorer
+from tk_nn_classifier.data_loader.data_reader import DataReader
+from tk_nn_classifier.predict_pipeline import PredictionPipeline
+
+
+class FakeModel:
+    '''fails after max_batches batches, to simulate a crash'''
+
+    def __init__(self, max_batches=None):
+        self.max_batches = max_batches
+        self.num_batches = 0
+
+    def process_batch(self, texts, batch_size=None):
+        if self.max_batches is not None and \
+                self.num_batches >= self.max_batches:
+            raise RuntimeError('preempted')
+        self.num_batches += 1
+        return [[0.2, 0.8] if 'agency' in text else [0.7, 0.3]
+                for text in texts]
+
+
+class ChunkedScorerTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.config = {
+            "max_lines": 5,
+            "model_path": self.test_dir,
+            "csv_fields": {
+                "features": "full_text",
+                "class": "source_type",
+                "doc_id": "posting_id"
+            },
+            "jsonl_fields": {
+                "features": "full_text",
+                "class": "source_type",
+                "doc_id": "posting_id"
+            },
+            "datasets": {}
+        }
+        self.data_reader = DataReader(self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def scored_ids(self, output_dir):
+        doc_ids = []
+        for file_name in sorted(os.listdir(output_dir)):
+            if file_name.startswith('chunk-') and file_name.endswith('.tsv'):
+                with open(os.path.join(output_dir, file_name)) as chunk_fh:
+                    doc_ids.extend(row['posting_id'] for row in
+                                   csv.DictReader(chunk_fh, delimiter='\t'))
+        return doc_ids
+
+    def all_ids(self, data_path):
+        return [record[2] for record in
+                self.data_reader.iter_data_set_with_detail(data_path)]
+
+    def test_resume_after_crash(self):
+        for data_path in ['tests/resource/sample.jsonl',
+                          'tests/resource/sample.csv']:
+            output_dir = os.path.join(self.test_dir, 'crash')
+            scorer = ChunkedScorer(output_dir, chunk_size=3)
+            # one batch per chunk, fails in the third chunk
+            pipeline = PredictionPipeline(FakeModel(max_batches=2),
+                                          batch_size=3, workers=0)
+            with self.assertRaises(RuntimeError):
+                scorer.score(pipeline, self.data_reader, data_path)
+            self.assertEqual(scorer.committed_chunks(data_path), {0, 1})
+
+            num_chunks, count = scorer.score(
+                PredictionPipeline(FakeModel(), batch_size=3, workers=0),
+                self.data_reader, data_path)
+            all_ids = self.all_ids(data_path)
+            self.assertEqual(count, len(all_ids) - 6)
+            self.assertEqual(num_chunks, -(-len(all_ids) // 3) - 2)
+            self.assertEqual(self.scored_ids(output_dir), all_ids)
+
+            # nothing left to score
+            self.assertEqual(
+                scorer.score(PredictionPipeline(FakeModel(), workers=0),
+                             self.data_reader, data_path),
+                (0, 0))
+            shutil.rmtree(output_dir)
+
+    def test_shards(self):
+        data_path = 'tests/resource/sample.jsonl'
+        output_dir = os.path.join(self.test_dir, 'shards')
+        for shard_id in range(2):
+            scorer = ChunkedScorer(output_dir, chunk_size=2, num_shards=2,
+                                   shard_id=shard_id)
+            scorer.score(PredictionPipeline(FakeModel(), workers=0),
+                         self.data_reader, data_path)
+            with open(scorer.journal_path) as journal_fh:
+                chunks = [json.loads(line)['chunk']
+                          for line in journal_fh.readlines()[1:]]
+            self.assertTrue(all(chunk % 2 == shard_id for chunk in chunks))
+        self.assertEqual(self.scored_ids(output_dir),
+                         self.all_ids(data_path))
+
+    def test_journal_of_other_run(self):
+        data_path = 'tests/resource/sample.jsonl'
+        output_dir = os.path.join(self.test_dir, 'other')
+        ChunkedScorer(output_dir, chunk_size=4).score(
+            PredictionPipeline(FakeModel(), workers=0),
+            self.data_reader, data_path)
+        with self.assertRaises(ValueError):
+            ChunkedScorer(output_dir, chunk_size=5).committed_chunks(
+                data_path)
+        with self.assertRaises(ValueError):
+            ChunkedScorer(output_dir, num_shards=2, shard_id=2)
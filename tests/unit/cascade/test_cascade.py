@@ -0,0 +1,128 @@
+"""unit tests for the inference cascade"""
+import io
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.cascade import Cascade, CascadeEncoder, decided_by
+from tk_nn_classifier.cascade import FIRST_STAGE, SECOND_STAGE
+from tk_nn_classifier.prediction_cache import PredictionCache
+from tk_nn_classifier.predict_pipeline import PredictionWriter
+
+
+class LengthEncoder:
+    '''encode a text to its number of words'''
+
+    def __call__(self, texts):
+        return [len(text.split()) for text in texts]
+
+
+class FirstStage:
+    '''probability of the second class grows with the number of words'''
+
+    def __init__(self):
+        self.batches = []
+
+    def text_encoder(self):
+        return LengthEncoder()
+
+    def process_encoded_batch(self, encoded, batch_size=None):
+        self.batches.append(len(encoded))
+        return [[1 - min(length, 4) / 4, min(length, 4) / 4]
+                for length in encoded]
+
+    def process_batch(self, texts, batch_size=None):
+        return self.process_encoded_batch(LengthEncoder()(texts), batch_size)
+
+
+class CascadeTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        # 0, 1, 2, 3, 4 words: probabilities 0, 0.25, 0.5, 0.75, 1
+        self.texts = [' '.join(['word'] * length) for length in range(5)]
+        self.second_stage_texts = []
+
+    def second_stage(self, texts):
+        self.second_stage_texts.append(texts)
+        return [[0.4, 0.6] for _ in texts]
+
+    def test_escalate_uncertain(self):
+        cascade = Cascade(FirstStage(), band=(0.2, 0.6))
+        results = cascade.process(self.texts, self.second_stage)
+        # one batch of the uncertain documents
+        self.assertEqual(self.second_stage_texts,
+                         [['word', 'word word']])
+        self.assertEqual([decided_by(probabilities)
+                          for probabilities in results],
+                         [FIRST_STAGE, SECOND_STAGE, SECOND_STAGE,
+                          FIRST_STAGE, FIRST_STAGE])
+        self.assertEqual(results[1], [0.4, 0.6])
+        self.assertEqual(results[3], [0.25, 0.75])
+        stats = cascade.stats()
+        self.assertEqual(stats['documents'], 5)
+        self.assertEqual(stats['escalated'], 2)
+        self.assertAlmostEqual(stats['escalated_rate'], 0.4)
+
+    def test_nothing_uncertain(self):
+        cascade = Cascade(FirstStage(), band=(0.3, 0.4))
+        results = cascade.process(self.texts, self.second_stage)
+        self.assertEqual(self.second_stage_texts, [])
+        self.assertTrue(all(decided_by(probabilities) == FIRST_STAGE
+                            for probabilities in results))
+
+    def test_encoded(self):
+        first_stage = FirstStage()
+        cascade = Cascade(first_stage, band=(0.5, 0.5))
+        encoder = cascade.text_encoder()
+        # sent to the encoding processes
+        encoder = pickle.loads(pickle.dumps(encoder))
+        texts, encoded = encoder(self.texts)
+        self.assertEqual(encoded, [0, 1, 2, 3, 4])
+        results = cascade.process(texts, self.second_stage,
+                                  first_stage_encoded=encoded)
+        self.assertEqual(first_stage.batches, [5])
+        self.assertEqual(self.second_stage_texts, [['word word']])
+        self.assertEqual(decided_by(results[2]), SECOND_STAGE)
+        self.assertEqual(CascadeEncoder()(['a']), (['a'], ['a']))
+
+    def test_band(self):
+        with self.assertRaises(ValueError):
+            Cascade(FirstStage(), band=(0.8, 0.2))
+        with self.assertRaises(ValueError):
+            Cascade(FirstStage(), band=(-0.1, 0.5))
+        # not from a cascade
+        self.assertIsNone(decided_by([0.5, 0.5]))
+        self.assertEqual(decided_by([0.5, 0.5], 'cache'), 'cache')
+
+    def test_cached_stages(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, 'cache.sqlite')
+            cascade = Cascade(FirstStage(), band=(0.2, 0.6))
+            stages = [FIRST_STAGE, SECOND_STAGE, SECOND_STAGE, FIRST_STAGE,
+                      FIRST_STAGE]
+            for _ in range(2):
+                # predicted, then read back from the memory tier
+                cache = PredictionCache('model', path=path)
+                for _ in range(2):
+                    results = cache.process(
+                        self.texts,
+                        lambda texts: cascade.process(texts,
+                                                      self.second_stage))
+                    self.assertEqual([decided_by(probabilities, 'cache')
+                                      for probabilities in results], stages)
+                cache.close()
+            # the second cache read the stages from disk
+            self.assertEqual(cache.disk_hits, 5)
+            self.assertEqual(len(self.second_stage_texts), 1)
+
+            output_fh = io.StringIO()
+            writer = PredictionWriter.create(
+                'tsv', output_fh, ['text', 'class', 'doc_id'], stages=True)
+            writer.write(['word', 'agency', 'doc_1'], results[1])
+            self.assertEqual(output_fh.getvalue().splitlines()[1],
+                             'doc_1\t1\tagency\tsecond\t[0.4, 0.6]')
+        finally:
+            shutil.rmtree(test_dir)
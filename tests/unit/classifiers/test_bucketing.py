@@ -0,0 +1,45 @@
+"""unit tests for length bucketing"""
+from unittest import TestCase
+from tk_nn_classifier.classifiers.bucketing import bucket_boundaries, \
+    bucket_batch_sizes, length_sorted_batches
+
+
+class BucketingTestCases(TestCase):
+    """unit tests"""
+
+    def test_bucket_boundaries(self):
+        self.assertEqual(bucket_boundaries(1024),
+                         [16, 32, 64, 128, 256, 512])
+        self.assertEqual(bucket_boundaries(100, min_length=32), [32, 64])
+        self.assertEqual(bucket_boundaries(16), [])
+
+    def test_bucket_batch_sizes(self):
+        self.assertEqual(bucket_batch_sizes([64, 128], 512, 32),
+                         [32, 32, 32])
+        self.assertEqual(bucket_batch_sizes([64, 128], 512, 32,
+                                            token_budget=1024),
+                         [16, 8, 2])
+        self.assertEqual(bucket_batch_sizes([], 512, 32, token_budget=100),
+                         [1])
+
+    def test_length_sorted_batches_on_size(self):
+        lengths = [5, 100, 3, 50, 4, 99]
+        batches = length_sorted_batches(lengths, batch_size=2)
+        self.assertEqual(batches, [[2, 4], [0, 3], [5, 1]])
+
+    def test_length_sorted_batches_on_budget(self):
+        lengths = [5, 100, 3, 50, 4, 99]
+        batches = length_sorted_batches(lengths, token_budget=200)
+        self.assertEqual(batches, [[2, 4, 0, 3], [5, 1]])
+        for batch in batches:
+            self.assertTrue(
+                len(batch) == 1 or
+                len(batch) * max(lengths[i] for i in batch) <= 200)
+
+    def test_length_sorted_batches_cover_all(self):
+        lengths = [0, 7, 7, 1, 300, 12, 0]
+        batches = length_sorted_batches(lengths, batch_size=3,
+                                        token_budget=40)
+        self.assertEqual(sorted(sum(batches, [])), list(range(len(lengths))))
+        with self.assertRaises(ValueError):
+            length_sorted_batches(lengths)
@@ -0,0 +1,27 @@
+"""unit tests for the lazy classifier registry"""
+import sys
+import subprocess
+from unittest import TestCase
+from tk_nn_classifier.classifiers import get_classifier_class
+
+
+class ClassifierRegistryTestCases(TestCase):
+    """unit tests"""
+
+    def test_unknown_model_type(self):
+        with self.assertRaises(ValueError):
+            get_classifier_class('sklearn_svm')
+
+    def test_no_framework_import(self):
+        # a fresh interpreter, the frameworks may be imported by other tests
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import sys\n'
+             'import tk_nn_classifier.model\n'
+             'import tk_nn_classifier.__main__\n'
+             'print(sorted(module for module in '
+             '["tensorflow", "spacy", "tqdm", "xml_miner"] '
+             'if module in sys.modules))'],
+            stdout=subprocess.PIPE, check=True,
+            universal_newlines=True).stdout
+        self.assertEqual(output.strip(), '[]')
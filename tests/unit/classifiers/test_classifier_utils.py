@@ -1,7 +1,11 @@
 """unit tests for classifier utils functions"""
 import os
+import pickle
+import shutil
+import tempfile
 from unittest import TestCase
 from tk_nn_classifier.classifiers.utils import TrainHelper, ConfusionMatrix
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper, FileHelper
 
 class ClassifierUtilTestCases(TestCase):
     """unit tests"""
@@ -34,3 +38,30 @@ class ClassifierUtilTestCases(TestCase):
                     '========================================'
 
         self.assertEqual(str(cm), cm_string, 'comfusion matrix print format')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(BenchmarkHelper.percentile(values, 50), 50)
+        self.assertEqual(BenchmarkHelper.percentile(values, 99), 99)
+        self.assertEqual(BenchmarkHelper.percentile([3], 99), 3)
+
+    def test_measure_latency(self):
+        calls = []
+        result = BenchmarkHelper.measure_latency(
+            calls.append, [['a', 'b'], ['c']], warmup=2)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(sorted(result),
+                         ['docs_per_sec', 'mean', 'p50', 'p99'])
+        self.assertTrue(result['p50'] <= result['p99'])
+
+    def test_write_pickle(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            vocab_file = os.path.join(tmp_dir, 'vocab.p')
+            FileHelper.write_pickle({'FOO': 2}, vocab_file)
+            FileHelper.write_pickle({'FOO': 2, 'BAR': 3}, vocab_file)
+            with open(vocab_file, 'rb') as handle:
+                self.assertEqual(pickle.load(handle), {'FOO': 2, 'BAR': 3})
+            self.assertEqual(os.listdir(tmp_dir), ['vocab.p'])
+        finally:
+            shutil.rmtree(tmp_dir)
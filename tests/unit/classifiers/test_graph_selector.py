@@ -0,0 +1,61 @@
+'''unit test for the graphs: lstm cells and fast bag of n-grams'''
+from unittest import TestCase
+import numpy as np
+import tensorflow as tf
+from tk_nn_classifier.classifiers.graph_selector import GraphSelector
+from tk_nn_classifier.classifiers.graph_selector import LSTM_CELLS
+from tk_nn_classifier.exceptions import ConfigError
+
+
+class GraphSelectorTestCases(TestCase):
+    '''the lstm graphs of each cell type'''
+
+    def config(self, model_type, cell):
+        return {'model_type': model_type,
+                'dropout_rate': 0.5,
+                'dropout_keep_rate': 0.5,
+                'lstm': {'hidden_size': 4, 'nr_layers': 2, 'cell': cell}}
+
+    def logits(self, model_type, cell):
+        graph = tf.Graph()
+        with graph.as_default():
+            input = {'input': tf.constant([[1, 2, 3], [2, 1, 0]]),
+                     'len': tf.constant([3, 2])}
+            # the hidden size, as needed by the multi layer graph
+            vectors = tf.constant(np.random.rand(4, 4), dtype=tf.float32)
+            logits = GraphSelector(self.config(model_type, cell), None) \
+                .add_graph(input, False,
+                           lambda ids: tf.nn.embedding_lookup(vectors, ids))
+            with tf.compat.v1.Session() as session:
+                session.run(tf.compat.v1.global_variables_initializer())
+                return session.run(logits)
+
+    def test_lstm_cells(self):
+        for model_type in ['tf_lstm_simple', 'tf_lstm_multi']:
+            for cell in LSTM_CELLS:
+                self.assertEqual(self.logits(model_type, cell).shape, (2, 2))
+
+    def test_fast_bow_padding(self):
+        graph = tf.Graph()
+        with graph.as_default():
+            ids = tf.compat.v1.placeholder(tf.int32, [None, None])
+            length = tf.compat.v1.placeholder(tf.int32, [None])
+            vectors = tf.constant(np.random.rand(4, 3), dtype=tf.float32)
+            config = {'model_type': 'tf_fast_bow',
+                      'fast_bow': {'buckets': 16}}
+            logits = GraphSelector(config, None).add_graph(
+                {'input': ids, 'len': length}, False,
+                lambda input_ids: tf.nn.embedding_lookup(vectors, input_ids))
+            with tf.compat.v1.Session() as session:
+                session.run(tf.compat.v1.global_variables_initializer())
+                unpadded = session.run(logits, {ids: [[1, 2, 3]],
+                                                length: [3]})
+                # the padding is not part of the average
+                padded = session.run(logits, {ids: [[1, 2, 3, 0, 0]],
+                                              length: [3]})
+                self.assertEqual(unpadded.shape, (1, 2))
+                np.testing.assert_allclose(unpadded, padded, rtol=1e-5)
+
+    def test_unknown_cell(self):
+        with self.assertRaises(ConfigError):
+            self.logits('tf_lstm_simple', 'gru')
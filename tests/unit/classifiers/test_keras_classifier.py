@@ -9,6 +9,7 @@ from tensorflow.keras.models import Model
 from tk_nn_classifier.classifiers import KerasClassifier
 from tk_nn_classifier.config import load_config_from_dikt
 from tk_nn_classifier.classifiers.utils import eval_predictions
+from tk_nn_classifier.data_loader import tokenize
 
 class KerasClassifierTestCases(TestCase):
     '''unit test for tensorflow classifier:
@@ -102,11 +103,19 @@ class KerasClassifierTestCases(TestCase):
         classifier.load_embedding()
         (train_data, labels, train_data_length) = classifier.load_data_set(
             classifier.config['datasets']['train'])
+        train_texts, _ = classifier.data_reader.get_data(
+            classifier.config['datasets']['train'])
 
-        # index of two tokens from embedding
-        self.assertEqual(train_data.shape, (256, 1024, 150))
+        # the padded token ids, embedded in the model
+        self.assertEqual(train_data.shape, (256, 1024))
+        self.assertEqual(train_data.dtype, np.int32)
         self.assertEqual(train_data_length[0], 551)
         self.assertEqual(sum(labels), 109)
+        self.assertEqual(train_data[0][0],
+                         classifier.embedding.get_index(
+                             tokenize(train_texts[0])[0]))
+        self.assertTrue(
+            (train_data[0][train_data_length[0]:] == 0).all())
 
 
         # also check the label id
@@ -114,11 +123,23 @@ class KerasClassifierTestCases(TestCase):
         #    label_mapper = json.load(mapper_fh)
         # self.assertEqual(label_mapper, {"0": "no", "1": "yes"})
 
+    def test_01_prepare_vectors(self):
+        config = dict(self.config, keras={'input': 'vectors'})
+        classifier = KerasClassifier(config)
+        classifier.load_embedding()
+        (train_data, labels, train_data_length) = classifier.load_data_set(
+            classifier.config['datasets']['train'])
+        self.assertEqual(train_data.shape, (256, 1024, 150))
+        self.assertEqual(train_data_length[0], 551)
+
     def test_02_build_graph(self):
         classifier = KerasClassifier(self.config)
         classifier.load_embedding()
         classifier.build_graph()
         self.assertTrue(isinstance(classifier.classifier, Model))
+        self.assertEqual(classifier.classifier.input_shape, (None, 1024))
+        self.assertFalse(
+            classifier.classifier.get_layer('embedding').trainable)
 
     def test_03_train_save_and_eval(self):
         classifier = KerasClassifier(self.config)
@@ -132,6 +153,13 @@ class KerasClassifierTestCases(TestCase):
         accuracy, precision, recall = eval_predictions(eval, gold)
         self.assertGreater(accuracy, 0.7, 'testing on eval set using trained model')
 
+        classifier.load_saved_model()
+        texts, _ = classifier.data_reader.get_data(
+            classifier.config['datasets']['eval'])
+        probabilities = classifier.process_batch(list(texts[:5]), 2)
+        self.assertEqual(len(probabilities), 5)
+        self.assertAlmostEqual(sum(probabilities[0]), 1.0, places=5)
+
     #def test_04_load_and_eval(self):
     #    classifier = SpacyClassifier(self.config)
     #    test_set = classifier.data_reader.get_data(classifier.config['datasets']['test']['test'])
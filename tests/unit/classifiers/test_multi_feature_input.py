@@ -118,11 +118,26 @@ class MultiFeatTestCases(TestCase):
         data = self.classifier._input_text_to_pad_id(test_text)
         print(data["input_0"].tolist())
 
-        self.assertEqual(len(data), 2)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data["len"].tolist(), [[4, 2]])
 
         self.assertEqual(data["input_0"].tolist(), [[2, 3, 4, 5]])
         self.assertEqual(data["input_1"].tolist(), [[6, 8]])
 
+    def test_inputs_to_pad_id(self):
+        inputs = [
+                    ['foo bar zoo', 'new'],
+                    ['foo bar zoo boo foo', 'new rule'],
+                    ['boo zoo', 'old rule new']
+                 ]
+        self.classifier._load_vocab()
+        data = self.classifier._inputs_to_pad_id(inputs)
+
+        self.assertEqual(data["input_0"].tolist(),
+                         [[2, 3, 4, 0], [2, 3, 4, 5], [5, 4, 0, 0]])
+        self.assertEqual(data["input_1"].tolist(), [[6, 0], [6, 8], [7, 8]])
+        self.assertEqual(data["len"].tolist(), [[3, 1], [4, 2], [2, 2]])
+
 
     @staticmethod
     def embedding_content():
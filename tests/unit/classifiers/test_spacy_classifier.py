@@ -119,3 +119,16 @@ class SpacyClassifierTestCases(TestCase):
         eval, gold = classifier.evaluate(test_set, mode='test')
         accuracy, precision, recall = eval_predictions(eval, gold)
         self.assertGreater(accuracy, 0.6, 'testing on test set using trained model')
+
+    def test_05_process_batch(self):
+        classifier = SpacyClassifier(self.config)
+        test_set = classifier.data_reader.get_data(classifier.config['datasets']['test']['test'])
+        classifier.load_saved_model()
+        texts, cats = zip(*test_set)
+        probabilities = classifier.process_batch(texts, batch_size=4)
+        self.assertEqual(len(probabilities), len(texts))
+        for probability, predicted in zip(probabilities,
+                                          classifier.predict_batch(texts)):
+            self.assertEqual(len(probability), 2)
+            self.assertAlmostEqual(probability[0], predicted['no'], places=5)
+            self.assertAlmostEqual(probability[1], predicted['yes'], places=5)
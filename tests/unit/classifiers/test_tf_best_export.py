@@ -0,0 +1,56 @@
+'''test: schedule of the best model exports'''
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.classifiers.tf_best_export import ExportSchedule
+from tk_nn_classifier.classifiers.tf_best_export import keep_checkpoint
+
+
+class BestExportTestCases(TestCase):
+    '''unit test for the delayed best model exports'''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.now = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_export_schedule(self):
+        schedule = ExportSchedule(clock=lambda: self.now)
+        self.assertTrue(schedule.due())
+        schedule.exported()
+        self.assertTrue(schedule.due())
+
+        schedule = ExportSchedule(min_interval_secs=60,
+                                  clock=lambda: self.now)
+        self.assertTrue(schedule.due())
+        schedule.exported()
+        self.now = 59
+        self.assertFalse(schedule.due())
+        self.now = 60
+        self.assertTrue(schedule.due())
+
+        self.assertFalse(ExportSchedule(deferred=True).due())
+
+    def test_keep_checkpoint(self):
+        keep_dir = os.path.join(self.tmp_dir, 'best_checkpoint')
+        for step in [100, 200]:
+            for suffix in ['index', 'meta', 'data-00000-of-00001']:
+                with open(os.path.join(self.tmp_dir, 'model.ckpt-{}.{}'.format(
+                        step, suffix)), 'w') as ckpt_fh:
+                    ckpt_fh.write(str(step))
+
+        keep_checkpoint(os.path.join(self.tmp_dir, 'model.ckpt-100'),
+                        keep_dir)
+        kept = keep_checkpoint(os.path.join(self.tmp_dir, 'model.ckpt-200'),
+                               keep_dir)
+        self.assertEqual(kept, os.path.join(keep_dir, 'model.ckpt-200'))
+        self.assertEqual(sorted(os.listdir(keep_dir)),
+                         ['model.ckpt-200.data-00000-of-00001',
+                          'model.ckpt-200.index', 'model.ckpt-200.meta'])
+        # the kept files outlive the checkpoint of the estimator
+        os.remove(os.path.join(self.tmp_dir, 'model.ckpt-200.index'))
+        with open(kept + '.index') as ckpt_fh:
+            self.assertEqual(ckpt_fh.read(), '200')
@@ -57,8 +57,8 @@ class TFClassifierTestUtilsCases(TestCase):
 
         }
         #self.data_reader = DataReader(self.config)
-        config = load_config_from_dikt(config_dikt)
-        self.classifier = TFClassifier(config)
+        self.config = load_config_from_dikt(config_dikt)
+        self.classifier = TFClassifier(self.config)
         self.cases = [
             {
                 "input": 'foo bar zoo new',
@@ -92,18 +92,30 @@ class TFClassifierTestUtilsCases(TestCase):
         '''clean up the temp dir after test'''
         shutil.rmtree(self.test_dir)
 
-    def test_prepare_single_input(self):
+    def test_single_input(self):
         self.classifier.load_embedding()
         for case in self.cases:
-            data = self.classifier._prepare_single_input(case['input'])
-            self.assertEqual(data[0]['input'].numpy().tolist(), case['ids'])
-            self.assertEqual(data[0]['len'].numpy(), case['length'])
+            data, data_length = self.classifier._single_input(case['input'])
+            self.assertEqual(data[0].tolist(), case['ids'])
+            self.assertEqual(data_length, case['length'])
+
+    def test_vocab_file_only_for_token_input(self):
+        vocab_file = os.path.join(self.config['model_path'], 'vocab.txt')
+        TFClassifier(self.config).load_embedding()
+        self.assertFalse(os.path.exists(vocab_file))
+        config = dict(self.config, serving={'input': 'tokens'})
+        TFClassifier(config).load_embedding()
+        self.assertTrue(os.path.exists(vocab_file))
+        os.remove(vocab_file)
 
     def test_input_text_to_pad_id(self):
         self.classifier._load_vocab()
         for case in self.cases:
             data = self.classifier._input_text_to_pad_id(case['input'])
-            self.assertEqual(data["input"][0].tolist(), case['ids'])
+            # a single text is not padded with the variable length signature
+            self.assertEqual(data["input"][0].tolist(),
+                             case['ids'][:case['length']])
+            self.assertEqual(data["len"].tolist(), [case['length']])
 
 
     @staticmethod
@@ -118,3 +130,12 @@ OLD -1.0 0.9 -1.0
 RULE 0.7 -0.1 0.0
 '''
         return embedding_content
+
+    def test_input_texts_to_pad_id(self):
+        self.classifier._load_vocab()
+        data = self.classifier._input_texts_to_pad_id(
+            [case['input'] for case in self.cases])
+        self.assertEqual(data["input"].tolist(),
+                         [case['ids'] for case in self.cases])
+        self.assertEqual(data["len"].tolist(),
+                         [case['length'] for case in self.cases])
@@ -0,0 +1,48 @@
+'''test: frozen embedding read from the embedding file of the model'''
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import tensorflow as tf
+from tk_nn_classifier.classifiers.tf_embedding import frozen_embedding
+from tk_nn_classifier.classifiers.tf_embedding import write_embedding_file
+from tk_nn_classifier.classifiers.tf_embedding import embedding_storage
+from tk_nn_classifier.exceptions import ConfigError
+
+
+class TFEmbeddingTestCases(TestCase):
+    '''unit test for the frozen embedding storage'''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.vectors = np.arange(12, dtype=np.float32).reshape(4, 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_frozen_embedding(self):
+        vectors_file = write_embedding_file(
+            self.vectors, os.path.join(self.tmp_dir, 'embedding.f32'))
+        self.assertEqual(os.path.getsize(vectors_file), 4 * 3 * 4)
+        graph = tf.Graph()
+        with graph.as_default():
+            embedding = frozen_embedding(vectors_file, 4, 3)
+            lookup = tf.nn.embedding_lookup(embedding, [[2, 0]])
+            # not saved in the checkpoints, not trained
+            self.assertEqual(tf.compat.v1.global_variables(), [])
+            self.assertEqual(tf.compat.v1.trainable_variables(), [])
+            self.assertEqual(len(tf.compat.v1.get_collection(
+                tf.compat.v1.GraphKeys.ASSET_FILEPATHS)), 1)
+            with tf.compat.v1.Session() as session:
+                session.run(tf.compat.v1.local_variables_initializer())
+                self.assertEqual(session.run(lookup).tolist(),
+                                 [[[6, 7, 8], [0, 1, 2]]])
+
+    def test_embedding_storage(self):
+        self.assertEqual(embedding_storage({'embedding': {}}), 'file')
+        self.assertEqual(
+            embedding_storage({'embedding': {'storage': 'checkpoint'}}),
+            'checkpoint')
+        with self.assertRaises(ConfigError):
+            embedding_storage({'embedding': {'storage': 'graph'}})
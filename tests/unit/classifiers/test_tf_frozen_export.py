@@ -0,0 +1,39 @@
+'''test: compression of the frozen graph export'''
+from unittest import TestCase
+import numpy as np
+import tensorflow as tf
+from tk_nn_classifier.classifiers.tf_frozen_export import prune_weights
+from tk_nn_classifier.classifiers.tf_frozen_export import graph_transforms
+from tk_nn_classifier.classifiers.tf_frozen_export import QUANTIZE_TRANSFORM
+
+
+class TFFrozenExportTestCases(TestCase):
+    '''unit test for the pruning and quantization options'''
+
+    @staticmethod
+    def graph_def():
+        graph = tf.Graph()
+        with graph.as_default():
+            tf.constant(np.arange(1, 11, dtype=np.float32).reshape(2, 5),
+                        name='dense/kernel')
+            tf.constant(np.ones(5, dtype=np.float32), name='dense/bias')
+        return graph.as_graph_def()
+
+    def test_prune_weights(self):
+        graph_def = prune_weights(self.graph_def(), 0.5)
+        nodes = {node.name: tf.make_ndarray(node.attr['value'].tensor)
+                 for node in graph_def.node}
+        self.assertEqual(nodes['dense/kernel'].shape, (2, 5))
+        self.assertEqual(int(np.sum(nodes['dense/kernel'] == 0)), 5)
+        self.assertEqual(nodes['dense/kernel'][1, 4], 10)
+        self.assertEqual(int(np.sum(nodes['dense/bias'] == 0)), 0)
+        with self.assertRaises(ValueError):
+            prune_weights(self.graph_def(), 1.0)
+
+    def test_graph_transforms(self):
+        transforms = graph_transforms(optimize=True, quantize=True)
+        self.assertEqual(transforms[-2], QUANTIZE_TRANSFORM)
+        self.assertEqual(transforms[-1], 'sort_by_execution_order')
+        self.assertEqual(graph_transforms(optimize=False, quantize=True),
+                         [QUANTIZE_TRANSFORM])
+        self.assertEqual(graph_transforms(optimize=False), [])
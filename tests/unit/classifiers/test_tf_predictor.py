@@ -0,0 +1,67 @@
+'''test: persistent estimator predictor, reloaded on a new checkpoint'''
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import tensorflow as tf
+from tk_nn_classifier.classifiers.tf_predictor import EstimatorPredictor
+
+
+class EstimatorPredictorTestCases(TestCase):
+    '''unit test for the estimator predictor'''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.graphs = 0
+        self.estimator = tf.estimator.Estimator(
+            model_fn=self.model_fn, model_dir=self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def model_fn(self, features, labels, mode, params):
+        '''a bias added to the input, trained toward the label'''
+        bias = tf.compat.v1.get_variable('bias', [], tf.float32,
+                                         tf.zeros_initializer())
+        output = tf.cast(features['input'], tf.float32) + bias
+        if mode == tf.estimator.ModeKeys.PREDICT:
+            self.graphs += 1
+            return tf.estimator.EstimatorSpec(
+                mode=mode, predictions={'output': output})
+        loss = tf.reduce_mean(tf.square(output - labels))
+        train_op = tf.compat.v1.train.GradientDescentOptimizer(0.1).minimize(
+            loss, global_step=tf.compat.v1.train.get_global_step())
+        return tf.estimator.EstimatorSpec(mode=mode, loss=loss,
+                                          train_op=train_op)
+
+    def train(self, steps):
+        def input_fn():
+            return ({'input': tf.zeros([4], tf.int32)},
+                    tf.ones([4], tf.float32))
+        self.estimator.train(input_fn=input_fn, steps=steps)
+
+    def test_reuse_and_reload(self):
+        self.train(10)
+        predictor = EstimatorPredictor(
+            self.estimator,
+            {'input': tf.int32},
+            {'input': tf.TensorShape([None])},
+            reload_check_secs=0)
+        first = predictor.predict({'input': np.array([0, 1], np.int32)})
+        second = predictor.predict({'input': np.array([2], np.int32)})
+        # one graph and session for both predictions
+        self.assertEqual(self.graphs, 1)
+        self.assertEqual(first['output'].shape, (2,))
+        self.assertAlmostEqual(second['output'][0] - first['output'][0],
+                               2.0, places=5)
+        bias = first['output'][0]
+        self.assertGreater(bias, 0.0)
+        checkpoint_path = predictor.checkpoint_path
+
+        # reloaded on the new checkpoint
+        self.train(10)
+        third = predictor.predict({'input': np.array([0], np.int32)})
+        self.assertEqual(self.graphs, 2)
+        self.assertNotEqual(predictor.checkpoint_path, checkpoint_path)
+        self.assertGreater(third['output'][0], bias)
+        predictor.close()
@@ -0,0 +1,48 @@
+'''test: token string lookup of the serving signature'''
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import tensorflow as tf
+from tk_nn_classifier.data_loader import WordVector
+from tk_nn_classifier.classifiers.tf_serving_utils import tokens_to_ids
+from tk_nn_classifier.classifiers.tf_serving_utils import write_vocab_file
+
+
+class TFServingUtilsTestCases(TestCase):
+    '''unit test for the in-graph vocab lookup'''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.vocab_file = os.path.join(self.tmp_dir, 'vocab.txt')
+        self.vocab_to_ids = {WordVector.PAD: 0, WordVector.UNK: 1,
+                             'STAFFING': 2, 'AGENCY': 3}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_vocab_file(self):
+        write_vocab_file(self.vocab_to_ids, self.vocab_file)
+        with open(self.vocab_file, encoding='utf-8') as vocab_fh:
+            self.assertEqual(vocab_fh.read().splitlines(),
+                             [WordVector.PAD, WordVector.UNK,
+                              'STAFFING', 'AGENCY'])
+        with self.assertRaises(ValueError):
+            write_vocab_file({'A': 0, 'B': 2}, self.vocab_file)
+        # the file written before is kept, without a temporary file
+        self.assertEqual(os.listdir(self.tmp_dir), ['vocab.txt'])
+
+    def test_tokens_to_ids(self):
+        write_vocab_file(self.vocab_to_ids, self.vocab_file)
+        graph = tf.Graph()
+        with graph.as_default():
+            input_tokens = tf.compat.v1.placeholder(tf.string, [None, None])
+            input_ids = tokens_to_ids(input_tokens, self.vocab_file)
+            with tf.compat.v1.Session() as session:
+                session.run(tf.compat.v1.tables_initializer())
+                result = session.run(input_ids, feed_dict={
+                    input_tokens: [['STAFFING', 'AGENCY', 'AN'],
+                                   ['AGENCY', '', '']]})
+        self.assertEqual(result.tolist(),
+                         [[2, 3, WordVector.UNK_ID],
+                          [3, WordVector.PAD_ID, WordVector.PAD_ID]])
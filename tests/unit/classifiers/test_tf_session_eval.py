@@ -0,0 +1,56 @@
+'''test: in session evaluation, best checkpoints and early stopping'''
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import tensorflow as tf
+from tk_nn_classifier.classifiers.tf_session_eval import InSessionEvalHook
+from tk_nn_classifier.classifiers.tf_session_eval import keep_latest_exports
+
+
+class InSessionEvalTestCases(TestCase):
+    '''unit test for the in session evaluation hook'''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_early_stopping(self):
+        improved = []
+        graph = tf.Graph()
+        with graph.as_default():
+            global_step = tf.compat.v1.train.get_or_create_global_step()
+            train_op = tf.compat.v1.assign_add(global_step, 1)
+            training = tf.compat.v1.placeholder_with_default(True, shape=[])
+            features = {'input': tf.ones([2, 3], tf.int32)}
+            # class 1 if the first token is not padding
+            classes = tf.cast(features['input'][:, 0] > 0, tf.int64)
+            eval_batches = [({'input': np.array([[1, 2, 0], [0, 0, 0]])},
+                             np.array([1, 1]))]
+            hook = InSessionEvalHook(
+                features, classes, training, eval_batches,
+                every_steps=10,
+                checkpoint_prefix=os.path.join(self.tmp_dir, 'model.ckpt'),
+                max_steps_without_increase=30,
+                min_steps=20,
+                on_improve=lambda path, accuracy, step:
+                    improved.append((accuracy, step)))
+            with tf.compat.v1.train.MonitoredSession(hooks=[hook]) as session:
+                while not session.should_stop():
+                    session.run(train_op)
+
+        # same accuracy at each check, only the first one is better
+        self.assertEqual(improved, [(0.5, 10)])
+        self.assertEqual(hook.last_eval_step, 40)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.tmp_dir, 'model.ckpt-10.index')))
+
+    def test_keep_latest_exports(self):
+        for name in ['1500000000', '1500000100', '1500000200', 'temp-1']:
+            os.makedirs(os.path.join(self.tmp_dir, name))
+        keep_latest_exports(self.tmp_dir, exports_to_keep=2)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ['1500000100', '1500000200', 'temp-1'])
@@ -0,0 +1,69 @@
+"""unit tests for the windowed inference"""
+from unittest import TestCase
+from tk_nn_classifier.classifiers.windowing import window_bounds, \
+    WindowedInference
+
+
+def predict_on_keyword(windows):
+    '''class 1 if the window has "agency", uncertain otherwise'''
+    return [[0.05, 0.95] if 'agency' in window else [0.6, 0.4]
+            for window in windows]
+
+
+class WindowingTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.predicted = []
+
+    def predict(self, windows):
+        self.predicted.append([len(window) for window in windows])
+        return predict_on_keyword(windows)
+
+    def test_window_bounds(self):
+        self.assertEqual(window_bounds(1000, 128, 2),
+                         [(0, 128), (128, 384), (384, 896), (896, 1000)])
+        self.assertEqual(window_bounds(10, 4),
+                         [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual(window_bounds(2000, 512, 2, max_length=1024),
+                         [(0, 512), (512, 1024)])
+        self.assertEqual(window_bounds(0, 128), [(0, 0)])
+        with self.assertRaises(ValueError):
+            window_bounds(10, 0)
+        with self.assertRaises(ValueError):
+            window_bounds(1024, 128, 0.5)
+
+    def test_early_exit(self):
+        windowed = WindowedInference(window_size=2, growth=1, threshold=0.9)
+        sequences = [
+            ['agency', 'w', 'w', 'w', 'w', 'w'],
+            ['w', 'w', 'w', 'agency', 'w', 'w'],
+            ['w', 'w', 'w'],
+            []]
+        results = windowed.process(sequences, self.predict)
+        # all documents in the first window, the confident ones leave
+        self.assertEqual(self.predicted, [[2, 2, 2, 0], [2, 1], [2]])
+        self.assertEqual(results[0], [0.05, 0.95])
+        # the mean of the windows is never confident
+        self.assertAlmostEqual(results[1][1],
+                               (0.4 * 2 + 0.95 * 2 + 0.4 * 2) / 6)
+        self.assertAlmostEqual(results[2][1], 0.4)
+        self.assertEqual(results[3], [0.6, 0.4])
+
+        stats = windowed.stats()
+        self.assertEqual(stats['documents'], 4)
+        self.assertEqual(stats['early_exits'], 1)
+        self.assertAlmostEqual(stats['tokens_per_doc'], (2 + 6 + 3 + 0) / 4)
+        self.assertAlmostEqual(stats['full_tokens_per_doc'],
+                               (6 + 6 + 3 + 0) / 4)
+        self.assertAlmostEqual(stats['windows_per_doc'], 7 / 4)
+
+    def test_max_aggregation(self):
+        windowed = WindowedInference(window_size=2, growth=1, threshold=0.9,
+                                     aggregation='max')
+        results = windowed.process([['w', 'w', 'w', 'agency', 'w', 'w']],
+                                   self.predict)
+        self.assertEqual(results, [[0.05, 0.95]])
+        self.assertEqual(self.predicted, [[2], [2]])
+        with self.assertRaises(ValueError):
+            WindowedInference(aggregation='median')
@@ -1,3 +1,7 @@
+import os
+import json
+import shutil
+import tempfile
 from unittest import TestCase
 from tk_nn_classifier import config
 from tk_nn_classifier.exceptions import ConfigError
@@ -27,3 +31,150 @@ class TestDefaultConfig(TestCase):
         self.config['spacy']['language'] = 'zh'
         with self.assertRaises(ConfigError):
             config.spacy_lang_model_consistency(self.config)
+
+    def test_predict_batch_size(self):
+        self.assertEqual(config.get_predict_batch_size(self.config),
+                         config.DEFAULTS['predict_batch_size'])
+        self.assertEqual(config.get_predict_batch_size(self.config, 16), 16)
+        self.config['predict_batch_size'] = 32
+        self.assertEqual(config.get_predict_batch_size(self.config), 32)
+        del self.config['predict_batch_size']
+        self.assertEqual(config.get_predict_batch_size(self.config),
+                         config.DEFAULTS['predict_batch_size'])
+
+    def test_serving_config(self):
+        serving_config = config.get_serving_config(self.config)
+        self.assertEqual(serving_config, config.SERVING_DEFAULTS)
+        self.config['serving'] = {'port': 9000}
+        serving_config = config.get_serving_config(self.config)
+        self.assertEqual(serving_config['port'], 9000)
+        self.assertEqual(serving_config['max_batch_size'],
+                         config.SERVING_DEFAULTS['max_batch_size'])
+
+    def test_evaluation_config(self):
+        evaluation_config = config.get_evaluation_config(self.config)
+        self.assertEqual(evaluation_config['mode'], 'estimator')
+        self.config['evaluation'] = {'mode': 'in_session',
+                                     'max_examples': 2000}
+        evaluation_config = config.get_evaluation_config(self.config)
+        self.assertEqual(evaluation_config['max_examples'], 2000)
+        self.assertIsNone(evaluation_config['batch_size'])
+        self.config['evaluation'] = {'mode': 'every_epoch'}
+        with self.assertRaises(ConfigError):
+            config.get_evaluation_config(self.config)
+
+    def test_cascade_config(self):
+        cascade_config = config.get_cascade_config(self.config)
+        self.assertIsNone(cascade_config['first_stage'])
+        self.config['cascade'] = {'first_stage': 'cfg/fast_bow.json'}
+        cascade_config = config.get_cascade_config(self.config)
+        self.assertEqual(cascade_config['first_stage'], 'cfg/fast_bow.json')
+        self.assertEqual(cascade_config['band'],
+                         config.CASCADE_DEFAULTS['band'])
+
+    def test_advertiser_index_config(self):
+        index_config = config.get_advertiser_index_config(self.config)
+        self.assertIsNone(index_config['path'])
+        self.config['advertiser_index'] = {'path': 'models/advertisers.idx',
+                                           'domain_field': 'source_url'}
+        index_config = config.get_advertiser_index_config(self.config)
+        self.assertEqual(index_config['domain_field'], 'source_url')
+        self.assertEqual(index_config['min_confidence'],
+                         config.ADVERTISER_INDEX_DEFAULTS['min_confidence'])
+
+    def test_keras_config(self):
+        self.assertEqual(config.get_keras_config(self.config)['input'], 'ids')
+        self.config['keras'] = {'input': 'vectors'}
+        self.assertEqual(config.get_keras_config(self.config)['input'],
+                         'vectors')
+        self.config['keras'] = {'input': 'tokens'}
+        with self.assertRaises(ConfigError):
+            config.get_keras_config(self.config)
+
+    def test_windowed_inference_config(self):
+        windowed_config = config.get_windowed_inference_config(self.config)
+        self.assertFalse(windowed_config['enabled'])
+        self.config['windowed_inference'] = {'enabled': True,
+                                             'aggregation': 'max'}
+        windowed_config = config.get_windowed_inference_config(self.config)
+        self.assertEqual(windowed_config['aggregation'], 'max')
+        self.assertEqual(windowed_config['window_size'], 128)
+        self.config['windowed_inference'] = {'aggregation': 'median'}
+        with self.assertRaises(ConfigError):
+            config.get_windowed_inference_config(self.config)
+        self.config['windowed_inference'] = {'window_size': 0}
+        with self.assertRaises(ConfigError):
+            config.get_windowed_inference_config(self.config)
+
+    def test_windowed_inference_growth(self):
+        self.config['windowed_inference'] = {'growth': 1}
+        self.assertEqual(
+            config.get_windowed_inference_config(self.config)['growth'], 1)
+        for growth in [0, 0.5]:
+            self.config['windowed_inference'] = {'growth': growth}
+            with self.assertRaises(ConfigError):
+                config.get_windowed_inference_config(self.config)
+
+    def test_windowed_inference_threshold(self):
+        self.config['windowed_inference'] = {'threshold': 1.0}
+        self.assertEqual(
+            config.get_windowed_inference_config(self.config)['threshold'],
+            1.0)
+        for threshold in [0, -0.5, 1.5]:
+            self.config['windowed_inference'] = {'threshold': threshold}
+            with self.assertRaises(ConfigError):
+                config.get_windowed_inference_config(self.config)
+
+    def test_distillation_config(self):
+        distillation_config = config.get_distillation_config(self.config)
+        self.assertIsNone(distillation_config['teacher'])
+        self.assertEqual(distillation_config['corpus'], [])
+        self.config['distillation'] = {'teacher': 'cfg/teacher.json',
+                                       'corpus': 'data/unlabeled.jsonl'}
+        distillation_config = config.get_distillation_config(self.config)
+        self.assertEqual(distillation_config['corpus'],
+                         ['data/unlabeled.jsonl'])
+        self.config['distillation'] = {'temperature': 0}
+        with self.assertRaises(ConfigError):
+            config.get_distillation_config(self.config)
+
+    def test_distributed_config(self):
+        self.assertIsNone(
+            config.get_distributed_config(self.config)['strategy'])
+        self.config['distributed'] = {'strategy': 'collective'}
+        distributed_config = config.get_distributed_config(self.config)
+        self.assertEqual(distributed_config['strategy'], 'collective')
+        self.assertEqual(distributed_config['evaluator_grace_secs'],
+                         config.DISTRIBUTED_DEFAULTS['evaluator_grace_secs'])
+        self.config['distributed'] = {'strategy': 'mirrored'}
+        with self.assertRaises(ConfigError):
+            config.get_distributed_config(self.config)
+
+    def test_apply_tuned_config(self):
+        model_path = tempfile.mkdtemp()
+        try:
+            self.config['model_path'] = model_path
+            self.assertIsNone(config.apply_tuned_config(self.config))
+            self.assertEqual(config.get_inference_config(self.config),
+                             config.INFERENCE_DEFAULTS)
+
+            with open(os.path.join(model_path, config.TUNED_CONFIG_NAME),
+                      'w') as tuned_fh:
+                json.dump({'inference': {'intra_op_threads': 4},
+                           'predict_batch_size': 32,
+                           'predict': {'workers': 2},
+                           'measured': {'p99_ms': 12.0}}, tuned_fh)
+            self.config['predict'] = {'workers': 8, 'format': 'jsonl'}
+            self.assertIsNotNone(config.apply_tuned_config(self.config))
+            self.assertEqual(
+                config.get_inference_config(self.config),
+                {'intra_op_threads': 4, 'inter_op_threads': None})
+            self.assertEqual(self.config['predict_batch_size'], 32)
+            self.assertEqual(self.config['predict'],
+                             {'workers': 2, 'format': 'jsonl'})
+            self.assertNotIn('measured', self.config)
+
+            self.config['use_tuned_config'] = False
+            self.assertIsNone(config.apply_tuned_config(self.config))
+        finally:
+            shutil.rmtree(model_path)
@@ -0,0 +1,124 @@
+"""unit tests for the json lines loader"""
+import os
+import json
+from unittest import TestCase
+import tempfile
+import shutil
+from tk_nn_classifier.data_loader.jsonl_loader import JSONLLoader
+from tk_nn_classifier.data_loader.data_reader import DataReader
+
+
+class JSONLLoaderTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.jsonl_file = 'tests/resource/sample.jsonl'
+        self.test_dir = tempfile.mkdtemp()
+
+        self.config = {
+            "max_lines": 5,
+            "model_path": self.test_dir,
+            "jsonl_fields": {
+                "features": ["full_text", 'advertiser.name'],
+                "class": "source_type",
+                "doc_id": "posting_id",
+                "extra": ["advertiser.name", "source.website",
+                          "source.urls.0", "source.missing"]
+            },
+            "datasets": {}
+        }
+        self.jsonl_loader = JSONLLoader(self.config)
+
+    def tearDown(self):
+        '''clean up the temp dir after test'''
+        shutil.rmtree(self.test_dir)
+
+    def test_data_reader_type(self):
+        data_reader = DataReader(self.config)
+        self.assertEqual(
+            type(data_reader._data_reader_by_input_type(self.jsonl_file)),
+            JSONLLoader)
+
+    def test_jsonl_reading(self):
+        train_examples = list(self.jsonl_loader.get_train_data(self.jsonl_file))
+        self.assertEqual(len(train_examples), 10)
+        full_text, categories = zip(*train_examples)
+        self.assertEqual(categories[3], 'no')
+        self.assertEqual(categories[4], 'yes')
+        self.assertEqual(full_text[4][0], self._get_expected_full_text())
+        self.assertEqual(full_text[4][1], 'Accounting Principals')
+
+    def test_jsonl_details(self):
+        examples = list(self.jsonl_loader.get_details(self.jsonl_file))
+        text, categories, doc_ids, org_names, sites, urls, missing = \
+            zip(*examples)
+        self.assertEqual(
+                doc_ids[0:2],
+                ('eb6de587f296446883bdf687705dc239',
+                 'cc84cf72232245adb8215c287a51b004')
+        )
+        self.assertEqual(org_names[:2], ('Weather by Healthcare', 'Aquent'))
+        self.assertEqual(sites[:2],
+                         ('weatherbyhealthcare.com', 'aquent.com'))
+        self.assertEqual(
+                urls[0:2],
+                ('https://weatherbyhealthcare.com/job/JOB-2599560',
+                 'http://aquent.com/find-work/151393')
+        )
+        self.assertEqual(set(missing), {None})
+
+    def test_line_index(self):
+        offsets = JSONLLoader.load_line_index(self.jsonl_file, cache=False)
+        self.assertEqual(len(offsets), 10)
+        self.assertEqual(offsets[0], 0)
+
+        records = list(self.jsonl_loader.get_details(self.jsonl_file,
+                                                     offsets[3:5]))
+        self.assertEqual([record[2] for record in records],
+                         ['d5d0e455d4c1402abe87b0efb8de727c',
+                          '58a8f45ba0804d20984777869bbec114'])
+
+    def test_line_index_cache(self):
+        data_path = os.path.join(self.test_dir, 'sample.jsonl')
+        shutil.copyfile(self.jsonl_file, data_path)
+        offsets = JSONLLoader.load_line_index(data_path)
+        self.assertTrue(os.path.isfile(data_path + JSONLLoader.INDEX_SUFFIX))
+        self.assertEqual(JSONLLoader.load_line_index(data_path), offsets)
+
+    def test_shards(self):
+        shards = [
+            [record[2] for record in
+             self.jsonl_loader.get_shard(self.jsonl_file, 3, shard_id,
+                                         detail=True)]
+            for shard_id in range(3)
+        ]
+        self.assertEqual([len(shard) for shard in shards], [4, 3, 3])
+        all_ids = [record[2] for record in
+                   self.jsonl_loader.get_details(self.jsonl_file)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(all_ids))
+        with self.assertRaises(ValueError):
+            JSONLLoader.shard_offsets([0], 2, 2)
+
+    def test_sample_offsets(self):
+        offsets = JSONLLoader.load_line_index(self.jsonl_file, cache=False)
+        sample = JSONLLoader.sample_offsets(offsets, 4, seed=1)
+        self.assertEqual(len(sample), 4)
+        self.assertEqual(sample, sorted(sample))
+        self.assertEqual(sample, JSONLLoader.sample_offsets(offsets, 4, seed=1))
+
+    def test_split_data(self):
+        train_file, eval_file = self.jsonl_loader.split_data(
+            self.jsonl_file, ratio=0.8, des=self.test_dir)
+        with open(train_file, encoding='utf-8') as train_fh:
+            train_records = [json.loads(line) for line in train_fh]
+        with open(eval_file, encoding='utf-8') as eval_fh:
+            eval_records = [json.loads(line) for line in eval_fh]
+        self.assertEqual(len(train_records), 8)
+        self.assertEqual(len(eval_records), 2)
+
+    def _get_expected_full_text(self):
+        return '''  Payroll Specialist
+
+  New
+  * Location
+  Brentwood, California'''
@@ -0,0 +1,45 @@
+"""unit tests for the token encoders"""
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.data_loader import TokenIdEncoder, WordVector
+from tk_nn_classifier.data_loader import TokenEncoder
+
+
+class TokenIdEncoderTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.vocab_to_ids = {WordVector.PAD: 0, WordVector.UNK: 1,
+                             'STAFFING': 2, 'AGENCY': 3}
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_encode(self):
+        encoder = TokenIdEncoder(self.vocab_to_ids)
+        self.assertEqual(encoder(['staffing agency', 'an agency']),
+                         [[2, 3], [WordVector.UNK_ID, 3]])
+        # one text per feature column
+        self.assertEqual(encoder([['staffing', 'agency'], ['', 'x']]),
+                         [[[2], [3]], [[], [WordVector.UNK_ID]]])
+
+    def test_from_vocab_file(self):
+        vocab_file = os.path.join(self.tmp_dir, 'vocab.p')
+        with open(vocab_file, 'wb') as handle:
+            pickle.dump(self.vocab_to_ids, handle)
+        encoder = TokenIdEncoder.from_vocab_file(vocab_file)
+        self.assertEqual(encoder.vocab_to_ids, self.vocab_to_ids)
+        # picklable, to be sent to the worker processes
+        self.assertEqual(pickle.loads(pickle.dumps(encoder))(['agency']),
+                         [[3]])
+
+    def test_token_encoder(self):
+        encoder = TokenEncoder()
+        self.assertEqual(encoder(['staffing agency', 'an agency']),
+                         [['STAFFING', 'AGENCY'], ['AN', 'AGENCY']])
+        self.assertEqual(pickle.loads(pickle.dumps(encoder))(['agency']),
+                         [['AGENCY']])
@@ -0,0 +1,85 @@
+"""unit tests for the knowledge distillation"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.distillation import soften, write_soft_labels
+from tk_nn_classifier.distillation import read_soft_labels, compare
+from tk_nn_classifier.distillation import is_soft_label_file
+
+
+class FakeLabelMapper:
+    def label_name(self, class_id):
+        return ['employer', 'agency'][int(class_id)]
+
+
+class KeywordModel:
+    '''probability of agency on the keyword, in the first max_words words'''
+
+    def __init__(self, max_words=100):
+        self.max_words = max_words
+        self.batches = []
+
+    def process_batch(self, texts, batch_size=None):
+        self.batches.append(len(texts))
+        return [[0.1, 0.9] if 'agency' in text.split()[:self.max_words]
+                else [0.8, 0.2] for text in texts]
+
+
+class DistillationTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.soft_label_file = os.path.join(self.tmp_dir,
+                                            'teacher.soft.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_soften(self):
+        self.assertEqual(soften([0.2, 0.8]), [0.2, 0.8])
+        softer = soften([0.2, 0.8], temperature=2)
+        self.assertAlmostEqual(sum(softer), 1.0)
+        self.assertAlmostEqual(softer[1], 0.8 ** 0.5 /
+                               (0.2 ** 0.5 + 0.8 ** 0.5))
+        self.assertGreater(soften([0.2, 0.8], temperature=0.5)[1], 0.8)
+        with self.assertRaises(ValueError):
+            soften([0.2, 0.8], temperature=0)
+
+    def test_write_and_read_soft_labels(self):
+        teacher = KeywordModel()
+        texts = ['an agency', 'a company', '', '', 'agency again']
+        num_docs = write_soft_labels(teacher, iter(texts),
+                                     self.soft_label_file, chunk_size=2)
+        # the empty texts are skipped
+        self.assertEqual(num_docs, 3)
+        self.assertEqual(teacher.batches, [2, 1])
+        self.assertTrue(is_soft_label_file(self.soft_label_file))
+        texts, soft_labels = read_soft_labels(self.soft_label_file)
+        self.assertEqual(texts, ['an agency', 'a company', 'agency again'])
+        self.assertEqual(soft_labels, [[0.1, 0.9], [0.8, 0.2], [0.1, 0.9]])
+        self.assertEqual(os.listdir(self.tmp_dir), ['teacher.soft.jsonl'])
+        with self.assertRaises(ValueError):
+            write_soft_labels(teacher, texts,
+                              os.path.join(self.tmp_dir, 'soft.jsonl'))
+
+    def test_compare(self):
+        records = [
+            ['agency first', 'agency', '1'],
+            ['word word agency', 'agency', '2'],
+            ['a company', 'employer', '3'],
+            ['a company', 'agency', '4']]
+        report = compare(KeywordModel(), KeywordModel(max_words=2),
+                         {'eval': records}, FakeLabelMapper(), batch_size=2)
+        result = report['test_sets']['eval']
+        self.assertEqual(result['documents'], 4)
+        self.assertAlmostEqual(result['teacher_accuracy'], 0.75)
+        self.assertAlmostEqual(result['student_accuracy'], 0.5)
+        self.assertAlmostEqual(result['agreement'], 0.75)
+        self.assertGreater(report['speedup'], 0)
+        # without gold labels
+        report = compare(KeywordModel(), KeywordModel(),
+                         {'corpus': [['agency', None]]}, FakeLabelMapper())
+        self.assertIsNone(report['test_sets']['corpus']['teacher_accuracy'])
+        self.assertEqual(report['test_sets']['corpus']['agreement'], 1.0)
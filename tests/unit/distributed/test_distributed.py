@@ -0,0 +1,105 @@
+"""unit tests for the cluster and the data shards of the distributed training"""
+import sys
+import time
+import json
+from unittest import TestCase
+from tk_nn_classifier.distributed import cluster_spec, task_tf_config
+from tk_nn_classifier.distributed import get_tf_config, data_shard, is_chief
+from tk_nn_classifier.distributed import LocalCluster, TF_CONFIG
+
+
+class DistributedTestCases(TestCase):
+    """unit tests"""
+
+    def test_cluster_spec(self):
+        self.assertEqual(
+            cluster_spec(3, 1, base_port=3000),
+            {'chief': ['localhost:3000'],
+             'worker': ['localhost:3001', 'localhost:3002'],
+             'ps': ['localhost:3003']})
+        # no empty task types
+        self.assertEqual(cluster_spec(1), {'chief': ['localhost:2222']})
+        with self.assertRaises(ValueError):
+            cluster_spec(0)
+
+    def test_get_tf_config(self):
+        self.assertEqual(get_tf_config({}), {})
+        tf_config = task_tf_config(cluster_spec(2), 'worker', 0)
+        self.assertEqual(get_tf_config({TF_CONFIG: tf_config})['task'],
+                         {'type': 'worker', 'index': 0})
+
+    def test_data_shard(self):
+        cluster = cluster_spec(3, 1)
+
+        def shard(task_type, index=0):
+            return data_shard(json.loads(
+                task_tf_config(cluster, task_type, index)))
+
+        self.assertEqual(data_shard({}), (1, 0))
+        self.assertEqual(shard('chief'), (3, 0))
+        self.assertEqual(shard('worker', 0), (3, 1))
+        self.assertEqual(shard('worker', 1), (3, 2))
+        self.assertIsNone(shard('ps'))
+        self.assertIsNone(shard('evaluator'))
+        # without chief, the workers from 0
+        self.assertEqual(data_shard({
+            'cluster': {'worker': ['a:1', 'b:1']},
+            'task': {'type': 'worker', 'index': 1}}), (2, 1))
+
+    def test_is_chief(self):
+        self.assertTrue(is_chief({}))
+        cluster = cluster_spec(2)
+        self.assertTrue(is_chief(json.loads(
+            task_tf_config(cluster, 'chief'))))
+        self.assertFalse(is_chief(json.loads(
+            task_tf_config(cluster, 'worker'))))
+        self.assertFalse(is_chief(json.loads(
+            task_tf_config(cluster, 'evaluator'))))
+        self.assertTrue(is_chief({
+            'cluster': {'worker': ['a:1', 'b:1']},
+            'task': {'type': 'worker', 'index': 0}}))
+
+    def test_local_cluster(self):
+        # each process prints its task, the ps would run forever
+        command = [sys.executable, '-c',
+                   'import os, json, time\n'
+                   'task = json.loads(os.environ["TF_CONFIG"])["task"]\n'
+                   'if task["type"] == "ps":\n'
+                   '    time.sleep(60)\n']
+        cluster = LocalCluster(command, num_workers=2, num_ps=1,
+                               base_port=3000, evaluator_grace_secs=0)
+        self.assertEqual(cluster.tasks(),
+                         [('ps', 0), ('chief', 0), ('worker', 0),
+                          ('evaluator', 0)])
+        self.assertEqual(
+            json.loads(cluster.task_environ('worker', 0)[TF_CONFIG]),
+            {'cluster': cluster.cluster,
+             'task': {'type': 'worker', 'index': 0}})
+        self.assertTrue(cluster.run())
+        self.assertTrue(all(process.poll() is not None
+                            for process in cluster.processes.values()))
+
+    def test_local_cluster_failure(self):
+        command = [sys.executable, '-c',
+                   'import os, json, sys\n'
+                   'task = json.loads(os.environ["TF_CONFIG"])["task"]\n'
+                   'sys.exit(task["type"] == "worker")\n']
+        cluster = LocalCluster(command, num_workers=2, evaluator=False,
+                               evaluator_grace_secs=0)
+        self.assertFalse(cluster.run())
+
+    def test_local_cluster_stops_on_failure(self):
+        # the chief would wait forever for the failed worker
+        command = [sys.executable, '-c',
+                   'import os, json, sys, time\n'
+                   'task = json.loads(os.environ["TF_CONFIG"])["task"]\n'
+                   'if task["type"] == "worker":\n'
+                   '    sys.exit(1)\n'
+                   'time.sleep(60)\n']
+        cluster = LocalCluster(command, num_workers=2, num_ps=1,
+                               base_port=3100, evaluator_grace_secs=0)
+        start = time.time()
+        self.assertFalse(cluster.run())
+        self.assertLess(time.time() - start, 30)
+        self.assertTrue(all(process.poll() is not None
+                            for process in cluster.processes.values()))
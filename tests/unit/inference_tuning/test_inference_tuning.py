@@ -0,0 +1,32 @@
+"""unit tests for the choice of the inference options"""
+from unittest import TestCase
+from tk_nn_classifier.inference_tuning import InferenceTuner
+
+
+def _result(batch_size, p99, docs_per_sec):
+    return {'intra_op_threads': 1, 'inter_op_threads': 1,
+            'batch_size': batch_size, 'p50': p99 / 2, 'p99': p99,
+            'docs_per_sec': docs_per_sec}
+
+
+class InferenceTunerTestCases(TestCase):
+    """unit tests"""
+
+    def tuner(self, max_p99_ms=None):
+        tuner = InferenceTuner({}, ['a text'], threads=[(1, 1)],
+                               batch_sizes=[1, 32, 128], workers=[1],
+                               max_p99_ms=max_p99_ms)
+        tuner.results = [_result(1, 2.0, 500.0), _result(32, 20.0, 1600.0),
+                         _result(128, 90.0, 1400.0)]
+        return tuner
+
+    def test_best_session(self):
+        self.assertEqual(self.tuner().best_session()['batch_size'], 32)
+        # the fastest within the latency limit
+        self.assertEqual(self.tuner(10.0).best_session()['batch_size'], 1)
+        # the lowest latency if none is within the limit
+        self.assertEqual(self.tuner(1.0).best_session()['batch_size'], 1)
+
+    def test_no_documents(self):
+        with self.assertRaises(ValueError):
+            InferenceTuner({}, [], [(1, 1)], [1], [1])
@@ -0,0 +1,171 @@
+"""unit tests for the prediction pipeline"""
+import io
+import json
+from unittest import TestCase
+from tk_nn_classifier.predict_pipeline import PredictionPipeline, \
+    PredictionWriter
+from tk_nn_classifier.prediction_cache import PredictionCache
+from tk_nn_classifier.cascade import StagedProbabilities
+
+
+class LengthEncoder:
+    '''encode a text to its number of words'''
+
+    def __call__(self, texts):
+        return [len(text.split()) for text in texts]
+
+
+class FakeModel:
+    '''probability of the second class grows with the number of words'''
+
+    def __init__(self, encoder=None):
+        self.encoder = encoder
+        self.batch_sizes = []
+
+    def text_encoder(self):
+        return self.encoder
+
+    def process_encoded_batch(self, encoded, batch_size=None):
+        self.batch_sizes.append(len(encoded))
+        if self.encoder is None:
+            encoded = LengthEncoder()(encoded)
+        return [[1 / (1 + length), length / (1 + length)]
+                for length in encoded]
+
+
+class FakeCachedModel(FakeModel):
+    def __init__(self, encoder=None):
+        super().__init__(encoder)
+        self.cache = PredictionCache('fake')
+
+    def cached_predictions(self, texts):
+        return self.cache.get_many(texts)
+
+    def cache_predictions(self, texts, all_probabilities):
+        self.cache.put_many(texts, all_probabilities)
+
+
+class FakeLabelMapper:
+    def label_name(self, class_id):
+        return ['employer', 'agency'][class_id]
+
+
+def records(size):
+    for index in range(size):
+        yield [' '.join(['word'] * (index % 3)), 'agency', str(index), 'x']
+
+
+class PredictionPipelineTestCases(TestCase):
+    """unit tests"""
+
+    def run_pipeline(self, model, size, lookup=None, **options):
+        predictions = []
+        pipeline = PredictionPipeline(model, **options)
+        count = pipeline.run(
+            records(size),
+            lambda record, probabilities:
+                predictions.append((record[2], probabilities)),
+            lookup)
+        self.assertEqual(count, size)
+        return predictions
+
+    def test_predict_in_order(self):
+        for workers in [0, 2]:
+            model = FakeModel(LengthEncoder())
+            predictions = self.run_pipeline(model, 103, batch_size=10,
+                                            workers=workers, queue_size=2)
+            self.assertEqual([doc_id for doc_id, _ in predictions],
+                             [str(index) for index in range(103)])
+            self.assertEqual(predictions[4][1], [1 / 2, 1 / 2])
+            self.assertEqual(model.batch_sizes, [10] * 10 + [3])
+
+    def test_predict_without_encoder(self):
+        predictions = self.run_pipeline(FakeModel(), 5, batch_size=2)
+        self.assertEqual(predictions[2][1], [1 / 3, 2 / 3])
+
+    def test_predict_with_cache(self):
+        model = FakeCachedModel(LengthEncoder())
+        predictions = self.run_pipeline(model, 10, batch_size=4, workers=0)
+        batch_sizes = list(model.batch_sizes)
+        # all texts are cached in the second run
+        self.assertEqual(self.run_pipeline(model, 10, batch_size=4),
+                         predictions)
+        self.assertEqual(model.batch_sizes, batch_sizes)
+
+    def test_predict_with_lookup(self):
+        model = FakeCachedModel(LengthEncoder())
+
+        def lookup(batch):
+            # the records without words are known
+            return [[1.0, 0.0] if not record[0] else None
+                    for record in batch]
+
+        predictions = self.run_pipeline(model, 9, lookup, batch_size=3,
+                                        workers=0)
+        self.assertEqual([doc_id for doc_id, _ in predictions],
+                         [str(index) for index in range(9)])
+        self.assertEqual(predictions[0][1], [1.0, 0.0])
+        # the known records are not predicted, nor cached
+        self.assertEqual(model.batch_sizes, [2, 2, 2])
+        self.assertEqual(model.cached_predictions(['']), [None])
+
+    def test_stage_failure(self):
+        def failing_records():
+            yield from records(25)
+            raise IOError('broken input')
+
+        pipeline = PredictionPipeline(FakeModel(LengthEncoder()),
+                                      batch_size=4, workers=1, queue_size=1)
+        with self.assertRaises(IOError):
+            pipeline.run(failing_records(), lambda *_: None)
+
+        def failing_write(record, probabilities):
+            raise ValueError('broken output')
+
+        with self.assertRaises(ValueError):
+            pipeline.run(records(100), failing_write)
+
+    def test_writers(self):
+        detail_fields = ['text', 'class', 'doc_id', 'source']
+        record = ['text', 'agency', 'doc_1', 'web']
+        output_fh = io.StringIO()
+        writer = PredictionWriter.create('tsv', output_fh, detail_fields,
+                                         FakeLabelMapper())
+        writer.write(record, [0.9, 0.1])
+        self.assertEqual(
+            output_fh.getvalue().splitlines(),
+            ['doc_id\tnew\told\tsource\tprobabilities',
+             'doc_1\temployer\tagency\tweb\t[0.9, 0.1]'])
+
+        output_fh = io.StringIO()
+        writer = PredictionWriter.create('jsonl', output_fh, detail_fields)
+        writer.write(record, [0.1, 0.9])
+        self.assertEqual(json.loads(output_fh.getvalue()),
+                         {'id': 'doc_1', 'new': '1', 'old': 'agency',
+                          'source': 'web', 'probabilities': [0.1, 0.9]})
+        with self.assertRaises(ValueError):
+            PredictionWriter.create('xml', output_fh, detail_fields)
+
+    def test_writers_with_stages(self):
+        detail_fields = ['text', 'class', 'doc_id', 'source']
+        record = ['text', 'agency', 'doc_1', 'web']
+        output_fh = io.StringIO()
+        writer = PredictionWriter.create('tsv', output_fh, detail_fields,
+                                         FakeLabelMapper(), stages=True)
+        writer.write(record, StagedProbabilities([0.9, 0.1], 'first'))
+        # cached without a recorded stage
+        writer.write(record, [0.2, 0.8])
+        self.assertEqual(
+            output_fh.getvalue().splitlines(),
+            ['doc_id\tnew\told\tsource\tstage\tprobabilities',
+             'doc_1\temployer\tagency\tweb\tfirst\t[0.9, 0.1]',
+             'doc_1\tagency\tagency\tweb\tcache\t[0.2, 0.8]'])
+
+        output_fh = io.StringIO()
+        writer = PredictionWriter.create('jsonl', output_fh, detail_fields,
+                                         stages=True)
+        writer.write(record, StagedProbabilities([0.1, 0.9], 'second'))
+        self.assertEqual(json.loads(output_fh.getvalue()),
+                         {'id': 'doc_1', 'new': '1', 'old': 'agency',
+                          'source': 'web', 'stage': 'second',
+                          'probabilities': [0.1, 0.9]})
@@ -0,0 +1,98 @@
+"""unit tests for the prediction cache"""
+import os
+import time
+import sqlite3
+import shutil
+import tempfile
+from unittest import TestCase
+from tk_nn_classifier.prediction_cache import PredictionCache, \
+    model_identity, normalize_text
+
+
+class PredictionCacheTestCases(TestCase):
+    """unit tests"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.predicted = []
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def predict(self, texts):
+        self.predicted.extend(texts)
+        return [[0.0, 1.0] if 'agency' in text else [1.0, 0.0]
+                for text in texts]
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text(' a\n\n b\tc '), 'a b c')
+        self.assertEqual(normalize_text(['a  b', 'c']), 'a b\x1fc')
+
+    def test_memory_tier(self):
+        cache = PredictionCache('model', max_size=2)
+        self.assertEqual(
+            cache.process(['agency', 'firm', ' agency '], self.predict),
+            [[0.0, 1.0], [1.0, 0.0], [0.0, 1.0]])
+        # the duplicates are predicted once
+        self.assertEqual(self.predicted, ['agency', 'firm'])
+        cache.process(['firm\n', 'agency'], self.predict)
+        self.assertEqual(self.predicted, ['agency', 'firm'])
+        # least recently used is dropped
+        cache.process(['other'], self.predict)
+        cache.process(['firm'], self.predict)
+        self.assertEqual(self.predicted, ['agency', 'firm', 'other', 'firm'])
+        self.assertEqual(cache.stats(), {'hits': 2, 'disk_hits': 0,
+                                         'misses': 5, 'hit_rate': 2 / 7})
+
+    def test_disk_tier(self):
+        path = os.path.join(self.test_dir, 'cache.sqlite')
+        cache = PredictionCache('model', path=path)
+        cache.process(['agency', 'firm'], self.predict)
+        cache.close()
+
+        cache = PredictionCache('model', path=path)
+        self.assertEqual(cache.get_many(['agency', 'new']),
+                         [[0.0, 1.0], None])
+        self.assertEqual(cache.disk_hits, 1)
+        cache.close()
+
+        # another model doesn't see the predictions
+        cache = PredictionCache('other model', path=path)
+        self.assertEqual(cache.get_many(['agency']), [None])
+        cache.close()
+
+    def test_disk_tier_without_stages(self):
+        # cache file of a version not recording the stages
+        path = os.path.join(self.test_dir, 'cache.sqlite')
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE predictions '
+                           '(key TEXT PRIMARY KEY, probabilities TEXT)')
+        cache = PredictionCache('model')
+        connection.execute('INSERT INTO predictions VALUES (?, ?)',
+                           (cache.key('agency'), '[0.0, 1.0]'))
+        connection.commit()
+        connection.close()
+
+        cache = PredictionCache('model', path=path)
+        self.assertEqual(cache.process(['agency', 'firm'], self.predict),
+                         [[0.0, 1.0], [1.0, 0.0]])
+        self.assertEqual(self.predicted, ['firm'])
+        cache.close()
+
+    def test_model_identity(self):
+        model_file = os.path.join(self.test_dir, 'saved_model.pb')
+        with open(model_file, 'w') as model_fh:
+            model_fh.write('v1')
+        identity = model_identity(self.test_dir, {'max_sequence_length': 10})
+        self.assertEqual(
+            identity,
+            model_identity(self.test_dir, {'max_sequence_length': 10}))
+        self.assertNotEqual(
+            identity,
+            model_identity(self.test_dir, {'max_sequence_length': 20}))
+        time.sleep(0.01)
+        with open(model_file, 'w') as model_fh:
+            model_fh.write('v2')
+        self.assertNotEqual(
+            identity,
+            model_identity(self.test_dir, {'max_sequence_length': 10}))
@@ -0,0 +1,148 @@
+"""unit tests for the micro batching prediction server"""
+import json
+import time
+import asyncio
+import threading
+import http.client
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from tk_nn_classifier.config import SERVING_DEFAULTS
+from tk_nn_classifier.server import PredictionServer
+from tk_nn_classifier.cascade import Cascade
+from tk_nn_classifier.prediction_cache import PredictionCache
+
+
+class FakeModel:
+    '''agency if the text mentions agency, records the batch sizes'''
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def process_batch(self, texts, batch_size=None):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(texts))
+        return [[0.0, 1.0] if 'agency' in text else [1.0, 0.0]
+                for text in texts]
+
+
+class CachedCascadeModel:
+    '''the fake model as second stage of a cascade, behind the cache'''
+
+    def __init__(self):
+        self.second_stage = FakeModel()
+        self.cascade = Cascade(FakeModel(), band=(0.0, 0.5))
+        self.cache = PredictionCache('model')
+
+    def process_batch(self, texts, batch_size=None):
+        return self.cache.process(
+            texts,
+            lambda inputs: self.cascade.process(
+                inputs, self.second_stage.process_batch, batch_size))
+
+
+class ServerTestCases(TestCase):
+    """unit tests"""
+
+    def start_server(self, model, **options):
+        serving_config = dict(SERVING_DEFAULTS, port=0, **options)
+        self.server = PredictionServer(model, serving_config,
+                                       labels=['employer', 'agency'])
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(),
+                                         self.loop).result()
+        self.stopped = False
+
+    def stop_server(self):
+        if not self.stopped:
+            self.stopped = True
+            asyncio.run_coroutine_threadsafe(self.server.stop(),
+                                             self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+    def tearDown(self):
+        self.stop_server()
+
+    def request(self, method, path, payload=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port,
+                                                timeout=10)
+        body = None if payload is None else json.dumps(payload)
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        result = response.status, json.loads(response.read().decode('utf-8'))
+        connection.close()
+        return result
+
+    def test_predict(self):
+        self.start_server(FakeModel())
+        self.assertEqual(self.request('GET', '/health'),
+                         (200, {'status': 'ok'}))
+        self.assertEqual(
+            self.request('POST', '/predict', {'text': 'a staffing agency'}),
+            (200, {'probabilities': [0.0, 1.0], 'label': 'agency'}))
+        status, result = self.request(
+            'POST', '/predict', {'texts': ['agency', 'our company']})
+        self.assertEqual(status, 200)
+        self.assertEqual([prediction['label']
+                          for prediction in result['predictions']],
+                         ['agency', 'employer'])
+
+    def test_cascade_stages(self):
+        self.start_server(CachedCascadeModel())
+        for _ in range(2):
+            # predicted, then from the cache
+            status, result = self.request(
+                'POST', '/predict', {'texts': ['agency', 'our company']})
+            self.assertEqual(status, 200)
+            self.assertEqual([prediction['stage']
+                              for prediction in result['predictions']],
+                             ['first', 'second'])
+
+    def test_bad_requests(self):
+        self.start_server(FakeModel())
+        self.assertEqual(self.request('POST', '/predict', {'txt': 'a'})[0],
+                         400)
+        self.assertEqual(self.request('POST', '/predict', {'texts': []})[0],
+                         400)
+        self.assertEqual(self.request('GET', '/predict')[0], 405)
+        self.assertEqual(self.request('GET', '/unknown')[0], 404)
+
+    def test_micro_batching(self):
+        model = FakeModel()
+        self.start_server(model, max_batch_size=4, max_wait_ms=500)
+        texts = ['text %d' % i for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda text: self.request('POST', '/predict', {'text': text}),
+                texts))
+        self.assertTrue(all(status == 200 for status, _ in results))
+        self.assertEqual(sum(model.batch_sizes), 8)
+        self.assertLessEqual(max(model.batch_sizes), 4)
+        self.assertLess(len(model.batch_sizes), 8)
+
+    def test_back_pressure_and_timeout(self):
+        self.start_server(FakeModel(delay=0.5), max_batch_size=1,
+                          max_wait_ms=0, max_queue_size=2,
+                          request_timeout=0.2)
+        # more texts than the queue can hold
+        status, _ = self.request('POST', '/predict',
+                                 {'texts': ['a', 'b', 'c']})
+        self.assertEqual(status, 503)
+        status, result = self.request('POST', '/predict', {'text': 'a'})
+        self.assertEqual(status, 504)
+        self.assertEqual(result, {'error': 'request timeout'})
+
+    def test_graceful_shutdown(self):
+        model = FakeModel(delay=0.3)
+        self.start_server(model, max_batch_size=1, max_wait_ms=0)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self.request, 'POST', '/predict',
+                                      {'text': 'agency'})
+            time.sleep(0.1)
+            self.stop_server()
+            self.assertEqual(pending.result()[0], 200)
+        self.assertEqual(model.batch_sizes, [1])
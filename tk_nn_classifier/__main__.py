@@ -4,38 +4,61 @@ import os
 from argparse import ArgumentParser
 import logging
 import csv
+import json
 from tk_nn_classifier.model import Model
-from tk_nn_classifier.config import load_config
+from tk_nn_classifier.config import load_config, get_serving_config
+from tk_nn_classifier.config import get_predict_config, TUNED_CONFIG_NAME
+from tk_nn_classifier.config import get_distributed_config
+from tk_nn_classifier.config import get_advertiser_index_config
+from tk_nn_classifier.config import get_distillation_config
 from tk_nn_classifier.data_loader import DataReader
+from tk_nn_classifier.cascade import decided_by
 from tk_nn_classifier import set_logging_level, LOGGER
 from tk_nn_classifier.classifiers.utils import TrainHelper, FileHelper
+from tk_nn_classifier.classifiers.utils import BenchmarkHelper
 
-def process_batch(model, reader, data_set, config):
+def process_batch(model, reader, data_set, config, batch_size=None):
+    if reader.label_mapper is None:
+        # the predicted classes are named by the label mapper of the training
+        raise ValueError('no label mapper file %s, eval needs the label '
+                         'mapper of the trained model' %
+                         config['datasets']['label_mapper'])
     result = []
     input_data = reader.get_data_set_with_detail(
             config['datasets']['test'][data_set]
     )
 
     detail_fields = reader._detail_fields(config['datasets']['test'][data_set])
+    stages = model.has_stages()
     header = [detail_fields[2], 'new',  'old'] + detail_fields[3:] + \
-             ['probabilities']
+        (['stage'] if stages else []) + ['probabilities']
     result.append(header)
-    for test_text, category, id, *extra in input_data:
-        probabilities = model.process_with_saved_model(test_text)
-        if type(probabilities) is list:
-            predicted_class = max(range(len(probabilities)),
-                                  key=probabilities.__getitem__)
-            predicted_class = reader.label_mapper.label_name(predicted_class)
-        elif type(probabilities) is dict:
-            predicted_class = max(probabilities, key=probabilities.get)
-        else:
-            raise ValueError("unknown type", type(probabilities))
+    lookup = model.advertiser_lookup(detail_fields, reader.label_mapper)
+    known = [None] * len(input_data) if lookup is None else lookup(input_data)
+    # the known advertisers are not predicted
+    texts = [test_text for (test_text, *_), probabilities
+             in zip(input_data, known) if probabilities is None]
+    predicted = iter(model.process_batch(
+        texts,
+        batch_size=batch_size
+    ) if texts else [])
+    all_probabilities = [
+        next(predicted) if probabilities is None else probabilities
+        for probabilities in known]
+    for (test_text, category, id, *extra), probabilities in zip(
+            input_data, all_probabilities):
+        predicted_class = max(range(len(probabilities)),
+                              key=probabilities.__getitem__)
+        predicted_class = reader.label_mapper.label_name(predicted_class)
 
         result.append(
             [
                 entry if entry is not None else ''
                 for entry in [id, predicted_class,
-                              category, *extra, str(probabilities)]
+                              category, *extra,
+                              *([decided_by(probabilities, 'cache')]
+                                if stages else []),
+                              str(probabilities)]
             ]
         )
     return result
@@ -44,10 +67,41 @@ def process_batch(model, reader, data_set, config):
 def train(args):
     config = load_config(args.config)
     config['action'] = 'train'
+    if args.strategy is not None:
+        config['distributed'] = dict(config.get('distributed') or {},
+                                     strategy=args.strategy)
     model = Model(config)
     model.build_and_train()
 
 
+def train_distributed(args):
+    from tk_nn_classifier.distributed import LocalCluster, train_command
+
+    config = load_config(args.config)
+    if not config['model_type'].startswith('tf'):
+        raise ValueError('only the tensorflow models can be trained '
+                         'distributed, not %s' % config['model_type'])
+    distributed_config = get_distributed_config(
+        dict(config, distributed=dict(config.get('distributed') or {},
+                                      strategy=args.strategy)))
+    num_ps = args.ps
+    if num_ps is None:
+        num_ps = 1 if args.strategy == 'parameter_server' else 0
+    if args.strategy == 'parameter_server' and num_ps < 1:
+        raise ValueError('the parameter_server strategy needs a ps')
+    if args.strategy == 'collective' and num_ps:
+        raise ValueError('the collective strategy runs without ps')
+    cluster = LocalCluster(
+        train_command(args.config, args.strategy),
+        num_workers=args.workers,
+        num_ps=num_ps,
+        evaluator=not args.no_evaluator,
+        base_port=args.port,
+        evaluator_grace_secs=distributed_config['evaluator_grace_secs'])
+    if not cluster.run():
+        raise SystemExit('the distributed training failed')
+
+
 def eval(args):
     config = load_config(args.config)
     config['action'] = 'predict'
@@ -69,7 +123,8 @@ def eval(args):
             model,
             data_reader,
             data_set,
-            config
+            config,
+            batch_size=args.batch_size
         )
         LOGGER.info('save result to [%s]', output_file)
         with open(output_file, 'w', newline='') as output_fh:
@@ -80,11 +135,345 @@ def eval(args):
         TrainHelper.print_test_result(
             _get_column(result, 1),
             _get_column(result, 2))
+    model.report_stats()
+
+
+def _load_prediction_pipeline(args):
+    from tk_nn_classifier.predict_pipeline import PredictionPipeline
+
+    config = load_config(args.config)
+    config['action'] = 'predict'
+    model = Model(config)
+    # after the tuned config of the model is applied
+    model.load()
+
+    predict_config = get_predict_config(config)
+    for option in ['workers', 'queue_size', 'format', 'chunk_size']:
+        if getattr(args, option, None) is not None:
+            predict_config[option] = getattr(args, option)
+    if predict_config['workers'] is None:
+        predict_config['workers'] = max(1, (os.cpu_count() or 1) - 1)
+
+    pipeline = PredictionPipeline(
+        model,
+        batch_size=model.predict_batch_size(args.batch_size),
+        workers=predict_config['workers'],
+        queue_size=predict_config['queue_size'])
+    return model, pipeline, predict_config
+
+
+def _data_sets_to_predict(args, config):
+    if args.input:
+        name = os.path.splitext(os.path.basename(args.input.rstrip('/')))[0]
+        return {name: args.input}
+    if args.test_set:
+        return {name: config['datasets']['test'][name]
+                for name in args.test_set.split(",")}
+    return config['datasets']['test']
 
 
 def predict(args):
-    # TODO: convert the script predict to here
-    pass
+    from tk_nn_classifier.predict_pipeline import PredictionWriter
+
+    model, pipeline, predict_config = _load_prediction_pipeline(args)
+    data_reader = DataReader(model.config)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for name, data_path in _data_sets_to_predict(args, model.config).items():
+        output_file = os.path.join(args.output_dir,
+                                   name + '.' + predict_config['format'])
+        LOGGER.info('predict [%s] to [%s]', data_path, output_file)
+        with open(output_file, 'w', newline='', encoding='utf-8') as output_fh:
+            writer = PredictionWriter.create(
+                predict_config['format'],
+                output_fh,
+                data_reader._detail_fields(data_path),
+                data_reader.label_mapper,
+                stages=model.has_stages())
+            count = pipeline.run(
+                data_reader.iter_data_set_with_detail(data_path),
+                writer.write,
+                model.advertiser_lookup(data_reader._detail_fields(data_path),
+                                        data_reader.label_mapper))
+        LOGGER.info('predicted %d documents', count)
+    model.report_stats()
+
+
+def score(args):
+    from tk_nn_classifier.batch_scoring import ChunkedScorer
+
+    model, pipeline, predict_config = _load_prediction_pipeline(args)
+    data_reader = DataReader(model.config)
+
+    for name, data_path in _data_sets_to_predict(args, model.config).items():
+        scorer = ChunkedScorer(
+            os.path.join(args.output_dir, name),
+            chunk_size=predict_config['chunk_size'],
+            num_shards=args.num_shards,
+            shard_id=args.shard,
+            output_format=predict_config['format'],
+            stages=model.has_stages())
+        LOGGER.info('score [%s] to [%s], shard %d of %d', data_path,
+                    scorer.output_dir, args.shard, args.num_shards)
+        num_chunks, count = scorer.score(
+            pipeline, data_reader, data_path,
+            model.advertiser_lookup(data_reader._detail_fields(data_path),
+                                    data_reader.label_mapper))
+        LOGGER.info('scored %d documents in %d chunks', count, num_chunks)
+    model.report_stats()
+
+
+def serve(args):
+    from tk_nn_classifier.server import PredictionServer
+
+    config = load_config(args.config)
+    config['action'] = 'predict'
+    model = Model(config)
+    model.load()
+
+    serving_config = get_serving_config(config)
+    if args.host is not None:
+        serving_config['host'] = args.host
+    if args.port is not None:
+        serving_config['port'] = args.port
+    label_mapper = DataReader(model.config).label_mapper
+    labels = [label_mapper.label_name(class_id)
+              for class_id in range(len(label_mapper.classid_to_label))]
+    PredictionServer(model, serving_config, labels=labels).serve_forever()
+    model.report_stats()
+
+
+def export(args):
+    config = load_config(args.config)
+    if not config['model_type'].startswith('tf'):
+        raise ValueError('only the tensorflow models can be frozen, not %s' %
+                         config['model_type'])
+    from tk_nn_classifier.classifiers.tf_frozen_export import \
+        freeze_saved_model, latest_export_dir, FROZEN_EXPORT_NAME
+
+    # checked before the freeze
+    test_paths = _report_test_paths(config) if args.report else None
+    saved_model_dir = args.saved_model or \
+        latest_export_dir(config, 'best_exporter')
+    output_dir = args.output_dir or os.path.join(
+        config['model_path'], 'export', FROZEN_EXPORT_NAME,
+        os.path.basename(saved_model_dir.rstrip('/')))
+    freeze_saved_model(saved_model_dir, output_dir,
+                       optimize=not args.no_optimize, xla=args.xla,
+                       prune=args.prune, quantize=args.quantize)
+    if args.report:
+        _export_report(config, {'saved_model': saved_model_dir,
+                                'export': output_dir}, test_paths,
+                       args.batch_size)
+
+
+def _report_test_paths(config):
+    '''the test sets of the export report, default to the eval set'''
+    test_paths = config['datasets'].get('test')
+    if not test_paths and config['datasets'].get('eval'):
+        test_paths = {'eval': config['datasets']['eval']}
+    if not test_paths:
+        raise ValueError('the export report needs a test or an eval set with '
+                         'gold labels')
+    return test_paths
+
+
+def _export_report(config, model_paths, test_paths, batch_size=None):
+    '''size, latency and accuracy on the test sets of each model'''
+    config = dict(config, action='predict',
+                  prediction_cache={'enabled': False})
+    data_reader = DataReader(config)
+    test_sets = {
+        name: data_reader.get_data_set_with_detail(data_path)
+        for name, data_path in test_paths.items()}
+    rows = []
+    for name, model_path in model_paths.items():
+        model = Model(config)
+        model.load(model_path)
+        predict_batch_size = model.predict_batch_size(batch_size)
+        row = [name,
+               BenchmarkHelper.folder_size(model_path) / 2 ** 20,
+               BenchmarkHelper.folder_size(model_path, compress=True) /
+               2 ** 20]
+        texts = [text for text, *_ in next(iter(test_sets.values()))]
+        latency = BenchmarkHelper.measure_latency(
+            lambda batch: model.process_batch(batch, predict_batch_size),
+            [texts[start:start + predict_batch_size]
+             for start in range(0, len(texts), predict_batch_size)])
+        row += [latency['p50'], latency['p99']]
+        for records in test_sets.values():
+            all_probabilities = model.process_batch(
+                [text for text, *_ in records], predict_batch_size)
+            row.append(sum(
+                data_reader.label_mapper.label_name(
+                    max(range(len(probabilities)),
+                        key=probabilities.__getitem__)) == category
+                for (_, category, *_), probabilities
+                in zip(records, all_probabilities)) / max(1, len(records)))
+        rows.append(row)
+
+    print('\t'.join(['model', 'size(MB)', 'gzip(MB)', 'p50(ms)', 'p99(ms)'] +
+                    ['acc_' + name for name in test_sets]))
+    change = ['change'] + [
+        value - base for value, base in zip(rows[-1][1:], rows[0][1:])]
+    for row in rows + [change]:
+        values = ['{:.4f}'.format(value) for value in row[1:]]
+        print('\t'.join([row[0]] + values))
+
+
+def tune_inference(args):
+    import itertools
+    from tk_nn_classifier.inference_tuning import InferenceTuner
+    from tk_nn_classifier.inference_tuning import write_tuned_config
+
+    config = load_config(args.config)
+    config['action'] = 'predict'
+    data_sets = _data_sets_to_predict(args, config)
+    data_path = next(iter(data_sets.values()))
+    LOGGER.info('tune on %d documents of [%s]', args.max_docs, data_path)
+    records = DataReader(config).iter_data_set_with_detail(data_path)
+    texts = [text for text, *_ in itertools.islice(records, args.max_docs)]
+
+    tuner = InferenceTuner(
+        config,
+        texts,
+        threads=list(itertools.product(_int_list(args.intra_op_threads),
+                                       _int_list(args.inter_op_threads))),
+        batch_sizes=_int_list(args.batch_sizes),
+        workers=_int_list(args.workers),
+        max_p99_ms=args.max_p99_ms)
+    tuned_config = tuner.tune()
+    write_tuned_config(
+        tuned_config,
+        args.output or os.path.join(config['model_path'], TUNED_CONFIG_NAME))
+    print(json.dumps(tuned_config, indent=2))
+
+
+def build_index(args):
+    import itertools
+    from tk_nn_classifier.advertiser_index import build_index as build
+    from tk_nn_classifier.advertiser_index import labelled_advertisers
+
+    config = load_config(args.config)
+    index_config = get_advertiser_index_config(config)
+    if index_config['org_field'] is None and \
+            index_config['domain_field'] is None:
+        raise ValueError('set the org_field and/or the domain_field of the '
+                         'advertiser_index block')
+    output_file = args.output or index_config['path']
+    if output_file is None:
+        raise ValueError('set the path of the advertiser_index block, or '
+                         '--output')
+    if args.input:
+        data_paths = args.input.split(',')
+    else:
+        data_paths = [config['datasets'][name]
+                      for name in ['train', 'eval', 'all_data']
+                      if name in config['datasets']]
+    data_reader = DataReader(config)
+    advertisers = itertools.chain.from_iterable(
+        labelled_advertisers(data_reader.iter_data_set_with_detail(data_path),
+                             data_reader._detail_fields(data_path),
+                             index_config['org_field'],
+                             index_config['domain_field'])
+        for data_path in data_paths)
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    build(advertisers, output_file,
+          min_count=args.min_count or index_config['min_count'],
+          header={'data_paths': data_paths,
+                  'org_field': index_config['org_field'],
+                  'domain_field': index_config['domain_field']})
+
+
+def distill(args):
+    import shutil
+    import itertools
+    from tk_nn_classifier.distillation import write_soft_labels, compare
+    from tk_nn_classifier.distillation import print_report, SOFT_LABEL_SUFFIX
+
+    config = load_config(args.config)
+    if not config['model_type'].startswith('tf') or \
+            config['model_type'].startswith('tf_multi_feat'):
+        raise ValueError('the student needs to be a tensorflow text model, '
+                         'not %s' % config['model_type'])
+    if 'eval' not in config['datasets']:
+        raise ValueError('the student needs an eval set with gold labels')
+    distillation_config = get_distillation_config(config)
+    teacher_config_file = args.teacher or distillation_config['teacher']
+    if teacher_config_file is None:
+        raise ValueError('set the teacher of the distillation block, or '
+                         '--teacher')
+
+    teacher_config = load_config(teacher_config_file)
+    teacher_config['action'] = 'predict'
+    # every document needs to be predicted
+    teacher_config['prediction_cache'] = {'enabled': False}
+    teacher = Model(teacher_config)
+    teacher.load()
+    teacher_label_mapper = DataReader(teacher_config).label_mapper
+    if teacher_label_mapper is None:
+        raise ValueError('no label mapper of the teacher %s' %
+                         teacher_config['datasets']['label_mapper'])
+
+    # the student predicts the classes of the teacher
+    os.makedirs(config['model_path'], exist_ok=True)
+    student_reader = DataReader(config)
+    if student_reader.label_mapper is None:
+        shutil.copy(teacher_label_mapper.label_mapper_file,
+                    config['datasets']['label_mapper'])
+    elif student_reader.label_mapper != teacher_label_mapper:
+        raise ValueError('the label mappers of the teacher and the student '
+                         'differ')
+
+    soft_label_file = args.soft_labels or \
+        distillation_config['soft_labels'] or \
+        os.path.join(config['model_path'], 'teacher' + SOFT_LABEL_SUFFIX)
+    if args.reuse_soft_labels and os.path.isfile(soft_label_file):
+        LOGGER.info('reuse the soft labels of %s', soft_label_file)
+    else:
+        if args.corpus:
+            corpus = args.corpus.split(',')
+        else:
+            corpus = distillation_config['corpus'] or \
+                [config['datasets']['train']]
+        texts = itertools.islice(
+            (text for data_path in corpus
+             for text, *_ in student_reader.iter_data_set_with_detail(
+                 data_path)),
+            args.max_docs or distillation_config['max_docs'])
+        LOGGER.info('label %s with the teacher %s', ','.join(corpus),
+                    teacher_config['model_path'])
+        write_soft_labels(teacher, texts, soft_label_file,
+                          batch_size=args.batch_size,
+                          temperature=distillation_config['temperature'])
+
+    config['action'] = 'train'
+    config['datasets']['train'] = soft_label_file
+    Model(config).build_and_train()
+
+    student_config = dict(config, action='predict',
+                          prediction_cache={'enabled': False})
+    student = Model(student_config)
+    student.load()
+    test_sets = {
+        name: student_reader.get_data_set_with_detail(data_path)
+        for name, data_path in (config['datasets'].get('test') or
+                                {'eval': config['datasets']['eval']}).items()}
+    report = compare(teacher, student, test_sets,
+                     teacher_label_mapper, batch_size=args.batch_size)
+    report.update(teacher=teacher_config['model_path'],
+                  soft_labels=soft_label_file)
+    report_file = os.path.join(config['model_path'], 'distillation.json')
+    with open(report_file, 'w') as report_fh:
+        json.dump(report, report_fh, indent=2)
+    LOGGER.info('save the distillation report to [%s]', report_file)
+    print_report(report)
+
+
+def _int_list(values):
+    return [int(value) for value in values.split(',')]
 
 
 def _get_column(matrix, column_i):
@@ -97,8 +486,41 @@ def get_args():
     subparsers = parser.add_subparsers(help='supported actions')
     parser_train = subparsers.add_parser('train', help='train the model')
     parser_train.add_argument('config', help='config file', type=str)
+    parser_train.add_argument('--strategy',
+                              help='distributed training strategy, with the '
+                                   'cluster and task in TF_CONFIG',
+                              choices=['parameter_server', 'collective'])
     parser_train.set_defaults(func=train)
 
+    parser_train_distributed = subparsers.add_parser(
+        'train-distributed',
+        help='train a tf model with a cluster of local processes')
+    parser_train_distributed.add_argument('config', help='config file',
+                                          type=str)
+    parser_train_distributed.add_argument(
+        '--strategy',
+        help='distributed training strategy',
+        choices=['parameter_server', 'collective'],
+        default='parameter_server')
+    parser_train_distributed.add_argument(
+        '--workers',
+        help='number of training processes, the chief included',
+        type=int, default=2)
+    parser_train_distributed.add_argument(
+        '--ps',
+        help='number of parameter servers, default to 1 with the '
+             'parameter_server strategy',
+        type=int)
+    parser_train_distributed.add_argument(
+        '--port',
+        help='first port of the cluster',
+        type=int, default=2222)
+    parser_train_distributed.add_argument(
+        '--no_evaluator',
+        help='train without evaluation, early stopping and best exports',
+        action='store_true')
+    parser_train_distributed.set_defaults(func=train_distributed)
+
     parser_eval = subparsers.add_parser('eval', help='eval on all test sets')
     parser_eval.add_argument('config', help='config file', type=str)
     parser_eval.add_argument('--test_set',
@@ -107,6 +529,9 @@ def get_args():
     parser_eval.add_argument('--output_dir',
                              help='output directory',
                              type=str, default='res')
+    parser_eval.add_argument('--batch_size',
+                             help='number of documents per model call',
+                             type=int)
     parser_eval.set_defaults(func=eval)
 
     parser_predict = subparsers.add_parser('predict',
@@ -115,11 +540,192 @@ def get_args():
     parser_predict.add_argument('--test_set',
                                 help='name of test set in the config file',
                                 type=str)
+    parser_predict.add_argument('--input',
+                                help='csv/jsonl file or trxml folder, '
+                                     'instead of the test sets',
+                                type=str)
     parser_predict.add_argument('--output_dir',
                                 help='output directory',
                                 type=str, default='res')
+    parser_predict.add_argument('--format',
+                                help='output format',
+                                choices=['tsv', 'jsonl'])
+    parser_predict.add_argument('--workers',
+                                help='number of encoding processes',
+                                type=int)
+    parser_predict.add_argument('--queue_size',
+                                help='number of batches between stages',
+                                type=int)
+    parser_predict.add_argument('--batch_size',
+                                help='number of documents per model call',
+                                type=int)
     parser_predict.set_defaults(func=predict)
 
+    parser_score = subparsers.add_parser(
+        'score',
+        help='predict a large input in committed chunks, resumable')
+    parser_score.add_argument('config', help='config file', type=str)
+    parser_score.add_argument('--test_set',
+                              help='name of test set in the config file',
+                              type=str)
+    parser_score.add_argument('--input',
+                              help='csv/jsonl file or trxml folder, '
+                                   'instead of the test sets',
+                              type=str)
+    parser_score.add_argument('--output_dir',
+                              help='output directory',
+                              type=str, default='res')
+    parser_score.add_argument('--format',
+                              help='output format',
+                              choices=['tsv', 'jsonl'])
+    parser_score.add_argument('--chunk_size',
+                              help='number of documents per chunk',
+                              type=int)
+    parser_score.add_argument('--num_shards',
+                              help='number of processes scoring the input',
+                              type=int, default=1)
+    parser_score.add_argument('--shard',
+                              help='shard of this process, from 0',
+                              type=int, default=0)
+    parser_score.add_argument('--workers',
+                              help='number of encoding processes',
+                              type=int)
+    parser_score.add_argument('--queue_size',
+                              help='number of batches between stages',
+                              type=int)
+    parser_score.add_argument('--batch_size',
+                              help='number of documents per model call',
+                              type=int)
+    parser_score.set_defaults(func=score)
+
+    parser_serve = subparsers.add_parser('serve',
+                                         help='serve predictions over http')
+    parser_serve.add_argument('config', help='config file', type=str)
+    parser_serve.add_argument('--host', help='host to bind', type=str)
+    parser_serve.add_argument('--port', help='port to bind', type=int)
+    parser_serve.set_defaults(func=serve)
+
+    parser_export = subparsers.add_parser(
+        'export',
+        help='export a frozen, optimized inference graph of a tf model')
+    parser_export.add_argument('config', help='config file', type=str)
+    parser_export.add_argument('--saved_model',
+                               help='saved model folder, default to the '
+                                    'latest best export',
+                               type=str)
+    parser_export.add_argument('--output_dir',
+                               help='output directory, default to '
+                                    'model_path/export/frozen/<version>',
+                               type=str)
+    parser_export.add_argument('--xla',
+                               help='serve the graph with XLA JIT',
+                               action='store_true')
+    parser_export.add_argument('--no_optimize',
+                               help='only freeze, without graph transforms',
+                               action='store_true')
+    parser_export.add_argument('--prune',
+                               help='fraction of the kernel weights set to '
+                                    '0, by magnitude',
+                               type=float, default=0.0)
+    parser_export.add_argument('--quantize',
+                               help='store the weights in 8 bits',
+                               action='store_true')
+    parser_export.add_argument('--report',
+                               help='compare size, latency and accuracy on '
+                                    'the test sets with the saved model',
+                               action='store_true')
+    parser_export.add_argument('--batch_size',
+                               help='number of documents per model call',
+                               type=int)
+    parser_export.set_defaults(func=export)
+
+    cores = os.cpu_count() or 1
+    parser_tune = subparsers.add_parser(
+        'tune-inference',
+        help='sweep the inference threads, batch sizes and workers, and '
+             'write the recommended options')
+    parser_tune.add_argument('config', help='config file', type=str)
+    parser_tune.add_argument('--test_set',
+                             help='name of test set in the config file',
+                             type=str)
+    parser_tune.add_argument('--input',
+                             help='csv/jsonl file or trxml folder, '
+                                  'instead of the test sets',
+                             type=str)
+    parser_tune.add_argument('--max_docs',
+                             help='number of documents of the sample',
+                             type=int, default=2000)
+    parser_tune.add_argument('--intra_op_threads',
+                             help='comma separated intra op threads',
+                             type=str,
+                             default=','.join(str(threads) for threads in
+                                              sorted({1, cores // 2 or 1,
+                                                      cores})))
+    parser_tune.add_argument('--inter_op_threads',
+                             help='comma separated inter op threads',
+                             type=str, default='1,2')
+    parser_tune.add_argument('--batch_sizes',
+                             help='comma separated batch sizes',
+                             type=str, default='1,8,32,128')
+    parser_tune.add_argument('--workers',
+                             help='comma separated encoding processes',
+                             type=str, default='1,2,4')
+    parser_tune.add_argument('--max_p99_ms',
+                             help='only recommend the options with a p99 '
+                                  'batch latency below',
+                             type=float)
+    parser_tune.add_argument('--output',
+                             help='output file, default to '
+                                  'model_path/' + TUNED_CONFIG_NAME,
+                             type=str)
+    parser_tune.set_defaults(func=tune_inference)
+
+    parser_index = subparsers.add_parser(
+        'build-index',
+        help='build the index of the known advertisers from labelled data')
+    parser_index.add_argument('config', help='config file', type=str)
+    parser_index.add_argument('--input',
+                              help='comma separated labelled data sets, '
+                                   'default to the train and eval sets',
+                              type=str)
+    parser_index.add_argument('--output',
+                              help='index file, default to the path of the '
+                                   'advertiser_index block',
+                              type=str)
+    parser_index.add_argument('--min_count',
+                              help='minimal number of records of an '
+                                   'advertiser',
+                              type=int)
+    parser_index.set_defaults(func=build_index)
+
+    parser_distill = subparsers.add_parser(
+        'distill',
+        help='train the model of the config on the soft labels of a teacher')
+    parser_distill.add_argument('config', help='config file of the student',
+                                type=str)
+    parser_distill.add_argument('--teacher',
+                                help='config file of the trained teacher, '
+                                     'default to the distillation block',
+                                type=str)
+    parser_distill.add_argument('--corpus',
+                                help='comma separated unlabeled data sets, '
+                                     'default to the distillation block',
+                                type=str)
+    parser_distill.add_argument('--max_docs',
+                                help='maximal number of corpus documents',
+                                type=int)
+    parser_distill.add_argument('--soft_labels',
+                                help='soft label file, default to '
+                                     'model_path/teacher.soft.jsonl',
+                                type=str)
+    parser_distill.add_argument('--reuse_soft_labels',
+                                help='train on the existing soft label file',
+                                action='store_true')
+    parser_distill.add_argument('--batch_size',
+                                help='number of documents per model call',
+                                type=int)
+    parser_distill.set_defaults(func=distill)
+
     return parser.parse_args()
 
 
@@ -0,0 +1,324 @@
+'''
+Known advertiser index: the class of the advertisers with a stable class in
+the labelled data, looked up before the model
+
+    - the keys are the normalized organization name and domain of the
+      records (extra fields of the data sets), hashed to 64 bits
+    - each key maps to the majority class of its records, the confidence
+      (fraction of the records of the class) and the number of records
+    - the index is a file of fixed size records sorted on the key, memory
+      mapped and binary searched, so the serving processes share the pages
+      and nothing is parsed at load time
+
+the file: magic, header size, json header (labels, fields...), records
+'''
+import os
+import re
+import mmap
+import json
+import struct
+import bisect
+import hashlib
+import unicodedata
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+from . import LOGGER
+from .cascade import StagedProbabilities
+
+# the stage of the predictions of the index
+INDEX_STAGE = 'index'
+
+MAGIC = b'TKADVIX1'
+_HEADER_SIZE = struct.Struct('<I')
+# key, confidence, number of records, label id
+_RECORD = struct.Struct('<QfIH')
+
+# legal forms dropped from the end of the organization names
+LEGAL_FORMS = {
+    'ag', 'bv', 'co', 'corp', 'corporation', 'company', 'gmbh', 'inc',
+    'limited', 'llc', 'llp', 'ltd', 'nv', 'plc', 'sa', 'sarl', 'sas', 'spa',
+    'srl', 'vof'
+}
+
+
+def normalize_org_name(name):
+    '''lower case, no accents, punctuation or trailing legal form'''
+    if not name:
+        return ''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    # b.v. -> bv
+    name = re.sub(r'(?<=\w)\.(?=\w)', '', name.lower())
+    tokens = re.sub(r'[\W_]+', ' ', name).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_FORMS:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def normalize_domain(url):
+    '''the host name of the url, lower case, without www. and port'''
+    if not url:
+        return ''
+    url = url.strip().lower()
+    if '//' not in url:
+        url = '//' + url
+    try:
+        host = urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+def _hash_key(kind, value):
+    digest = hashlib.blake2b((kind + ':' + value).encode('utf-8'),
+                             digest_size=8).digest()
+    return struct.unpack('<Q', digest)[0]
+
+
+def advertiser_keys(org_name, domain):
+    '''the keys of a record, the domain first, empty values are skipped'''
+    keys = []
+    domain = normalize_domain(domain)
+    if domain:
+        keys.append(_hash_key('domain', domain))
+    org_name = normalize_org_name(org_name)
+    if org_name:
+        keys.append(_hash_key('org', org_name))
+    return keys
+
+
+class AdvertiserIndexBuilder:
+    '''
+    count the labels of each key of the labelled records
+
+    params:
+        - min_count: minimal number of records of a key in the index
+    '''
+
+    def __init__(self, min_count=5):
+        self.min_count = min_count
+        self.counts = defaultdict(Counter)
+        self.num_records = 0
+
+    def add(self, org_name, domain, label):
+        self.num_records += 1
+        for key in advertiser_keys(org_name, domain):
+            self.counts[key][label] += 1
+
+    def entries(self):
+        '''sorted (key, label, confidence, count) of the frequent keys'''
+        entries = []
+        for key, labels in self.counts.items():
+            count = sum(labels.values())
+            if count < self.min_count:
+                continue
+            # ties broken on the label, the build is deterministic
+            label, label_count = min(labels.items(),
+                                     key=lambda item: (-item[1], item[0]))
+            entries.append((key, label, label_count / count, count))
+        entries.sort()
+        return entries
+
+    def write(self, output_file, header=None):
+        '''
+        write the index file, renamed in place once complete
+
+        output:
+            - number of keys in the index
+        '''
+        entries = self.entries()
+        labels = sorted({label for _, label, _, _ in entries})
+        label_ids = {label: label_id for label_id, label in enumerate(labels)}
+        header = dict(header or {}, labels=labels, keys=len(entries),
+                      records=self.num_records, min_count=self.min_count)
+        header = json.dumps(header).encode('utf-8')
+
+        tmp_file = '%s.%d.tmp' % (output_file, os.getpid())
+        with open(tmp_file, 'wb') as output_fh:
+            output_fh.write(MAGIC)
+            output_fh.write(_HEADER_SIZE.pack(len(header)))
+            output_fh.write(header)
+            for key, label, confidence, count in entries:
+                output_fh.write(_RECORD.pack(key, confidence, count,
+                                             label_ids[label]))
+        os.replace(tmp_file, output_file)
+        return len(entries)
+
+
+class _Keys:
+    '''the keys of the memory mapped records, as a sequence for bisect'''
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, position):
+        return struct.unpack_from('<Q', self.index.records,
+                                  self.index.offset +
+                                  position * _RECORD.size)[0]
+
+
+class AdvertiserIndex:
+    '''
+    the memory mapped index file
+
+    params:
+        - index_file: written by AdvertiserIndexBuilder
+    '''
+
+    def __init__(self, index_file):
+        with open(index_file, 'rb') as index_fh:
+            self.records = mmap.mmap(index_fh.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        if self.records[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not an advertiser index' % index_file)
+        header_start = len(MAGIC) + _HEADER_SIZE.size
+        header_size = _HEADER_SIZE.unpack_from(self.records, len(MAGIC))[0]
+        self.header = json.loads(
+            self.records[header_start:header_start + header_size]
+            .decode('utf-8'))
+        self.labels = self.header['labels']
+        self.offset = header_start + header_size
+        self.size = (len(self.records) - self.offset) // _RECORD.size
+        self._keys = _Keys(self)
+
+    def __len__(self):
+        return self.size
+
+    def get(self, key):
+        '''(label, confidence, count) of the key, None if not indexed'''
+        position = bisect.bisect_left(self._keys, key)
+        if position == self.size or self._keys[position] != key:
+            return None
+        _, confidence, count, label_id = _RECORD.unpack_from(
+            self.records, self.offset + position * _RECORD.size)
+        # stored in 32 bits
+        return self.labels[label_id], round(confidence, 6), count
+
+    def lookup(self, org_name, domain, min_confidence=0.0):
+        '''
+        the most confident entry of the domain and organization name
+
+        output:
+            - (label, confidence, count), None if none is confident enough
+        '''
+        best = None
+        for key in advertiser_keys(org_name, domain):
+            entry = self.get(key)
+            if entry is not None and entry[1] >= min_confidence and \
+                    (best is None or entry[1] > best[1]):
+                best = entry
+        return best
+
+    def close(self):
+        self.records.close()
+
+
+def labelled_advertisers(records, detail_fields, org_field, domain_field):
+    '''
+    the (organization name, domain, label) of the labelled records, the
+    records without a label are skipped
+
+    params:
+        - records: iterable of records (text, label, doc_id, *extra)
+        - detail_fields: the field names of the records
+        - org_field, domain_field: the names of the fields of the index
+    '''
+    org_position = _position(detail_fields, org_field)
+    domain_position = _position(detail_fields, domain_field)
+    for record in records:
+        if not record[1]:
+            continue
+        yield (_field(record, org_position), _field(record, domain_position),
+               record[1])
+
+
+def build_index(advertisers, output_file, min_count=5, header=None):
+    '''
+    build the index file
+
+    params:
+        - advertisers: iterable of (organization name, domain, label)
+
+    output:
+        - number of keys in the index
+    '''
+    builder = AdvertiserIndexBuilder(min_count)
+    for org_name, domain, label in advertisers:
+        builder.add(org_name, domain, label)
+    num_keys = builder.write(output_file, header)
+    LOGGER.info('indexed %d keys of %d records to %s', num_keys,
+                builder.num_records, output_file)
+    return num_keys
+
+
+class AdvertiserLookup:
+    '''
+    the probabilities of the records of known advertisers, for the
+    prediction path
+
+    params:
+        - index: AdvertiserIndex
+        - detail_fields: the field names of the records
+        - org_field, domain_field: the names of the fields of the index
+        - label_mapper: to map the labels to the class order of the model
+        - num_classes: number of classes of the model
+        - min_confidence: minimal confidence of a hit
+    '''
+
+    def __init__(self, index, detail_fields, org_field, domain_field,
+                 label_mapper, num_classes, min_confidence=0.95):
+        self.index = index
+        self.org_position = _position(detail_fields, org_field)
+        self.domain_position = _position(detail_fields, domain_field)
+        self.label_mapper = label_mapper
+        self.num_classes = num_classes
+        self.min_confidence = min_confidence
+        self.lookups = 0
+        self.hits = 0
+
+    def probabilities(self, label, confidence):
+        class_id = int(self.label_mapper.class_id(label))
+        others = (1.0 - confidence) / max(1, self.num_classes - 1)
+        return StagedProbabilities(
+            [confidence if index == class_id else others
+             for index in range(self.num_classes)],
+            INDEX_STAGE)
+
+    def __call__(self, records):
+        '''the probabilities of each record, None if not a confident hit'''
+        results = []
+        for record in records:
+            entry = self.index.lookup(
+                _field(record, self.org_position),
+                _field(record, self.domain_position),
+                self.min_confidence)
+            results.append(None if entry is None else
+                           self.probabilities(entry[0], entry[1]))
+        self.lookups += len(records)
+        self.hits += sum(result is not None for result in results)
+        return results
+
+    def report(self):
+        LOGGER.info('advertiser index: %d hits of %d records (%.1f%%)',
+                    self.hits, self.lookups,
+                    100.0 * self.hits / max(1, self.lookups))
+
+
+def _position(detail_fields, field):
+    if field is None:
+        return None
+    if field not in detail_fields:
+        LOGGER.warning('no field %s in the records, not looked up', field)
+        return None
+    return list(detail_fields).index(field)
+
+
+def _field(record, position):
+    if position is None or position >= len(record):
+        return None
+    return record[position]
@@ -0,0 +1,242 @@
+'''
+Batch scoring: score a large data set in chunks, each chunk is committed to
+its own output file, and recorded in a progress journal
+
+    - a restarted run skips the committed chunks
+    - with num_shards, chunk i belongs to shard i % num_shards, so several
+      processes can score the same input, each with its own journal
+'''
+import os
+import json
+import itertools
+from collections import deque
+from . import LOGGER
+from .data_loader.jsonl_loader import JSONLLoader
+from .predict_pipeline import PredictionWriter
+
+
+def _fsync_dir(path):
+    '''make a rename in the folder durable'''
+    try:
+        dir_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class ChunkedScorer:
+    '''
+    params:
+        - output_dir: folder of the chunk files and the progress journals
+        - chunk_size: number of records per chunk
+        - num_shards, shard_id: score only the chunks of the shard_id-th of
+          num_shards shards
+        - output_format: tsv or jsonl
+        - stages: write the stage of the cascade which decided
+    '''
+    JOURNAL_NAME = 'progress.shard-{}-of-{}.jsonl'
+    CHUNK_NAME = 'chunk-{:06d}.{}'
+
+    def __init__(self, output_dir, chunk_size=10000, num_shards=1, shard_id=0,
+                 output_format='tsv', stages=False):
+        if not 0 <= shard_id < num_shards:
+            raise ValueError('shard %d out of %d shards' %
+                             (shard_id, num_shards))
+        if chunk_size < 1:
+            raise ValueError('chunk_size should be positive')
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.num_shards = num_shards
+        self.shard_id = shard_id
+        self.output_format = output_format
+        self.stages = stages
+        self.journal_path = os.path.join(
+            output_dir, self.JOURNAL_NAME.format(shard_id, num_shards))
+
+    def chunk_path(self, chunk_id):
+        return os.path.join(self.output_dir,
+                            self.CHUNK_NAME.format(chunk_id,
+                                                   self.output_format))
+
+    def _journal_header(self, data_path):
+        return {
+            'data_path': os.path.abspath(data_path),
+            'chunk_size': self.chunk_size,
+            'num_shards': self.num_shards,
+            'shard_id': self.shard_id,
+            'format': self.output_format
+        }
+
+    def committed_chunks(self, data_path):
+        '''
+        the chunk ids in the journal, the journal needs to come from a run
+        with the same input and chunking, otherwise the chunks differ
+        '''
+        if not os.path.isfile(self.journal_path):
+            return set()
+        committed = set()
+        with open(self.journal_path, encoding='utf-8') as journal_fh:
+            lines = journal_fh.read().splitlines()
+        if not lines:
+            return committed
+        header = json.loads(lines[0])
+        if header != self._journal_header(data_path):
+            raise ValueError(
+                'journal %s is from a different run: %s, remove the output '
+                'folder to start over' % (self.journal_path, header))
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # the last line is incomplete after a crash
+                continue
+            if os.path.isfile(os.path.join(self.output_dir, entry['file'])):
+                committed.add(entry['chunk'])
+        return committed
+
+    def _append_journal(self, entry):
+        with open(self.journal_path, 'a', encoding='utf-8') as journal_fh:
+            journal_fh.write(json.dumps(entry) + '\n')
+            journal_fh.flush()
+            os.fsync(journal_fh.fileno())
+
+    def _iter_chunks(self, data_reader, data_path, committed):
+        '''(chunk_id, records) of the remaining chunks of this shard'''
+        loader = data_reader._data_reader_by_input_type(data_path)
+        if isinstance(loader, JSONLLoader):
+            # seek to the chunks of the shard, without parsing the others
+            offsets = loader.line_index(data_path)
+            num_chunks = -(-len(offsets) // self.chunk_size)
+            for chunk_id in range(self.shard_id, num_chunks, self.num_shards):
+                if chunk_id not in committed:
+                    start = chunk_id * self.chunk_size
+                    yield chunk_id, loader.get_details(
+                        data_path, offsets[start:start + self.chunk_size])
+            return
+
+        counter = itertools.count()
+        chunks = itertools.groupby(
+            loader.get_details(data_path),
+            key=lambda _: next(counter) // self.chunk_size)
+        for chunk_id, records in chunks:
+            if chunk_id % self.num_shards == self.shard_id and \
+                    chunk_id not in committed:
+                yield chunk_id, records
+
+    def score(self, pipeline, data_reader, data_path, lookup=None):
+        '''
+        score the remaining chunks of this shard
+
+        params:
+            - pipeline: PredictionPipeline of the loaded model
+            - data_reader: DataReader, to read the records and label names
+            - data_path: the input data set
+            - lookup: known probabilities of the records, see
+              PredictionPipeline.run
+
+        output:
+            - number of chunks, and number of records scored in this run
+        '''
+        os.makedirs(self.output_dir, exist_ok=True)
+        committed = self.committed_chunks(data_path)
+        if not os.path.isfile(self.journal_path) or \
+                os.path.getsize(self.journal_path) == 0:
+            self._append_journal(self._journal_header(data_path))
+        elif committed:
+            LOGGER.info('skip %d committed chunks', len(committed))
+
+        writer = _ChunkWriter(self, data_reader._detail_fields(data_path),
+                              data_reader.label_mapper)
+        chunk_ids = deque()
+
+        def records():
+            # the writer reads the chunk id, and whether the record is the
+            # last one of the chunk, in the same order
+            for chunk_id, chunk in self._iter_chunks(data_reader, data_path,
+                                                     committed):
+                previous = None
+                for record in chunk:
+                    if previous is not None:
+                        chunk_ids.append((chunk_id, False))
+                        yield previous
+                    previous = record
+                if previous is not None:
+                    chunk_ids.append((chunk_id, True))
+                    yield previous
+
+        try:
+            count = pipeline.run(
+                records(),
+                lambda record, probabilities: writer.write(
+                    *chunk_ids.popleft(), record, probabilities),
+                lookup)
+        finally:
+            # an incomplete chunk is scored again in the next run
+            writer.close()
+        return writer.num_chunks, count
+
+
+class _ChunkWriter:
+    '''
+    write the records of a chunk to a temporary file, which is renamed to
+    the chunk file and recorded in the journal when the chunk is complete
+    '''
+
+    def __init__(self, scorer, detail_fields, label_mapper):
+        self.scorer = scorer
+        self.detail_fields = detail_fields
+        self.label_mapper = label_mapper
+        self.chunk_id = None
+        self.output_fh = None
+        self.writer = None
+        self.num_records = 0
+        self.num_chunks = 0
+
+    def write(self, chunk_id, last, record, probabilities):
+        if self.output_fh is None:
+            self._open(chunk_id)
+        self.writer.write(record, probabilities)
+        self.num_records += 1
+        if last:
+            self.commit()
+
+    def _open(self, chunk_id):
+        self.chunk_id = chunk_id
+        self.num_records = 0
+        self.output_fh = open(self.scorer.chunk_path(chunk_id) + '.tmp', 'w',
+                              newline='', encoding='utf-8')
+        self.writer = PredictionWriter.create(self.scorer.output_format,
+                                              self.output_fh,
+                                              self.detail_fields,
+                                              self.label_mapper,
+                                              self.scorer.stages)
+
+    def close(self):
+        if self.output_fh is not None:
+            self.output_fh.close()
+            self.output_fh = None
+
+    def commit(self):
+        if self.output_fh is None:
+            return
+        chunk_path = self.scorer.chunk_path(self.chunk_id)
+        self.output_fh.flush()
+        os.fsync(self.output_fh.fileno())
+        self.output_fh.close()
+        os.replace(chunk_path + '.tmp', chunk_path)
+        _fsync_dir(self.scorer.output_dir)
+        self.scorer._append_journal({
+            'chunk': self.chunk_id,
+            'file': os.path.basename(chunk_path),
+            'records': self.num_records
+        })
+        LOGGER.info('committed chunk %d with %d records',
+                    self.chunk_id, self.num_records)
+        self.num_chunks += 1
+        self.output_fh = None
+        self.writer = None
@@ -0,0 +1,131 @@
+'''
+Inference cascade: a cheap first stage model predicts all the documents, and
+only the uncertain ones are predicted again by the model (the second stage)
+
+    - a document is uncertain if the first stage probability of class_id is
+      inside the band [low, high]
+    - both stages predict in batches: the first stage on the whole batch, the
+      second stage on the uncertain documents of the batch
+    - the probabilities of each document record the stage which decided
+'''
+import time
+from . import LOGGER
+
+FIRST_STAGE = 'first'
+SECOND_STAGE = 'second'
+
+
+class StagedProbabilities(list):
+    '''the probabilities of a document, and the stage which decided them'''
+
+    def __init__(self, probabilities, stage):
+        super().__init__(probabilities)
+        self.stage = stage
+
+
+def decided_by(probabilities, default=None):
+    '''the stage of the probabilities, default if not from the cascade'''
+    return getattr(probabilities, 'stage', default)
+
+
+class CascadeEncoder:
+    '''
+    encode the texts for the first stage, the texts are kept for the second
+    stage, picklable if the first stage encoder is
+    '''
+
+    def __init__(self, first_stage_encoder=None):
+        self.first_stage_encoder = first_stage_encoder
+
+    def __call__(self, texts):
+        if self.first_stage_encoder is None:
+            return (texts, texts)
+        return (texts, self.first_stage_encoder(texts))
+
+
+class Cascade:
+    '''
+    params:
+        - first_stage: the cheap model, with process_batch, and optionally
+          text_encoder and process_encoded_batch, e.g. Model
+        - band: (low, high) probabilities of class_id of the uncertain
+          documents
+        - class_id: the class of the band probabilities
+    '''
+
+    def __init__(self, first_stage, band=(0.2, 0.8), class_id=1):
+        low, high = band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError('the uncertainty band [%s, %s] should be within '
+                             '[0, 1]' % (low, high))
+        self.first_stage = first_stage
+        self.band = (low, high)
+        self.class_id = class_id
+        self.documents = 0
+        self.escalated = 0
+        self.first_stage_secs = 0.0
+        self.second_stage_secs = 0.0
+
+    def uncertain(self, probabilities):
+        low, high = self.band
+        return low <= probabilities[self.class_id] <= high
+
+    def text_encoder(self):
+        encoder = getattr(self.first_stage, 'text_encoder', lambda: None)()
+        return CascadeEncoder(encoder)
+
+    def process(self, texts, second_stage, batch_size=None,
+                first_stage_encoded=None):
+        '''
+        params:
+            - texts: list of input texts
+            - second_stage: predicts a list of texts
+            - batch_size: number of texts per first stage model call
+            - first_stage_encoded: the texts encoded by the first stage
+              encoder, if any
+
+        output:
+            - list of StagedProbabilities per text
+        '''
+        start = time.perf_counter()
+        if first_stage_encoded is None:
+            first = self.first_stage.process_batch(texts, batch_size)
+        else:
+            first = self.first_stage.process_encoded_batch(
+                first_stage_encoded, batch_size)
+        escalated = [index for index, probabilities in enumerate(first)
+                     if self.uncertain(probabilities)]
+        second_start = time.perf_counter()
+        second = second_stage([texts[index] for index in escalated]) \
+            if escalated else []
+        end = time.perf_counter()
+
+        self.documents += len(texts)
+        self.escalated += len(escalated)
+        self.first_stage_secs += second_start - start
+        self.second_stage_secs += end - second_start
+
+        results = [StagedProbabilities(probabilities, FIRST_STAGE)
+                   for probabilities in first]
+        for index, probabilities in zip(escalated, second):
+            results[index] = StagedProbabilities(probabilities, SECOND_STAGE)
+        return results
+
+    def stats(self):
+        seconds = self.first_stage_secs + self.second_stage_secs
+        return {
+            'documents': self.documents,
+            'escalated': self.escalated,
+            'escalated_rate': self.escalated / max(1, self.documents),
+            'docs_per_sec': self.documents / seconds if seconds else 0.0,
+            'first_stage_secs': self.first_stage_secs,
+            'second_stage_secs': self.second_stage_secs
+        }
+
+    def report(self):
+        stats = self.stats()
+        LOGGER.info('cascade: %d of %d documents escalated (%.1f%%), '
+                    '%.1f docs/s, %.1fs in the first stage, %.1fs in the '
+                    'second stage', stats['escalated'], stats['documents'],
+                    stats['escalated_rate'] * 100, stats['docs_per_sec'],
+                    stats['first_stage_secs'], stats['second_stage_secs'])
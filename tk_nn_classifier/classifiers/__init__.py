@@ -1,9 +1,56 @@
-'''The classifiers in different packages'''
+'''
+The classifiers in different packages
 
-from .spacy_classifier import SpacyClassifier
-from .tf_classifier import TFClassifier
-from .keras_classifier import KerasClassifier
-from .tf_multi_feat_classifier import TFMultiFeatClassifier
+the classifiers are imported lazily, so that only the framework of the chosen
+model_type (tensorflow, spacy) is imported
+'''
+import sys
+import importlib
 
-__all__ = ['SpacyClassifier', 'TFClassifier', 'KerasClassifier', 'TFMultiFeatClassifier']
+# class name: module
+_CLASSIFIER_MODULES = {
+    'SpacyClassifier': '.spacy_classifier',
+    'TFClassifier': '.tf_classifier',
+    'KerasClassifier': '.keras_classifier',
+    'TFMultiFeatClassifier': '.tf_multi_feat_classifier'
+}
+
+# model_type prefix: class name, the first matching prefix is used
+_MODEL_TYPE_PREFIXES = [
+    ('tf_multi_feat', 'TFMultiFeatClassifier'),
+    ('tf', 'TFClassifier'),
+    ('keras', 'KerasClassifier'),
+    ('spacy', 'SpacyClassifier')
+]
+
+
+def _load_classifier(class_name):
+    module = importlib.import_module(_CLASSIFIER_MODULES[class_name],
+                                     __name__)
+    return getattr(module, class_name)
+
+
+def get_classifier_class(model_type):
+    '''the classifier class of the model_type, only its module is imported'''
+    for prefix, class_name in _MODEL_TYPE_PREFIXES:
+        if model_type.startswith(prefix):
+            return _load_classifier(class_name)
+    raise ValueError("unknown classifier type [{}]".format(model_type))
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(class_name):
+        if class_name in _CLASSIFIER_MODULES:
+            return _load_classifier(class_name)
+        raise AttributeError("module {} has no attribute {}".format(
+            __name__, class_name))
+else:
+    # no module __getattr__ before python 3.7
+    from .spacy_classifier import SpacyClassifier
+    from .tf_classifier import TFClassifier
+    from .keras_classifier import KerasClassifier
+    from .tf_multi_feat_classifier import TFMultiFeatClassifier
+
+__all__ = ['SpacyClassifier', 'TFClassifier', 'KerasClassifier',
+           'TFMultiFeatClassifier', 'get_classifier_class']
 name = 'classifiers'
@@ -2,12 +2,15 @@
 import os
 
 from .. import LOGGER
+from ..config import get_predict_batch_size
 
 class BaseClassifier:
     def __init__(self, config):
         self.config = config
         self.data_reader = None
         self.data_sets = {}
+        # path of the model loaded by load_saved_model
+        self.loaded_model_path = None
         os.makedirs(self.config['model_path'], exist_ok=True)
 
     def split_data(self):
@@ -34,3 +37,25 @@ class BaseClassifier:
         if 'all_data' in self.config['datasets']:
             self.split_data()
         train_data, eval_data = self._load_train_eval()
+
+    def _predict_batch_size(self, batch_size=None):
+        return get_predict_batch_size(self.config, batch_size)
+
+    @staticmethod
+    def _batches(items, batch_size):
+        for start in range(0, len(items), batch_size):
+            yield items[start:start + batch_size]
+
+    def process_batch(self, texts, batch_size=None):
+        raise NotImplementedError('process_batch needs to be implemented')
+
+    def text_encoder(self):
+        '''
+        picklable callable to encode a list of texts for
+        process_encoded_batch, so the encoding can run in worker processes,
+        None if the texts are passed to the model as they are
+        '''
+        return None
+
+    def process_encoded_batch(self, encoded, batch_size=None):
+        return self.process_batch(encoded, batch_size)
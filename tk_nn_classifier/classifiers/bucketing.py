@@ -0,0 +1,63 @@
+'''
+Length bucketing: group examples with similar length into the same batch, so
+that a batch only needs to be padded to its longest member
+'''
+
+
+def bucket_boundaries(max_length, min_length=16):
+    '''
+    boundaries which double from min_length up to max_length, e.g. for 1024:
+    [16, 32, 64, 128, 256, 512]
+    '''
+    boundaries = []
+    boundary = min_length
+    while boundary < max_length:
+        boundaries.append(boundary)
+        boundary *= 2
+    return boundaries
+
+
+def bucket_batch_sizes(boundaries, max_length, batch_size, token_budget=None):
+    '''
+    batch size of each bucket, len(boundaries) + 1 buckets in total
+
+    with a token budget, the batch size of a bucket is the number of examples
+    of the bucket's largest length fitting in the budget, otherwise all
+    buckets use the same batch_size
+    '''
+    upper_bounds = list(boundaries) + [max_length]
+    if token_budget is None:
+        return [batch_size for _ in upper_bounds]
+    return [max(1, token_budget // upper_bound)
+            for upper_bound in upper_bounds]
+
+
+def length_sorted_batches(lengths, batch_size=None, token_budget=None):
+    '''
+    group the examples into batches of similar length
+
+    params:
+        - lengths: the length of each example
+        - batch_size: max number of examples per batch
+        - token_budget: max number of (padded) tokens per batch
+
+    output:
+        - list of batches, each is a list of example indices
+    '''
+    if batch_size is None and token_budget is None:
+        raise ValueError('batch_size or token_budget needs to be specified')
+
+    batches = []
+    batch = []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # sorted by length, the current example is the longest in the batch
+        padded_size = (len(batch) + 1) * max(lengths[index], 1)
+        if batch and (
+                (batch_size is not None and len(batch) >= batch_size) or
+                (token_budget is not None and padded_size > token_budget)):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
@@ -1,5 +1,18 @@
 import tensorflow as tf
 from .. import LOGGER
+from ..exceptions import ConfigError
+
+# defaults of the "fast_bow" block
+FAST_BOW_DEFAULTS = {
+    # number of hash buckets of the bigrams, each one a trainable vector of
+    # the embedding dimension
+    "buckets": 2 ** 17
+}
+# multiplier of the first token id of the bigram hash
+BIGRAM_HASH_PRIME = 1000003
+
+# "standard": LSTMCell, "block": LSTMBlockCell, "fused": LSTMBlockFusedCell
+LSTM_CELLS = ('standard', 'block', 'fused')
 
 
 class GraphSelector:
@@ -7,36 +20,32 @@ class GraphSelector:
         self.config = config
         self.embedding = embedding
 
-    def _input_layer(self, input, embedding_initializer):
-        input_layer = tf.contrib.layers.embed_sequence(
-            input['input'],
-            self.embedding.vocab_size,
-            self.embedding.vector_size,
-            initializer=embedding_initializer,
-            trainable=False
-        )
-        return input_layer
+    def _input_layer(self, input, embedding_layer):
+        return embedding_layer(input['input'])
 
-    def add_graph(self, input, training_mode, embedding_initializer):
+    def add_graph(self, input, training_mode, embedding_layer):
         if self.config['model_type'] == 'tf_cnn_simple':
             LOGGER.info("create model: cnn_simple")
             return self._cnn_simple(input, training_mode,
-                                    embedding_initializer)
+                                    embedding_layer)
         elif self.config['model_type'] == 'tf_cnn_multi':
             LOGGER.info("create model: cnn_multi")
             return self._cnn_multi_layer(input, training_mode,
-                                         embedding_initializer)
+                                         embedding_layer)
         elif self.config['model_type'] == 'tf_lstm_simple':
             LOGGER.info("create model: lstm_simple")
             return self._lstm_simple(input, training_mode,
-                                     embedding_initializer)
+                                     embedding_layer)
         elif self.config['model_type'] == 'tf_lstm_multi':
             LOGGER.info("create model: lstm_multi")
             return self._lstm_multi_layer(input, training_mode,
-                                          embedding_initializer)
+                                          embedding_layer)
+        elif self.config['model_type'] == 'tf_fast_bow':
+            LOGGER.info("create model: fast_bow")
+            return self._fast_bow(input, training_mode, embedding_layer)
 
-    def _cnn_simple(self, input, training_mode, embedding_initializer):
-        input_layer = self._input_layer(input, embedding_initializer)
+    def _cnn_simple(self, input, training_mode, embedding_layer):
+        input_layer = self._input_layer(input, embedding_layer)
         dropout_emb = tf.layers.dropout(inputs=input_layer,
                                         rate=self.config['dropout_rate'],
                                         training=training_mode)
@@ -56,8 +65,8 @@ class GraphSelector:
         logits = tf.layers.dense(inputs=dropout_hidden, units=2)
         return logits
 
-    def _cnn_multi_layer(self, input, training_mode, embedding_initializer):
-        input_layer = self._input_layer(input, embedding_initializer)
+    def _cnn_multi_layer(self, input, training_mode, embedding_layer):
+        input_layer = self._input_layer(input, embedding_layer)
 
         next_input = tf.layers.dropout(inputs=input_layer,
                                        rate=self.config['dropout_rate'],
@@ -85,18 +94,102 @@ class GraphSelector:
         logits = tf.layers.dense(inputs=dropout_flat, units=2)
         return logits
 
-    def _lstm_simple(self, input, training_mode, embedding_initializer):
-        input_layer = self._input_layer(input, embedding_initializer)
-        cell = tf.nn.rnn_cell.LSTMCell(self.config['lstm']['hidden_size'])
-        cell = tf.nn.rnn_cell.DropoutWrapper(
+    def _fast_bow(self, input, training_mode, embedding_layer):
+        '''
+        fastText like bag of n-grams: the average of the unigram vectors
+        (the embedding) and of the hashed bigram vectors (trained), and a
+        linear output, no loop and no convolution over the sequence
+        '''
+        fast_bow = dict(FAST_BOW_DEFAULTS)
+        fast_bow.update(self.config.get('fast_bow') or {})
+        input_ids = input['input']
+        unigrams = embedding_layer(input_ids)
+        mask = tf.sequence_mask(input['len'], tf.shape(input_ids)[1],
+                                dtype=tf.float32)
+
+        ids = tf.cast(input_ids, tf.int64)
+        bigram_ids = tf.math.floormod(
+            ids[:, :-1] * BIGRAM_HASH_PRIME + ids[:, 1:],
+            fast_bow['buckets'])
+        dimension = unigrams.get_shape()[-1]
+        bigram_embedding = tf.compat.v1.get_variable(
+            'bigram_embedding',
+            [fast_bow['buckets'], dimension],
+            initializer=tf.random_uniform_initializer(
+                -1.0 / int(dimension), 1.0 / int(dimension)))
+        bigrams = tf.nn.embedding_lookup(bigram_embedding, bigram_ids)
+        # a bigram is valid if its second token is
+        bigram_mask = mask[:, 1:]
+
+        total = tf.reduce_sum(unigrams * tf.expand_dims(mask, -1), axis=1) + \
+            tf.reduce_sum(bigrams * tf.expand_dims(bigram_mask, -1), axis=1)
+        count = tf.reduce_sum(mask, axis=1) + \
+            tf.reduce_sum(bigram_mask, axis=1)
+        average = total / tf.expand_dims(tf.maximum(count, 1.0), -1)
+        logits = tf.layers.dense(inputs=average, units=2)
+        return logits
+
+    def _lstm_cell_type(self):
+        cell_type = self.config['lstm'].get('cell', 'standard')
+        if cell_type not in LSTM_CELLS:
+            raise ConfigError('lstm/cell', 'use one of %s, not %s' %
+                              (', '.join(LSTM_CELLS), cell_type))
+        return cell_type
+
+    def _lstm_cell(self, cell_type, input_size):
+        '''the recurrent cell of dynamic_rnn, with the dropout'''
+        if cell_type == 'block':
+            # one op per time step, same variables as the LSTMCell
+            cell = tf.contrib.rnn.LSTMBlockCell(
+                self.config['lstm']['hidden_size'])
+        else:
+            cell = tf.nn.rnn_cell.LSTMCell(self.config['lstm']['hidden_size'])
+        return tf.nn.rnn_cell.DropoutWrapper(
                 cell,
                 # input_keep_prob=self.config['dropout_keep_rate'],
                 output_keep_prob=self.config['dropout_keep_rate'],
                 state_keep_prob=self.config['dropout_keep_rate'],
                 variational_recurrent=True,
-                input_size=input_layer.get_shape()[-1],
-                dtype=tf.float32
-        )
+                # note that if the lstm hidden state is different with then
+                # input embedding size
+                # the input_size need to be adjusted
+                input_size=input_size,
+                dtype=tf.float32)
+
+    def _fused_lstm(self, input_layer, sequence_length, nr_layers,
+                    training_mode):
+        '''
+        final output of nr_layers LSTM layers, each one a single fused op on
+        the whole sequence instead of a loop on the time steps
+
+        the dropout can not be applied in the recurrence, it is applied to the
+        outputs of each layer, in training only
+        '''
+        # as the MultiRNNCell of the same cell, the layers share the weights
+        cell = tf.contrib.rnn.LSTMBlockFusedCell(
+            self.config['lstm']['hidden_size'])
+        # time major
+        outputs = tf.transpose(input_layer, [1, 0, 2])
+        for _ in range(nr_layers):
+            outputs, final_state = cell(outputs,
+                                        sequence_length=sequence_length,
+                                        dtype=tf.float32)
+            outputs = tf.layers.dropout(inputs=outputs,
+                                        rate=self.config['dropout_rate'],
+                                        training=training_mode)
+        return tf.layers.dropout(inputs=final_state.h,
+                                 rate=self.config['dropout_rate'],
+                                 training=training_mode)
+
+    def _lstm_simple(self, input, training_mode, embedding_layer):
+        input_layer = self._input_layer(input, embedding_layer)
+        cell_type = self._lstm_cell_type()
+        if cell_type == 'fused':
+            outputs = self._fused_lstm(input_layer, input['len'], 1,
+                                       training_mode)
+            return tf.layers.dense(inputs=outputs, units=2)
+
+        cell = self._lstm_cell(cell_type, input_layer.get_shape()[-1])
         _, final_state = tf.compat.v1.nn.dynamic_rnn(
             cell, input_layer, sequence_length=input['len'], dtype=tf.float32)
 
@@ -104,20 +197,16 @@ class GraphSelector:
         logits = tf.layers.dense(inputs=outputs, units=2)
         return logits
 
-    def _lstm_multi_layer(self, input, training_mode, embedding_initializer):
-        input_layer = self._input_layer(input, embedding_initializer)
-        cell = tf.nn.rnn_cell.LSTMCell(self.config['lstm']['hidden_size'])
-        cell = tf.nn.rnn_cell.DropoutWrapper(
-                cell,
-                # input_keep_prob=self.config['dropout_keep_rate'],
-                output_keep_prob=self.config['dropout_keep_rate'],
-                state_keep_prob=self.config['dropout_keep_rate'],
-                variational_recurrent=True,
-                # note that if the lstm hidden state is different with then
-                # input embedding size
-                # the input_size need to be adjusted
-                input_size=input_layer.get_shape()[-1],
-                dtype=tf.float32)
+    def _lstm_multi_layer(self, input, training_mode, embedding_layer):
+        input_layer = self._input_layer(input, embedding_layer)
+        cell_type = self._lstm_cell_type()
+        if cell_type == 'fused':
+            final_outputs = self._fused_lstm(
+                input_layer, input['len'], self.config['lstm']['nr_layers'],
+                training_mode)
+            return tf.layers.dense(inputs=final_outputs, units=2)
+
+        cell = self._lstm_cell(cell_type, input_layer.get_shape()[-1])
         multi_rnn_cell = tf.contrib.rnn.MultiRNNCell(
             [cell] * self.config['lstm']['nr_layers'])
         outputs, final_state = tf.compat.v1.nn.dynamic_rnn(
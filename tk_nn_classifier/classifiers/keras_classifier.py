@@ -7,7 +7,8 @@ import functools
 from tensorflow.python.keras.preprocessing import sequence
 
 from ..data_loader import WordVector, download_tk_embedding
-from ..data_loader import TFDataReader, tokenize
+from ..data_loader import TFDataReader, TokenIdEncoder, tokenize
+from ..config import get_keras_config
 from .. import LOGGER
 from .utils import TrainHelper, FileHelper
 from .base_classifier import BaseClassifier
@@ -19,7 +20,9 @@ class KerasClassifier(BaseClassifier):
         super().__init__(config)
         self.max_sequence_length = config['max_sequence_length']
         self.embedding = None
+        self.vocab_to_ids = None
         self.data_reader = TFDataReader(self.config)
+        tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.INFO)
 
     def prepare_train_eval_data(self):
         LOGGER.info('Reading: %s', self.config['datasets']['train'])
@@ -44,24 +47,55 @@ class KerasClassifier(BaseClassifier):
             download_tk_embedding(self.config['language'], target_file)
         if self.embedding is None:
             self.embedding = WordVector(target_file)
+            self.vocab_to_ids = self.embedding.vocab_to_index
+            self._save_vocab_file()
+
+    def _save_vocab_file(self):
+        # the vocab of the predictions, to avoid reading the full embedding
+        vocab_filename = os.path.join(self.config['model_path'], 'vocab.p')
+        LOGGER.info('write vocab file to %s', vocab_filename)
+        with open(vocab_filename, 'wb') as handle:
+            pickle.dump(self.embedding.vocab_to_index, handle)
+
+    def _vector_input(self):
+        '''
+        whether the model takes the token vectors, as the models trained
+        before, instead of the token ids
+        '''
+        model = getattr(self, 'classifier', None)
+        if model is not None:
+            return len(model.input_shape) == 3
+        return get_keras_config(self.config)['input'] == 'vectors'
 
     def load_data_set(self, data_path):
+        '''
+        the padded token ids [N, max_sequence_length] of the data set, or the
+        padded token vectors [N, max_sequence_length, vector_size] with the
+        "vectors" input, the labels, and the lengths
+        '''
         if data_path not in self.data_sets:
             texts, labels = self.data_reader.get_data(data_path)
-
-            data_vecs = [[
-                    self.embedding.get_vector(token)
-                    for token in tokenize(text)]
-                    for text in tqdm(texts)]
-            data_length = np.array([
-                min(len(data_vec), self.max_sequence_length)
-                for data_vec in data_vecs
-            ])
-
-            data = self._pad_vectors(data_vecs)
-            self.data_sets[data_path] = (data, np.array(labels), data_length)
+            if self._vector_input():
+                self.data_sets[data_path] = self._load_vectors(texts, labels)
+            else:
+                data_ids = TokenIdEncoder(self.vocab_to_ids)(texts)
+                data, data_length = self._pad_ids(data_ids)
+                self.data_sets[data_path] = (data, np.array(labels),
+                                             data_length)
         return self.data_sets[data_path]
 
+    def _load_vectors(self, texts, labels):
+        data_vecs = [[
+                self.embedding.get_vector(token)
+                for token in tokenize(text)]
+                for text in tqdm(texts)]
+        data_length = np.array([
+            min(len(data_vec), self.max_sequence_length)
+            for data_vec in data_vecs
+        ])
+
+        data = self._pad_vectors(data_vecs)
+        return (data, np.array(labels), data_length)
 
     def build_graph(self):
         """
@@ -74,8 +108,23 @@ class KerasClassifier(BaseClassifier):
         output: neural netword model
         """
 
-        inputs = tf.keras.Input((self.max_sequence_length, self.embedding.vector_size,))
-        inputs_encoder = tf.keras.layers.Dropout(self.config.get('dropout_rate',0.3))(inputs)
+        if self._vector_input():
+            inputs = tf.keras.Input((self.max_sequence_length,
+                                     self.embedding.vector_size))
+            embedded = inputs
+        else:
+            # the token ids, embedded by the frozen vectors of the embedding
+            inputs = tf.keras.Input((self.max_sequence_length,),
+                                    dtype='int32')
+            embedded = tf.keras.layers.Embedding(
+                self.embedding.vocab_size,
+                self.embedding.vector_size,
+                weights=[self.embedding.vectors],
+                input_length=self.max_sequence_length,
+                trainable=False,
+                name='embedding')(inputs)
+        inputs_encoder = tf.keras.layers.Dropout(
+            self.config.get('dropout_rate', 0.3))(embedded)
 
         for i in range(self.config['cnn']['nr_layers']):
             conv = tf.keras.layers.Conv1D(self.config['cnn']['filter_size'],
@@ -119,13 +168,23 @@ class KerasClassifier(BaseClassifier):
                                              patience=self.config['patience_epochs'])
         ]
 
-        self.classifier.fit(x_train,
-                  y_train,
-                  epochs=self.config['num_epochs'],
-                  batch_size=self.config['batch_size'],
-                  validation_data=(x_eval, y_eval),
-                  callbacks=callbacks_list
-        )
+        if self._vector_input():
+            self.classifier.fit(x_train,
+                      y_train,
+                      epochs=self.config['num_epochs'],
+                      batch_size=self.config['batch_size'],
+                      validation_data=(x_eval, y_eval),
+                      callbacks=callbacks_list
+            )
+        else:
+            self.classifier.fit(
+                self._dataset(x_train, y_train, shuffle=True),
+                steps_per_epoch=self._steps(len(x_train)),
+                epochs=self.config['num_epochs'],
+                validation_data=self._dataset(x_eval, y_eval),
+                validation_steps=self._steps(len(x_eval)),
+                callbacks=callbacks_list
+            )
 
         # # TODO
         # after training, clean up
@@ -137,6 +196,43 @@ class KerasClassifier(BaseClassifier):
         #LOGGER.info("Test: loss %s\tacc %s", str(test_loss), str(test_acc))
 
 
+    def _steps(self, nr_examples):
+        return max(1, -(-nr_examples // self.config['batch_size']))
+
+    def _dataset(self, data, labels, shuffle=False):
+        '''
+        the batches of the padded ids and the labels, fed by a generator, so
+        the data set is not copied into the graph
+        '''
+        batch_size = self.config['batch_size']
+
+        def batches():
+            indices = np.random.permutation(len(data)) if shuffle \
+                else np.arange(len(data))
+            for start in range(0, len(indices), batch_size):
+                batch = indices[start:start + batch_size]
+                yield data[batch], \
+                    labels[batch].astype(np.float32).reshape(-1, 1)
+
+        dataset = tf.data.Dataset.from_generator(
+            batches,
+            (tf.int32, tf.float32),
+            (tf.TensorShape([None, self.max_sequence_length]),
+             tf.TensorShape([None, 1])))
+        return dataset.repeat().prefetch(1)
+
+    def _pad_ids(self, data_ids):
+        data_length = np.array([
+            min(len(ids), self.max_sequence_length) for ids in data_ids])
+        # the flatten layer needs the full max_sequence_length input
+        data = sequence.pad_sequences(data_ids,
+                                      maxlen=self.max_sequence_length,
+                                      dtype='int32',
+                                      truncating='post',
+                                      padding='post',
+                                      value=WordVector.PAD_ID)
+        return data, data_length
+
     def _pad_vectors(self, datain, padding='post'):
         length = len(datain)
         x_shape = [length, self.max_sequence_length, self.embedding.vector_size]
@@ -165,19 +261,33 @@ class KerasClassifier(BaseClassifier):
         return best_model_file
 
     def load_saved_model(self, model_path=None):
-        if self.embedding == None:
-            self.load_embedding()
         if model_path is None:
             model_path = self._get_file_with_largest_epoch(self.config['model_path'])
         LOGGER.info("loading model from %s", model_path)
         self.classifier = tf.keras.models.load_model(model_path)
+        self.loaded_model_path = model_path
+        if self._vector_input():
+            if self.embedding is None:
+                self.load_embedding()
+        elif self.vocab_to_ids is None:
+            self._load_vocab()
+
+    def _load_vocab(self):
+        # the vocab written at training, the vectors are in the model
+        vocab_filename = os.path.join(self.config['model_path'], 'vocab.p')
+        if os.path.isfile(vocab_filename):
+            self.vocab_to_ids = TokenIdEncoder.from_vocab_file(
+                vocab_filename).vocab_to_ids
+        else:
+            self.load_embedding()
 
     def evaluate_on_tests(self):
         self.load_saved_model()
         for test_set_name in self.config['datasets']['test']:
             LOGGER.info('evaluate {}'.format(test_set_name))
             x_test, y_test, seqlen_test = self.load_data_set(self.config['datasets']['test'][test_set_name])
-            predictions = self.classifier.predict_on_batch(x_test)
+            predictions = self.classifier.predict(
+                x_test, batch_size=self._predict_batch_size())
             result = [
                 int(score + 0.5)
                 for score in predictions.flatten()
@@ -185,16 +295,57 @@ class KerasClassifier(BaseClassifier):
             TrainHelper.print_test_result(result, y_test)
 
     def process_with_saved_model(self, input):
-        data = self._input_text_to_pad_vec(input)
-        result = self.classifier.predict_on_batch(data)
-        probability = result.flatten()[0]
-        return [1.0 - probability, probability]
+        return self.process_batch([input])[0]
+
+    def text_encoder(self):
+        if self._vector_input():
+            return None
+        return TokenIdEncoder(self.vocab_to_ids)
+
+    def process_batch(self, texts, batch_size=None):
+        '''
+        predict a list of texts with the saved model, batch by batch
+
+        output:
+            - probabilities of each text, in the class order of label mapper
+        '''
+        if self._vector_input():
+            return self._process_vector_batch(texts, batch_size)
+        return self.process_encoded_batch(self.text_encoder()(texts),
+                                          batch_size)
+
+    def process_encoded_batch(self, data_ids, batch_size=None):
+        '''predict the token ids of a list of texts, see text_encoder'''
+        if self._vector_input():
+            # not encoded
+            return self._process_vector_batch(data_ids, batch_size)
+        probabilities = []
+        for batch in self._batches(data_ids,
+                                   self._predict_batch_size(batch_size)):
+            data, _ = self._pad_ids(batch)
+            result = self.classifier.predict_on_batch(data)
+            probabilities.extend(
+                [1.0 - probability, probability]
+                for probability in result.flatten().tolist())
+        return probabilities
+
+    def _process_vector_batch(self, texts, batch_size=None):
+        probabilities = []
+        batch_size = self._predict_batch_size(batch_size)
+        for batch in self._batches(texts, batch_size):
+            result = self.classifier.predict_on_batch(
+                self._input_texts_to_pad_vec(batch))
+            probabilities.extend(
+                [1.0 - probability, probability]
+                for probability in result.flatten().tolist())
+        return probabilities
 
     # tf.keras
     def evaluate(self, test_file):
         """Evaluate on the data set"""
         x_test, y_test, seqlen_test = self.load_data_set(test_file)
-        likelihoods = self.classifier.predict_on_batch(x_test)
+        likelihoods = self.classifier.predict(
+            x_test, batch_size=self._predict_batch_size())
         return likelihoods, y_test
 
     def predict_on_text(self, input):
@@ -204,10 +355,13 @@ class KerasClassifier(BaseClassifier):
     # the padding is probably not needed in the predicting mode
     # if needed, should use the text length as max_sequence_length
     def _input_text_to_pad_vec(self, text):
+        return self._input_texts_to_pad_vec([text])
 
+    def _input_texts_to_pad_vec(self, texts):
         data_vecs = [[
                 self.embedding.get_vector(token)
-                for token in tokenize(text)]]
+                for token in tokenize(text)]
+                for text in texts]
 
         data = self._pad_vectors(data_vecs)
 
@@ -105,6 +105,7 @@ class SpacyClassifier(BaseClassifier):
         if model_path is None:
             model_path = self.config['model_path']
         self.model = spacy.load(model_path)
+        self.loaded_model_path = model_path
 
     def save(self, output_dir):
         if output_dir is not None:
@@ -119,6 +120,26 @@ class SpacyClassifier(BaseClassifier):
         result = self.model(input)
         return result.cats
 
+    def process_batch(self, texts, batch_size=None):
+        '''
+        predict a list of texts with the saved model, using the spaCy pipe
+
+        output:
+            - probabilities of each text, in the class order of label mapper
+        '''
+        return [self._cats_to_probabilities(cats)
+                for cats in self.predict_batch(texts, batch_size)]
+
+    def _cats_to_probabilities(self, cats):
+        label_mapper = self.data_reader.label_mapper
+        if label_mapper is None:
+            # label mapper is built from the sorted labels
+            return [cats[label] for label in sorted(cats)]
+        return [
+            cats[label_mapper.label_name(class_id)]
+            for class_id in range(len(label_mapper.classid_to_label))
+        ]
+
     def evaluate_on_tests(self):
         for test_set in self.config['datasets']['test']:
             LOGGER.info('test_set: %s' % test_set)
@@ -142,8 +163,13 @@ class SpacyClassifier(BaseClassifier):
         predicted_classes = TrainHelper.max_dict_value(predicted_prob)
         return predicted_classes, gold_classes
 
-    def predict_batch(self, texts):
+    def predict_batch(self, texts, batch_size=None):
+        '''the cats of each text, predicted with the spaCy pipe'''
         textcat = self.model.get_pipe("textcat")
-        docs = (self.model.tokenizer(text) for text in texts)
-        for doc in textcat.pipe(docs):
+        docs = (
+            self.model.tokenizer(
+                text if isinstance(text, str) else '\n'.join(text))
+            for text in texts)
+        for doc in textcat.pipe(
+                docs, batch_size=self._predict_batch_size(batch_size)):
             yield doc.cats
@@ -1,7 +1,76 @@
+import os
+import glob
+import time
+import shutil
 import tensorflow as tf
+from ..config import get_best_export_config
+
+
+class ExportSchedule:
+    '''
+    when to export a better model:
+        - deferred: only at the end of the training
+        - min_interval_secs: at most once every min_interval_secs, the
+          better models in between are exported later
+        - by default, at each better model
+    '''
+
+    def __init__(self, deferred=False, min_interval_secs=0, clock=time.time):
+        self.deferred = deferred
+        self.min_interval_secs = min_interval_secs
+        self.clock = clock
+        self.last_export = None
+
+    def due(self):
+        if self.deferred:
+            return False
+        return self.last_export is None or \
+            self.clock() - self.last_export >= self.min_interval_secs
+
+    def exported(self):
+        self.last_export = self.clock()
+
+
+def keep_checkpoint(checkpoint_path, keep_dir):
+    '''
+    hard link the files of the checkpoint to keep_dir, so that the checkpoint
+    is kept after the estimator removed it, without writing it again
+
+    output:
+        - the checkpoint path in keep_dir
+    '''
+    os.makedirs(keep_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(keep_dir, '*')):
+        os.remove(path)
+    for path in glob.glob(checkpoint_path + '.*'):
+        target = os.path.join(keep_dir, os.path.basename(path))
+        try:
+            os.link(path, target)
+        except OSError:
+            # e.g. another file system
+            shutil.copy(path, target)
+    return os.path.join(keep_dir, os.path.basename(checkpoint_path))
 
 
 class BestCheckpointsExporter(tf.estimator.BestExporter):
+    '''
+    export the model of the best accuracy
+
+    params:
+        - schedule: ExportSchedule, when to export the better models, the
+          models not exported yet are exported by export_pending
+        - keep_dir: folder to keep the checkpoint of the best model until it
+          is exported, needed if the export can be delayed
+        - the other params of tf.estimator.BestExporter
+    '''
+
+    def __init__(self, *args, schedule=None, keep_dir=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.schedule = schedule or ExportSchedule()
+        self.keep_dir = keep_dir
+        # (export_path, checkpoint_path, eval_result) of the best model, if
+        # not exported yet
+        self._pending = None
 
     def export(self, estimator, export_path, checkpoint_path, eval_result,
                is_the_final_export):
@@ -10,13 +79,54 @@ class BestCheckpointsExporter(tf.estimator.BestExporter):
             tf.compat.v1.logging.info(
                 'Exporting a better model ({} instead of {})...'.format(
                     eval_result, self._best_eval_result))
-            result = self._saved_model_exporter.export(
-                estimator, export_path, checkpoint_path, eval_result,
-                is_the_final_export)
             self._best_eval_result = eval_result
-            self._garbage_collect_exports(export_path)
-            return result
+            if self.schedule.due() or is_the_final_export:
+                self._pending = None
+                return self._export(estimator, export_path, checkpoint_path,
+                                    eval_result, is_the_final_export)
+            self._pending = (export_path,
+                             keep_checkpoint(checkpoint_path, self.keep_dir),
+                             eval_result)
+            tf.compat.v1.logging.info(
+                'Export delayed, kept the checkpoint {}'.format(
+                    self._pending[1]))
         else:
             tf.compat.v1.logging.info(
                 'Keeping the current best model ({} instead of {}).'.format(
                     self._best_eval_result, eval_result))
+            if self._pending is not None and \
+                    (self.schedule.due() or is_the_final_export):
+                return self.export_pending(estimator)
+        return None
+
+    def export_pending(self, estimator):
+        '''export the best model if it is not exported yet'''
+        if self._pending is None:
+            return None
+        export_path, checkpoint_path, eval_result = self._pending
+        self._pending = None
+        tf.compat.v1.logging.info(
+            'Exporting the delayed best model ({})...'.format(eval_result))
+        return self._export(estimator, export_path, checkpoint_path,
+                            eval_result, True)
+
+    def _export(self, estimator, export_path, checkpoint_path, eval_result,
+                is_the_final_export):
+        result = self._saved_model_exporter.export(
+            estimator, export_path, checkpoint_path, eval_result,
+            is_the_final_export)
+        self.schedule.exported()
+        self._garbage_collect_exports(export_path)
+        return result
+
+
+def best_exporter(config, serving_input_receiver_fn, name='best_exporter'):
+    '''the best exporter with the "best_export" schedule of the config'''
+    export_config = get_best_export_config(config)
+    return BestCheckpointsExporter(
+        name=name,
+        serving_input_receiver_fn=serving_input_receiver_fn,
+        exports_to_keep=export_config['exports_to_keep'],
+        schedule=ExportSchedule(export_config['deferred'],
+                                export_config['min_interval_secs']),
+        keep_dir=os.path.join(config['model_path'], 'best_checkpoint'))
@@ -1,17 +1,36 @@
 import os
 import tensorflow as tf
 import numpy as np
-import pickle
 import functools
 from tensorflow.python.keras.preprocessing import sequence
 
 from ..data_loader import WordVector, download_tk_embedding
-from ..data_loader import TFDataReader, tokenize
+from ..data_loader import TFDataReader, TokenIdEncoder, tokenize
+from ..data_loader import TokenEncoder
+from ..config import get_serving_config, get_inference_config
+from ..config import get_evaluation_config, get_best_export_config
+from ..config import get_windowed_inference_config
 from .. import LOGGER
+from ..exceptions import ConfigError
 from .base_classifier import BaseClassifier
 from .utils import TrainHelper, FileHelper
 from .graph_selector import GraphSelector
-from .tf_best_export import BestCheckpointsExporter
+from .tf_embedding import embedding_layer, embedding_storage, embedding_file
+from .tf_embedding import write_embedding_file
+from .tf_best_export import best_exporter, ExportSchedule
+from .tf_frozen_export import load_predictor, latest_export_dir
+from .tf_frozen_export import session_config
+from .tf_distribute import distribute_strategy, shard_training_data
+from ..distributed import get_tf_config, is_chief
+from ..distillation import is_soft_label_file, read_soft_labels
+from .tf_session_eval import InSessionEvalHook, keep_latest_exports
+from .tf_predictor import EstimatorPredictor
+from .tf_serving_utils import non_padding_length, fit_to_length
+from .tf_serving_utils import tokens_to_ids, write_vocab_file
+from .tf_serving_utils import VOCAB_FILE_NAME
+from .bucketing import bucket_boundaries, bucket_batch_sizes
+from .bucketing import length_sorted_batches
+from .windowing import WindowedInference
 
 
 class TFClassifier(BaseClassifier):
@@ -20,6 +39,49 @@ class TFClassifier(BaseClassifier):
         self.max_sequence_length = config['max_sequence_length']
         self.embedding = None
         self.data_reader = TFDataReader(self.config)
+        # train_distribute strategy of the estimator, see build_graph
+        self.distribute = None
+        self.bucketing = self._bucketing_config()
+        self.windowed = self._windowed_inference()
+        # the predictor of predict_on_text, on the checkpoints
+        self._predictor = None
+        # best model exports of the in session evaluation
+        self._export_schedule = None
+        self._pending_export = None
+        tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.INFO)
+
+    def _bucketing_config(self):
+        '''
+        the "bucketing" config block, None if bucketing is not enabled:
+            - boundaries: upper bounds of the length buckets
+            - token_budget: size the batches on the number of padded tokens
+              instead of on batch_size
+        '''
+        bucketing = self.config.get('bucketing')
+        if not bucketing or not bucketing.get('enabled', True):
+            return None
+        if self.config['model_type'] == 'tf_cnn_multi':
+            # the flatten layer needs the full max_sequence_length input
+            raise ConfigError('bucketing',
+                              'not supported by tf_cnn_multi')
+        bucketing = dict(bucketing)
+        if 'boundaries' not in bucketing:
+            bucketing['boundaries'] = bucket_boundaries(
+                self.max_sequence_length)
+        bucketing.setdefault('token_budget', None)
+        return bucketing
+
+    def _windowed_inference(self):
+        '''the windowed inference of the predictions, None if not enabled'''
+        windowed_config = get_windowed_inference_config(self.config)
+        if not windowed_config['enabled']:
+            return None
+        return WindowedInference(
+            window_size=windowed_config['window_size'],
+            growth=windowed_config['growth'],
+            threshold=windowed_config['threshold'],
+            aggregation=windowed_config['aggregation'],
+            max_length=self.max_sequence_length)
 
     def build_and_train(self):
         self.load_embedding()
@@ -27,7 +89,7 @@ class TFClassifier(BaseClassifier):
         if 'all_data' in self.config['datasets']:
             self.split_data()
         self.train()
-        if 'test' in self.config['datasets']:
+        if 'test' in self.config['datasets'] and is_chief(get_tf_config()):
             self.evaluate_on_tests()
 
     def evaluate_on_tests(self):
@@ -47,7 +109,7 @@ class TFClassifier(BaseClassifier):
         ]
         return predicted_classes
 
-    def _prepare_single_input(self, text):
+    def _single_input(self, text):
         data_id = [
                 self.embedding.get_index(token)
                 for token in tokenize(text)
@@ -58,12 +120,7 @@ class TFClassifier(BaseClassifier):
                                       truncating='post',
                                       padding='post',
                                       value=WordVector.PAD_ID)
-        dataset = tf.data.Dataset.from_tensor_slices((data,
-                                                      [data_length],
-                                                      [0]))
-        dataset = dataset.map(self._data_parser)
-        iterator = tf.compat.v1.data.make_one_shot_iterator(dataset)
-        return iterator.get_next()
+        return data, data_length
 
     def load_embedding(self):
         target_file = self.config['embedding']['filepath']
@@ -72,17 +129,36 @@ class TFClassifier(BaseClassifier):
         if self.embedding is None:
             self.embedding = WordVector(target_file)
             self._save_vocab_file()
+            self._save_embedding_file()
 
     def _save_vocab_file(self):
         if self.embedding is not None:
             vocab_filename = os.path.join(self.config['model_path'], 'vocab.p')
             LOGGER.info('write vocab file to %s' % vocab_filename)
-            with open(vocab_filename, 'wb') as handle:
-                pickle.dump(self.embedding.vocab_to_index, handle)
+            FileHelper.write_pickle(self.embedding.vocab_to_index,
+                                    vocab_filename)
+            if self._serving_input() == 'tokens':
+                # the asset of the token string serving signature
+                write_vocab_file(
+                    self.embedding.vocab_to_index,
+                    os.path.join(self.config['model_path'], VOCAB_FILE_NAME))
+
+    def _save_embedding_file(self):
+        if self.embedding is not None and \
+                embedding_storage(self.config) == 'file':
+            LOGGER.info('write embedding file to %s',
+                        embedding_file(self.config))
+            write_embedding_file(self.embedding.vectors,
+                                 embedding_file(self.config))
 
     def load_data_set(self, data_path):
         if data_path not in self.data_sets:
-            texts, labels = self.data_reader.get_data(data_path)
+            if is_soft_label_file(data_path):
+                # the probabilities of a teacher model, see distill
+                texts, labels = read_soft_labels(data_path)
+                labels = np.array(labels, dtype=np.float32)
+            else:
+                texts, labels = self.data_reader.get_data(data_path)
 
             data_ids = [[
                     self.embedding.get_index(token)
@@ -106,41 +182,80 @@ class TFClassifier(BaseClassifier):
         features = {"input": input, "len": length}
         return features, label
 
-    def input_fn(self, data_path, shuffle_and_repeat=False):
+    @staticmethod
+    def _strip_padding(input, length, label):
+        # keep at least one token, the max pooling needs a non-empty input
+        return input[:tf.maximum(length, 1)], length, label
+
+    def _bucket_by_length(self, dataset):
+        '''batch examples of similar length, padded to the longest one'''
+        boundaries = self.bucketing['boundaries']
+        batch_sizes = bucket_batch_sizes(boundaries,
+                                         self.max_sequence_length,
+                                         self.config['batch_size'],
+                                         self.bucketing['token_budget'])
+        dataset = dataset.map(self._strip_padding)
+        # the class ids, or the soft labels of each class
+        label_shape = dataset.output_shapes[2]
+        return dataset.apply(
+            tf.data.experimental.bucket_by_sequence_length(
+                element_length_func=lambda input, length, label:
+                    tf.cast(tf.shape(input)[0], tf.int32),
+                bucket_boundaries=boundaries,
+                bucket_batch_sizes=batch_sizes,
+                padded_shapes=([None], [], label_shape)
+            )
+        )
+
+    def input_fn(self, data_path, shuffle_and_repeat=False, bucketing=None):
+        '''
+        input of the estimator
+
+        params:
+            - data_path: path of the data set
+            - shuffle_and_repeat: shuffle and repeat for num_epochs
+            - bucketing: batch on length, defaults to the bucketing config in
+              training, note that bucketing changes the order of examples
+        '''
         LOGGER.info("load data from %s", data_path)
         (data, labels, data_length) = self.load_data_set(data_path)
+        if bucketing is None:
+            bucketing = shuffle_and_repeat
+        bucketing = bucketing and self.bucketing is not None
 
         dataset = tf.data.Dataset.from_tensor_slices((data,
                                                       data_length,
                                                       labels))
         if shuffle_and_repeat:
+            dataset = shard_training_data(dataset)
             dataset = dataset.shuffle(buffer_size=len(data))
             dataset = dataset.repeat(self.config['num_epochs'])
 
-        dataset = dataset.batch(self.config['batch_size'])
+        if bucketing:
+            dataset = self._bucket_by_length(dataset)
+        else:
+            dataset = dataset.batch(self.config['batch_size'])
         dataset = dataset.map(self._data_parser)
+        if shuffle_and_repeat and self.distribute is not None:
+            # distributed by the strategy
+            return dataset
 
         iterator = dataset.make_one_shot_iterator()
         return iterator.get_next()
 
     def build_graph(self):
-        def embedding_initializer(shape=None,
-                                  dtype=tf.float32,
-                                  partition_info=None):
-            assert dtype is tf.float32
-            return self.embedding.vectors
-
-        # params = {'embedding_initializer':
-        #           tf.random_uniform_initializer(-1.0, 1.0)}
-        params = {'embedding_initializer': embedding_initializer}
+        params = {}
 
         self.model_dir = self.config['model_path']
+        self.distribute = distribute_strategy(self.config)
 
+        # the cluster and the task are read from TF_CONFIG
         run_config = tf.estimator.RunConfig(
             save_checkpoints_steps=self.config['check_per_steps'],
             save_summary_steps=self.config['check_per_steps'],
             model_dir=self.model_dir,
-            keep_checkpoint_max=5)
+            keep_checkpoint_max=5,
+            train_distribute=self.distribute)
 
         self.classifier = tf.estimator.Estimator(
                 model_fn=self.model_fn,
@@ -150,13 +265,17 @@ class TFClassifier(BaseClassifier):
 
     def model_fn(self, features, labels, mode, params):
         training = mode == tf.estimator.ModeKeys.TRAIN
+        if training:
+            # turned off by the in session evaluation
+            training = tf.compat.v1.placeholder_with_default(
+                True, shape=[], name='training_mode')
 
         graph_selector = GraphSelector(self.config, self.embedding)
 
         logits = graph_selector.add_graph(
             features,
             training,
-            params['embedding_initializer'])
+            embedding_layer(self.config, self.embedding))
 
         predictions = {
             "classes": tf.argmax(input=logits, axis=1),
@@ -176,7 +295,11 @@ class TFClassifier(BaseClassifier):
             )
 
         # This will be None when predicting
-        if labels is not None:
+        if labels is not None and labels.dtype.is_floating:
+            # the soft labels of a teacher model, see distill
+            onehot_labels = labels
+            labels = tf.argmax(input=labels, axis=1)
+        elif labels is not None:
             onehot_labels = tf.one_hot(labels, 2, 1.0, 0.0)
 
         # Calculate Loss (for both TRAIN and EVAL modes)
@@ -206,35 +329,155 @@ class TFClassifier(BaseClassifier):
             train_op = optimizer.minimize(
                 loss=loss,
                 global_step=tf.compat.v1.train.get_global_step())
-            return tf.estimator.EstimatorSpec(mode=mode,
-                                              loss=loss,
-                                              train_op=train_op)
+            return tf.estimator.EstimatorSpec(
+                mode=mode,
+                loss=loss,
+                train_op=train_op,
+                training_hooks=self._training_hooks(
+                    features, predictions['classes'], training))
 
         else:
             raise NotImplementedError('Unknown mode {}'.format(mode))
 
-    @staticmethod
-    def serving_input_receiver_fn():
+    def serving_input_receiver_fn(self):
         '''serving input, to work with tensorflow estimator command tools like:
         saved_model_cli, also for prediction input
+
+        input shape:
+           input: [batch_size, any length], padded with PAD_ID, or with the
+                  serving input "tokens", the normalized token strings,
+                  padded with ''
+           len: [batch_size], optional, default to the number of non padding
+                ids of each input
         '''
-        input_text = tf.placeholder(
-                dtype=tf.int32,
-                shape=[None, 1024],
-                name='input_text'
-        )
-        seq_length = tf.placeholder(
-                dtype=tf.int32,
+        if self._serving_input() == 'tokens':
+            input_text = tf.compat.v1.placeholder(
+                    dtype=tf.string,
+                    shape=[None, None],
+                    name='input_tokens'
+            )
+            input_ids = tokens_to_ids(
+                input_text,
+                os.path.join(self.config['model_path'], VOCAB_FILE_NAME))
+        else:
+            input_text = tf.compat.v1.placeholder(
+                    dtype=tf.int32,
+                    shape=[None, None],
+                    name='input_text'
+            )
+            input_ids = input_text
+        seq_length = tf.compat.v1.placeholder_with_default(
+                non_padding_length(input_ids),
                 shape=[None],
                 name='seq_length'
         )
 
-        features = {'input': input_text, 'len': seq_length}
-        receiver_tensors = {'input': input_text}
+        features = {
+            'input': fit_to_length(
+                input_ids,
+                self.max_sequence_length,
+                # the flatten layer needs the full length input
+                fixed=self.config['model_type'] == 'tf_cnn_multi'),
+            'len': tf.minimum(seq_length, self.max_sequence_length)
+        }
+        receiver_tensors = {'input': input_text, 'len': seq_length}
         return tf.estimator.export.ServingInputReceiver(features,
                                                         receiver_tensors)
 
+    def _serving_input(self):
+        serving_input = get_serving_config(self.config)['input']
+        if serving_input not in ('ids', 'tokens'):
+            raise ConfigError('serving/input',
+                              'use "ids" or "tokens", not %s' % serving_input)
+        return serving_input
+
+    def _training_hooks(self, features, classes, training):
+        evaluation = get_evaluation_config(self.config)
+        if evaluation['mode'] != 'in_session':
+            return []
+        best_dir = os.path.join(self.config['model_path'], 'best')
+        os.makedirs(best_dir, exist_ok=True)
+        return [InSessionEvalHook(
+            features,
+            classes,
+            training,
+            self._eval_batch_cache(
+                evaluation,
+                # the padding can only be stripped for a variable length input
+                strip_padding=tf.compat.dimension_value(
+                    features['input'].shape[1]) is None),
+            every_steps=self.config['check_per_steps'],
+            checkpoint_prefix=os.path.join(best_dir, 'model.ckpt'),
+            max_steps_without_increase=self.config[
+                'max_steps_without_increase'],
+            min_steps=self.config['min_train_steps'],
+            on_improve=self._export_best)]
+
+    def _eval_batch_cache(self, evaluation, strip_padding=False):
+        '''
+        the eval batches of the in session evaluation, optionally of a fixed
+        sample of max_examples examples of the eval set
+        '''
+        data, labels, data_length = self.load_data_set(
+            self.config['datasets']['eval'])
+        indices = np.arange(len(labels))
+        max_examples = evaluation['max_examples']
+        if max_examples and len(indices) > max_examples:
+            indices = np.sort(np.random.RandomState(0).choice(
+                len(indices), max_examples, replace=False))
+        batch_size = evaluation['batch_size'] or self.config['batch_size']
+        batches = []
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            width = max(1, int(data_length[batch].max())) \
+                if strip_padding else data.shape[1]
+            batches.append(({'input': data[batch, :width],
+                             'len': data_length[batch]},
+                            labels[batch]))
+        LOGGER.info('cached %d eval examples in %d batches', len(indices),
+                    len(batches))
+        return batches
+
+    def _export_best(self, checkpoint_path, accuracy, step):
+        # the hook keeps the checkpoint of the best model until the next one
+        if self._export_schedule.due():
+            self._pending_export = None
+            self._export_saved_model(checkpoint_path, accuracy, step)
+        else:
+            LOGGER.info('export of the model of step %d delayed', step)
+            self._pending_export = (checkpoint_path, accuracy, step)
+
+    def _export_saved_model(self, checkpoint_path, accuracy, step):
+        export_dir_base = os.path.join(self.config['model_path'], 'export',
+                                       'best_exporter')
+        export_dir = self.classifier.export_saved_model(
+            export_dir_base,
+            self.serving_input_receiver_fn,
+            checkpoint_path=checkpoint_path)
+        LOGGER.info('exported the model of step %d, accuracy %.4f, to %s',
+                    step, accuracy, export_dir)
+        self._export_schedule.exported()
+        keep_latest_exports(
+            export_dir_base,
+            exports_to_keep=get_best_export_config(
+                self.config)['exports_to_keep'])
+
     def train(self):
+        if get_evaluation_config(self.config)['mode'] == 'in_session':
+            LOGGER.info("start model training %s, evaluated in session",
+                        self.config['model_path'])
+            export_config = get_best_export_config(self.config)
+            self._export_schedule = ExportSchedule(
+                export_config['deferred'], export_config['min_interval_secs'])
+            self._pending_export = None
+            self.classifier.train(
+                input_fn=functools.partial(self.input_fn,
+                                           self.config['datasets']['train'],
+                                           shuffle_and_repeat=True))
+            if self._pending_export is not None:
+                self._export_saved_model(*self._pending_export)
+            return
+
         hook = tf.estimator.experimental.stop_if_no_increase_hook(
                 self.classifier,
                 'accuracy',
@@ -252,62 +495,177 @@ class TFClassifier(BaseClassifier):
                 hooks=[hook]
         )
 
-        best_exporter = BestCheckpointsExporter(
-                name="best_exporter",
-                serving_input_receiver_fn=self.serving_input_receiver_fn,
-                exports_to_keep=2
-        )
+        exporter = best_exporter(self.config, self.serving_input_receiver_fn)
 
         eval_spec = tf.estimator.EvalSpec(
                 input_fn=functools.partial(self.input_fn,
-                                           self.config['datasets']['eval']),
-                exporters=best_exporter,
+                                           self.config['datasets']['eval'],
+                                           bucketing=True),
+                exporters=exporter,
                 throttle_secs=1
         )
 
         # train and evaluate
         LOGGER.info("start model training %s", self.config['model_path'])
         tf.estimator.train_and_evaluate(self.classifier, train_spec, eval_spec)
+        # the best model, if its export was delayed
+        exporter.export_pending(self.classifier)
 
     def predict_on_text(self, text):
-        return self.classifier.predict(
-            input_fn=functools.partial(self._prepare_single_input, text))
+        '''
+        predict a text with the latest checkpoint, the graph and the session
+        are kept between the calls
+
+        output:
+            - iterator of the prediction of the text, as estimator.predict
+        '''
+        if self._predictor is None:
+            self._predictor = EstimatorPredictor(
+                self.classifier,
+                {'input': tf.int32, 'len': tf.int32},
+                {'input': tf.TensorShape([None, self.max_sequence_length]),
+                 'len': tf.TensorShape([None])})
+        data, data_length = self._single_input(text)
+        predictions = self._predictor.predict(
+            {'input': data.astype(np.int32),
+             'len': np.array([data_length], dtype=np.int32)})
+        return iter([{name: value[0] for name, value in predictions.items()}])
 
     def load_saved_model(self, model_path=None):
         if model_path is None:
-            model_path = FileHelper.last_modified_folder(
-                    os.path.join(
-                            self.config['model_path'],
-                            'export',
-                            'best_exporter'
-                            )
-                    )
+            model_path = latest_export_dir(self.config)
         LOGGER.info("loading model from %s", model_path)
-        self.model = tf.contrib.predictor.from_saved_model(model_path)
-        self._load_vocab()
+        self.model = load_predictor(
+            model_path, session_config(**get_inference_config(self.config)))
+        self.loaded_model_path = model_path
+        if self._token_input():
+            # the ids are looked up in the graph
+            self.vocab_to_ids = None
+        else:
+            self._load_vocab()
+        if self.windowed is not None and self._serving_width() is not None:
+            LOGGER.warning('the saved model has a fixed length input, each '
+                           'window is padded to %d tokens',
+                           self._serving_width())
+
+    def _token_input(self):
+        '''whether the loaded model takes the token strings'''
+        model = getattr(self, 'model', None)
+        return model is not None and \
+            model.feed_tensors['input'].dtype == tf.string
 
     def _load_vocab(self):
-        vocab, _ = WordVector.read_embeddings(self.config['embedding']['filepath'])
-        self.vocab_to_ids = WordVector.create_vocab_index_dict(vocab)
+        # the vocab written at training, to avoid reading the full embedding
+        vocab_filename = os.path.join(self.config['model_path'], 'vocab.p')
+        if os.path.isfile(vocab_filename):
+            self.vocab_to_ids = TokenIdEncoder.from_vocab_file(
+                vocab_filename).vocab_to_ids
+        else:
+            vocab, _ = WordVector.read_embeddings(
+                self.config['embedding']['filepath'])
+            self.vocab_to_ids = WordVector.create_vocab_index_dict(vocab)
+
+    def text_encoder(self):
+        if self._token_input():
+            return TokenEncoder()
+        return TokenIdEncoder(self.vocab_to_ids)
 
     def process_with_saved_model(self, input):
         data = self._input_text_to_pad_id(input)
-        result = self.model(data)
+        result = self._run_saved_model(data)
         probabilities = result['probabilities'][0]
         return probabilities.tolist()
 
-    # todo:
-    # the padding is probably not needed in the predicting mode
-    # if needed, should use the text length as max_sequence_length
+    def process_batch(self, texts, batch_size=None):
+        '''
+        predict a list of texts with the saved model, batch by batch
+
+        with bucketing, texts of similar length are predicted together, and
+        each batch is only padded to its longest text if the saved model
+        accepts variable length input
+
+        output:
+            - probabilities of each text, in the class order of label mapper
+        '''
+        return self.process_encoded_batch(self._texts_to_ids(texts),
+                                          batch_size)
+
+    def process_encoded_batch(self, data_ids, batch_size=None):
+        '''
+        predict the token ids of a list of texts, see text_encoder, window by
+        window with windowed inference
+        '''
+        if self.windowed is None:
+            return self._predict_ids(data_ids, batch_size)
+        return self.windowed.process(
+            data_ids, lambda windows: self._predict_ids(windows, batch_size))
+
+    def _predict_ids(self, data_ids, batch_size=None):
+        probabilities = [None] * len(data_ids)
+        for batch in self._inference_batches(data_ids, batch_size):
+            result = self._run_saved_model(
+                self._pad_ids([data_ids[index] for index in batch]))
+            for index, probability in zip(
+                    batch, result['probabilities'].tolist()):
+                probabilities[index] = probability
+        return probabilities
+
+    def _inference_batches(self, data_ids, batch_size=None):
+        batch_size = self._predict_batch_size(batch_size)
+        if self.bucketing is None:
+            return self._batches(list(range(len(data_ids))), batch_size)
+        lengths = [min(len(ids), self.max_sequence_length) for ids in data_ids]
+        return length_sorted_batches(
+            lengths,
+            batch_size=None if self.bucketing['token_budget'] else batch_size,
+            token_budget=self.bucketing['token_budget'])
+
+    def _run_saved_model(self, data):
+        # models exported with a fixed length signature don't take 'len'
+        return self.model({
+            name: value for name, value in data.items()
+            if name in self.model.feed_tensors
+        })
+
+    def _serving_width(self):
+        '''input width of the saved model, None if it is variable'''
+        model = getattr(self, 'model', None)
+        if model is None:
+            return None
+        return tf.compat.dimension_value(
+            model.feed_tensors['input'].shape[1])
+
     def _input_text_to_pad_id(self, text):
-        data_id = [
-                self.vocab_to_ids[token]
-                if token in self.vocab_to_ids else WordVector.UNK_ID
-                for token in tokenize(text)
-                ]
-        data = sequence.pad_sequences([data_id],
-                                      maxlen=self.max_sequence_length,
-                                      truncating='post',
-                                      padding='post',
-                                      value=WordVector.PAD_ID)
-        return {'input': data}
+        return self._input_texts_to_pad_id([text])
+
+    def _input_texts_to_pad_id(self, texts):
+        return self._pad_ids(self._texts_to_ids(texts))
+
+    def _texts_to_ids(self, texts):
+        return self.text_encoder()(texts)
+
+    def _pad_ids(self, data_ids):
+        '''
+        pad the ids to the longest one in the batch, or to the input width of
+        a saved model with fixed length signature
+        '''
+        data_length = [
+            min(len(ids), self.max_sequence_length) for ids in data_ids]
+        width = self._serving_width()
+        if width is None:
+            width = max(1, max(data_length))
+        if self._token_input():
+            # token strings, padded with ''
+            data = sequence.pad_sequences(data_ids,
+                                          maxlen=width,
+                                          dtype=object,
+                                          truncating='post',
+                                          padding='post',
+                                          value='')
+        else:
+            data = sequence.pad_sequences(data_ids,
+                                          maxlen=width,
+                                          truncating='post',
+                                          padding='post',
+                                          value=WordVector.PAD_ID)
+        return {'input': data, 'len': np.array(data_length, dtype=np.int32)}
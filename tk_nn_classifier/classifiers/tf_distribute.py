@@ -0,0 +1,42 @@
+'''
+Distribution strategy of the estimators, with the "distributed" block of the
+config and the TF_CONFIG of the process, see tk_nn_classifier.distributed
+'''
+import tensorflow as tf
+from .. import LOGGER
+from ..config import get_distributed_config, get_evaluation_config
+from ..distributed import get_tf_config, data_shard
+from ..exceptions import ConfigError
+
+
+def distribute_strategy(config):
+    '''
+    the train_distribute strategy of the RunConfig, None to train in a single
+    process
+    '''
+    strategy = get_distributed_config(config)['strategy']
+    if strategy is None:
+        return None
+    if get_evaluation_config(config)['mode'] == 'in_session':
+        raise ConfigError('evaluation/mode',
+                          'in_session is not supported in distributed '
+                          'training, the evaluator task evaluates')
+    if 'all_data' in config['datasets']:
+        # each process would split the data on its own
+        raise ConfigError('datasets/all_data',
+                          'split the data into train and eval for the '
+                          'distributed training')
+    LOGGER.info('distributed training, strategy %s, task %s', strategy,
+                get_tf_config().get('task'))
+    if strategy == 'parameter_server':
+        return tf.distribute.experimental.ParameterServerStrategy()
+    return tf.distribute.experimental.MultiWorkerMirroredStrategy()
+
+
+def shard_training_data(dataset):
+    '''the shard of the training dataset of this worker'''
+    num_shards, shard_index = data_shard(get_tf_config()) or (1, 0)
+    if num_shards == 1:
+        return dataset
+    LOGGER.info('train on the shard %d of %d', shard_index, num_shards)
+    return dataset.shard(num_shards, shard_index)
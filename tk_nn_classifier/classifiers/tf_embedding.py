@@ -0,0 +1,95 @@
+'''
+Frozen embedding of the tensorflow models
+
+with the storage "file" (default), the embedding vectors are written once per
+model bundle to model_path/embedding.f32 (raw float32, row major), and read
+in the graph into a local variable:
+    - no vocab x dimension constant in the GraphDef
+    - not in the checkpoints, local variables are not saved
+    - an asset of the saved model, read when the model is loaded
+
+with the storage "checkpoint", the vectors are the initializer of a variable
+of the graph, saved in each checkpoint, as the models trained before
+'''
+import os
+import numpy as np
+import tensorflow as tf
+from ..exceptions import ConfigError
+
+EMBEDDING_FILE_NAME = 'embedding.f32'
+EMBEDDING_STORAGES = ('file', 'checkpoint')
+
+
+def embedding_storage(config):
+    storage = (config.get('embedding') or {}).get('storage', 'file')
+    if storage not in EMBEDDING_STORAGES:
+        raise ConfigError('embedding/storage',
+                          'use one of %s, not %s' %
+                          (', '.join(EMBEDDING_STORAGES), storage))
+    return storage
+
+
+def embedding_file(config):
+    return os.path.abspath(
+        os.path.join(config['model_path'], EMBEDDING_FILE_NAME))
+
+
+def write_embedding_file(vectors, output_file):
+    '''
+    write the vectors once, an existing file of the same size is kept
+
+    the file is renamed in place once written, the processes of a distributed
+    training never read a partial file
+    '''
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if os.path.isfile(output_file) and \
+            os.path.getsize(output_file) == vectors.nbytes:
+        return output_file
+    tmp_file = '%s.%d.tmp' % (output_file, os.getpid())
+    vectors.tofile(tmp_file)
+    os.replace(tmp_file, output_file)
+    return output_file
+
+
+def frozen_embedding(vectors_file, vocab_size, dimension,
+                     name='frozen_embedding'):
+    '''local, not trainable variable of the vectors read from vectors_file'''
+    vectors_file = tf.constant(vectors_file, name=name + '_file')
+    # copied to the assets of the saved model
+    tf.compat.v1.add_to_collection(tf.compat.v1.GraphKeys.ASSET_FILEPATHS,
+                                   vectors_file)
+    vectors = tf.reshape(
+        tf.io.decode_raw(tf.io.read_file(vectors_file), tf.float32),
+        [vocab_size, dimension])
+    return tf.compat.v1.Variable(
+        vectors,
+        trainable=False,
+        collections=[tf.compat.v1.GraphKeys.LOCAL_VARIABLES],
+        name=name)
+
+
+def embedding_layer(config, embedding):
+    '''
+    function to embed the token ids, to be created in the model_fn, all the
+    inputs embedded by the function share the same vectors
+
+    params:
+        - config: config of the model
+        - embedding: the WordVector of the model
+    '''
+    if embedding_storage(config) == 'checkpoint':
+        def initializer(shape=None, dtype=tf.float32, partition_info=None):
+            assert dtype is tf.float32
+            return embedding.vectors
+
+        return lambda input_ids: tf.contrib.layers.embed_sequence(
+            input_ids,
+            embedding.vocab_size,
+            embedding.vector_size,
+            initializer=initializer,
+            trainable=False)
+
+    vectors = frozen_embedding(embedding_file(config),
+                               embedding.vocab_size,
+                               embedding.vector_size)
+    return lambda input_ids: tf.nn.embedding_lookup(vectors, input_ids)
@@ -0,0 +1,281 @@
+'''
+Frozen graph export: an inference only artifact of a saved model
+
+    - the variables are frozen into constants
+    - the training only nodes are removed
+    - the graph is optimized (constant folding, batch norm folding, ...), the
+      op fusion is done by grappler when the session is created
+    - optionally served with XLA JIT compilation
+    - optionally compressed: magnitude pruning of the dense/conv/lstm
+      kernels, and 8-bit quantization of the weights
+
+the export folder contains:
+    - frozen_graph.pb: the GraphDef
+    - signature.json: the tensor names of the inputs and outputs, the init op
+      and the asset files (e.g. of lookup tables)
+    - assets/: the asset files of the saved model
+'''
+import os
+import json
+import shutil
+import numpy as np
+import tensorflow as tf
+from tensorflow.core.protobuf import meta_graph_pb2
+from .. import LOGGER
+from .utils import FileHelper
+
+FROZEN_EXPORT_NAME = 'frozen'
+FROZEN_GRAPH_NAME = 'frozen_graph.pb'
+SIGNATURE_NAME = 'signature.json'
+
+GRAPH_TRANSFORMS = [
+    'remove_nodes(op=Identity, op=CheckNumerics)',
+    'fold_constants(ignore_errors=true)',
+    'fold_batch_norms',
+    'fold_old_batch_norms',
+    'merge_duplicate_nodes',
+    'remove_device',
+    'sort_by_execution_order'
+]
+
+# the float weights with at least minimum_size elements are stored as 8-bit,
+# and dequantized when the graph is loaded
+QUANTIZE_TRANSFORM = 'quantize_weights(minimum_size=1024)'
+
+
+def _node_name(tensor_name):
+    return tensor_name.split(':')[0].lstrip('^')
+
+
+def _asset_files(meta_graph):
+    '''asset file name of each asset tensor'''
+    asset_defs = list(meta_graph.asset_file_def)
+    assets_key = tf.compat.v1.saved_model.constants.ASSETS_KEY
+    if assets_key in meta_graph.collection_def:
+        for any_asset in meta_graph.collection_def[assets_key].any_list.value:
+            asset_def = meta_graph_pb2.AssetFileDef()
+            any_asset.Unpack(asset_def)
+            asset_defs.append(asset_def)
+    return {asset_def.tensor_info.name: asset_def.filename
+            for asset_def in asset_defs}
+
+
+def _table_init_op(graph):
+    '''
+    the op initializing the lookup tables, None if no table, the local
+    variables (e.g. the frozen embedding) are frozen into constants
+    '''
+    table_initializers = graph.get_collection(
+        tf.compat.v1.GraphKeys.TABLE_INITIALIZERS)
+    if not table_initializers:
+        return None
+    with graph.as_default():
+        return tf.group(*table_initializers, name='frozen_table_init').name
+
+
+def graph_transforms(optimize=True, quantize=False):
+    transforms = list(GRAPH_TRANSFORMS) if optimize else []
+    if quantize:
+        # before sorting the nodes
+        transforms.insert(max(0, len(transforms) - 1), QUANTIZE_TRANSFORM)
+    return transforms
+
+
+def optimize_graph(graph_def, input_names, output_names, transforms=None):
+    '''apply the graph transforms, input and output nodes are kept'''
+    from tensorflow.tools.graph_transforms import TransformGraph
+    return TransformGraph(graph_def, input_names, output_names,
+                          transforms or GRAPH_TRANSFORMS)
+
+
+def prune_weights(graph_def, sparsity, suffix='/kernel'):
+    '''
+    magnitude pruning: set the smallest weights (in absolute value) of each
+    kernel to 0, the biases and the embedding are kept
+
+    params:
+        - graph_def: frozen GraphDef, modified in place
+        - sparsity: fraction of the weights set to 0 in each kernel
+        - suffix: name suffix of the pruned constants
+
+    output:
+        - graph_def
+    '''
+    if not 0 <= sparsity < 1:
+        raise ValueError('sparsity should be in [0, 1), got %s' % sparsity)
+    for node in graph_def.node:
+        if node.op != 'Const' or not node.name.endswith(suffix):
+            continue
+        weights = tf.make_ndarray(node.attr['value'].tensor)
+        threshold = np.percentile(np.abs(weights), sparsity * 100)
+        pruned = np.where(np.abs(weights) < threshold,
+                          np.zeros_like(weights), weights)
+        node.attr['value'].tensor.CopyFrom(tf.make_tensor_proto(pruned))
+        LOGGER.info('pruned %s: %d of %d weights are 0', node.name,
+                    np.sum(pruned == 0), pruned.size)
+    return graph_def
+
+
+def freeze_saved_model(saved_model_dir, output_dir, optimize=True, xla=False,
+                       transform=None, prune=0.0, quantize=False):
+    '''
+    freeze a saved model into an inference only graph
+
+    params:
+        - saved_model_dir: export folder of the saved model
+        - output_dir: folder of the frozen graph
+        - optimize: apply the graph transforms
+        - xla: serve the graph with XLA JIT compilation
+        - transform: optional function on the frozen GraphDef, applied before
+          the optimization
+        - prune: fraction of the kernel weights set to 0, see prune_weights
+        - quantize: store the weights in 8 bits
+
+    output:
+        - output_dir
+    '''
+    graph = tf.Graph()
+    with tf.compat.v1.Session(graph=graph) as session:
+        meta_graph = tf.compat.v1.saved_model.loader.load(
+            session, [tf.saved_model.SERVING], saved_model_dir)
+        signature = meta_graph.signature_def[
+            tf.saved_model.DEFAULT_SERVING_SIGNATURE_DEF_KEY]
+        inputs = {name: info.name for name, info in signature.inputs.items()}
+        outputs = {name: info.name
+                   for name, info in signature.outputs.items()}
+        init_op = _table_init_op(graph)
+        assets = _asset_files(meta_graph)
+
+        keep_nodes = [_node_name(name) for name in outputs.values()]
+        if init_op is not None:
+            keep_nodes.append(_node_name(init_op))
+        graph_def = tf.compat.v1.graph_util.convert_variables_to_constants(
+            session, graph.as_graph_def(), keep_nodes)
+
+    # only the assets of the tables are still needed
+    node_names = {node.name for node in graph_def.node}
+    assets = {tensor_name: filename
+              for tensor_name, filename in assets.items()
+              if _node_name(tensor_name) in node_names}
+
+    # the asset paths are fed when the tables are initialized
+    input_nodes = [_node_name(name)
+                   for name in list(inputs.values()) + list(assets)]
+    graph_def = tf.compat.v1.graph_util.remove_training_nodes(
+        graph_def, protected_nodes=input_nodes + keep_nodes)
+    if prune:
+        graph_def = prune_weights(graph_def, prune)
+    if transform is not None:
+        graph_def = transform(graph_def)
+    transforms = graph_transforms(optimize, quantize)
+    if transforms:
+        graph_def = optimize_graph(graph_def, input_nodes, keep_nodes,
+                                   transforms)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, FROZEN_GRAPH_NAME), 'wb') as graph_fh:
+        graph_fh.write(graph_def.SerializeToString())
+    if assets:
+        asset_dir = os.path.join(output_dir, 'assets')
+        os.makedirs(asset_dir, exist_ok=True)
+        for filename in assets.values():
+            shutil.copy(os.path.join(saved_model_dir, 'assets', filename),
+                        asset_dir)
+    with open(os.path.join(output_dir, SIGNATURE_NAME), 'w') as signature_fh:
+        json.dump({
+            'inputs': inputs,
+            'outputs': outputs,
+            'init_op': init_op,
+            'assets': assets,
+            'xla': xla,
+            'prune': prune,
+            'quantize': quantize
+        }, signature_fh, indent=2)
+    LOGGER.info('frozen graph of %s written to %s, %d nodes',
+                saved_model_dir, output_dir, len(graph_def.node))
+    return output_dir
+
+
+def is_frozen_export(model_path):
+    return os.path.isfile(os.path.join(model_path, FROZEN_GRAPH_NAME))
+
+
+class FrozenGraphPredictor:
+    '''
+    serve a frozen graph export, with the api of the tf.contrib predictor:
+        - feed_tensors, fetch_tensors: the input and output tensors
+        - predictor(inputs): run the graph on a dict of input arrays
+    '''
+
+    def __init__(self, export_dir, xla=None, config=None):
+        with open(os.path.join(export_dir, SIGNATURE_NAME)) as signature_fh:
+            signature = json.load(signature_fh)
+        graph_def = tf.compat.v1.GraphDef()
+        with open(os.path.join(export_dir, FROZEN_GRAPH_NAME), 'rb') as \
+                graph_fh:
+            graph_def.ParseFromString(graph_fh.read())
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            tf.import_graph_def(graph_def, name='')
+        self.feed_tensors = {
+            name: self.graph.get_tensor_by_name(tensor_name)
+            for name, tensor_name in signature['inputs'].items()}
+        self.fetch_tensors = {
+            name: self.graph.get_tensor_by_name(tensor_name)
+            for name, tensor_name in signature['outputs'].items()}
+
+        if config is None:
+            config = tf.compat.v1.ConfigProto()
+        if signature['xla'] if xla is None else xla:
+            # on CPU, TF_XLA_FLAGS=--tf_xla_cpu_global_jit is also needed
+            config.graph_options.optimizer_options.global_jit_level = \
+                tf.compat.v1.OptimizerOptions.ON_1
+        self.session = tf.compat.v1.Session(graph=self.graph, config=config)
+        if signature['init_op'] is not None:
+            self.session.run(
+                self.graph.get_operation_by_name(
+                    _node_name(signature['init_op'])),
+                feed_dict={
+                    self.graph.get_tensor_by_name(tensor_name):
+                        os.path.join(export_dir, 'assets', filename)
+                    for tensor_name, filename in signature['assets'].items()
+                })
+
+    def __call__(self, input_dict):
+        return self.session.run(
+            self.fetch_tensors,
+            feed_dict={self.feed_tensors[name]: value
+                       for name, value in input_dict.items()})
+
+
+def session_config(intra_op_threads=None, inter_op_threads=None):
+    '''session config with the thread pool sizes, None for the default'''
+    return tf.compat.v1.ConfigProto(
+        intra_op_parallelism_threads=intra_op_threads or 0,
+        inter_op_parallelism_threads=inter_op_threads or 0)
+
+
+def load_predictor(model_path, config=None):
+    '''
+    predictor of a saved model, or of a frozen graph export
+
+    params:
+        - model_path: export folder
+        - config: the session ConfigProto, e.g. from session_config
+    '''
+    if is_frozen_export(model_path):
+        return FrozenGraphPredictor(model_path, config=config)
+    return tf.contrib.predictor.from_saved_model(model_path, config=config)
+
+
+def latest_export_dir(config, export_name=None):
+    '''
+    the latest export of the model, of the frozen graphs if the config
+    "inference_graph" is "frozen", otherwise of the best exporter
+    '''
+    if export_name is None:
+        export_name = FROZEN_EXPORT_NAME \
+            if config.get('inference_graph') == 'frozen' else 'best_exporter'
+    return FileHelper.last_modified_folder(
+        os.path.join(config['model_path'], 'export', export_name))
@@ -4,11 +4,21 @@ import numpy as np
 import functools
 from tensorflow.python.keras.preprocessing import sequence
 
-from ..data_loader import WordVector, TFDataReader, tokenize
+from ..data_loader import WordVector, TFDataReader, TokenIdEncoder
+from ..data_loader import tokenize
 from .base_classifier import BaseClassifier
+from ..config import get_inference_config
 from .. import LOGGER
 from .utils import TrainHelper, FileHelper
-from .tf_best_export import BestCheckpointsExporter
+from .tf_best_export import best_exporter
+from .tf_embedding import embedding_layer, embedding_storage, embedding_file
+from .tf_embedding import write_embedding_file
+from .tf_frozen_export import load_predictor, latest_export_dir
+from .tf_frozen_export import session_config
+from .tf_distribute import distribute_strategy, shard_training_data
+from .tf_predictor import EstimatorPredictor
+from ..distributed import get_tf_config, is_chief
+from .tf_serving_utils import non_padding_length, fit_to_length
 
 
 class TFMultiFeatClassifier(BaseClassifier):
@@ -17,12 +27,17 @@ class TFMultiFeatClassifier(BaseClassifier):
         self.max_sequence_length = config['max_sequence_length']
         self.embedding = None
         self.data_reader = TFDataReader(self.config)
+        # train_distribute strategy of the estimator, see build_graph
+        self.distribute = None
+        # the predictor of predict_on_text, on the checkpoints
+        self._predictor = None
+        tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.INFO)
 
     def build_and_train(self):
         self.load_embedding()
         self.build_graph()
         self.train()
-        if 'test' in self.config['datasets']:
+        if 'test' in self.config['datasets'] and is_chief(get_tf_config()):
             self.evaluate_on_tests()
 
     def evaluate_on_tests(self):
@@ -42,27 +57,20 @@ class TFMultiFeatClassifier(BaseClassifier):
         ]
         return predicted_classes
 
-    def _prepare_single_input(self, text):
-        data_id = [
-                self.embedding.get_index(token)
-                for token in tokenize(text)
-                ]
-        data_length = min(len(data_id), self.max_sequence_length)
-        data = sequence.pad_sequences([data_id],
-                                      maxlen=self.max_sequence_length,
-                                      truncating='post',
-                                      padding='post',
-                                      value=WordVector.PAD_ID)
-        dataset = tf.data.Dataset.from_tensor_slices((data,
-                                                      [data_length],
-                                                      [0]))
-        dataset = dataset.map(self._data_parser)
-        iterator = dataset.make_one_shot_iterator()
-        return iterator.get_next()
-
     def load_embedding(self):
         if self.embedding is None:
             self.embedding = WordVector(self.config['embedding']['file'])
+            self._save_vocab_file()
+            if embedding_storage(self.config) == 'file':
+                write_embedding_file(self.embedding.vectors,
+                                     embedding_file(self.config))
+
+    def _save_vocab_file(self):
+        if self.embedding is not None:
+            vocab_filename = os.path.join(self.config['model_path'], 'vocab.p')
+            LOGGER.info('write vocab file to %s' % vocab_filename)
+            FileHelper.write_pickle(self.embedding.vocab_to_index,
+                                    vocab_filename)
 
     def _inputs_to_features(self, inputs):
         ''' convert the text input to
@@ -120,33 +128,32 @@ class TFMultiFeatClassifier(BaseClassifier):
                                                       labels,
                                                       *data))
         if shuffle_and_repeat:
+            dataset = shard_training_data(dataset)
             dataset = dataset.shuffle(buffer_size=len(data))
             dataset = dataset.repeat(self.config['num_epochs'])
 
         dataset = dataset.batch(self.config['batch_size'])
         dataset = dataset.map(self._data_parser)
+        if shuffle_and_repeat and self.distribute is not None:
+            # distributed by the strategy
+            return dataset
 
         iterator = dataset.make_one_shot_iterator()
         return iterator.get_next()
 
     def build_graph(self):
-        def embedding_initializer(shape=None,
-                                  dtype=tf.float32,
-                                  partition_info=None):
-            assert dtype is tf.float32
-            return self.embedding.vectors
-
-        # params = {'embedding_initializer':
-        #           tf.random_uniform_initializer(-1.0, 1.0)}
-        params = {'embedding_initializer': embedding_initializer}
+        params = {}
 
         self.model_dir = self.config['model_path']
+        self.distribute = distribute_strategy(self.config)
 
+        # the cluster and the task are read from TF_CONFIG
         run_config = tf.estimator.RunConfig(
             save_checkpoints_steps=self.config['check_per_steps'],
             save_summary_steps=self.config['check_per_steps'],
             model_dir=self.model_dir,
-            keep_checkpoint_max=5)
+            keep_checkpoint_max=5,
+            train_distribute=self.distribute)
 
         self.classifier = tf.estimator.Estimator(
                 model_fn=self.model_fn,
@@ -158,16 +165,11 @@ class TFMultiFeatClassifier(BaseClassifier):
         training = mode == tf.estimator.ModeKeys.TRAIN
 
         to_merge = []
-        # graph_selector = GraphSelector(self.config, self.embedding)
+        # the features share the frozen embedding
+        embed = embedding_layer(self.config, self.embedding)
         for i in range(2):
             feature = features["input_" + str(i)]
-            input_layer = tf.contrib.layers.embed_sequence(
-                feature,
-                self.embedding.vocab_size,
-                self.embedding.vector_size,
-                initializer=params['embedding_initializer'],
-                trainable=False
-            )
+            input_layer = embed(feature)
 
             dropout_emb = tf.layers.dropout(inputs=input_layer,
                                             rate=self.config['dropout_rate'],
@@ -248,29 +250,35 @@ class TFMultiFeatClassifier(BaseClassifier):
     def serving_input_receiver_fn(max_sequence_length):
         '''
         input shape:
-           input_0: [batch_size, max_sequence_length[0] ]
-           input_1: [batch_size, max_sequence_length[1] ]
+           input_0: [batch_size, any length], padded with PAD_ID
+           input_1: [batch_size, any length], padded with PAD_ID
            ......
-           len: [batch_size, number_of_input ]
+           len: [batch_size, number_of_input ], optional, default to the
+                number of non padding ids of each input
         '''
         features = {}
         receiver_tensors = {}
 
-        seq_length = tf.placeholder(
-                dtype=tf.int32,
+        inputs = [
+            tf.compat.v1.placeholder(
+                    dtype=tf.int32,
+                    shape=[None, None],
+                    name='input_' + str(index)
+            )
+            for index in range(len(max_sequence_length))
+        ]
+        seq_length = tf.compat.v1.placeholder_with_default(
+                tf.stack([non_padding_length(input) for input in inputs],
+                         axis=1),
                 shape=[None, len(max_sequence_length)],
                 name='seq_length'
         )
-        features['len'] = seq_length
+        features['len'] = tf.minimum(seq_length, max_sequence_length)
+        receiver_tensors['len'] = seq_length
         for index, length in enumerate(max_sequence_length):
             input_name = 'input_' + str(index)
-            input = tf.placeholder(
-                    dtype=tf.int32,
-                    shape=[None, length],
-                    name=input_name
-            )
-            features[input_name] = input
-            receiver_tensors[input_name] = input
+            features[input_name] = fit_to_length(inputs[index], length)
+            receiver_tensors[input_name] = inputs[index]
         return tf.estimator.export.ServingInputReceiver(features,
                                                         receiver_tensors)
 
@@ -292,67 +300,145 @@ class TFMultiFeatClassifier(BaseClassifier):
                 hooks=[hook]
         )
 
-        best_exporter = BestCheckpointsExporter(
-                name="best_exporter",
-                serving_input_receiver_fn=functools.partial(
-                                              self.serving_input_receiver_fn,
-                                              self.max_sequence_length
-                                          ),
-                exports_to_keep=2
+        exporter = best_exporter(
+                self.config,
+                functools.partial(self.serving_input_receiver_fn,
+                                  self.max_sequence_length)
         )
 
         eval_spec = tf.estimator.EvalSpec(
                 input_fn=functools.partial(self.input_fn,
                                            self.config['datasets']['eval']),
-                exporters=best_exporter,
+                exporters=exporter,
                 throttle_secs=1
         )
 
         # train and evaluate
         tf.estimator.train_and_evaluate(self.classifier, train_spec, eval_spec)
+        # the best model, if its export was delayed
+        exporter.export_pending(self.classifier)
 
     def predict_on_text(self, text):
-        return self.classifier.predict(
-            input_fn=functools.partial(self._prepare_single_input, text))
+        '''
+        predict an input (a text per feature column) with the latest
+        checkpoint, the graph and the session are kept between the calls
+
+        output:
+            - iterator of the prediction of the input, as estimator.predict
+        '''
+        nr_columns = len(self.max_sequence_length)
+        if self._predictor is None:
+            output_types = {'len': tf.int32}
+            output_shapes = {'len': tf.TensorShape([None, nr_columns])}
+            for index, max_length in enumerate(self.max_sequence_length):
+                output_types['input_' + str(index)] = tf.int32
+                output_shapes['input_' + str(index)] = tf.TensorShape(
+                    [None, max_length])
+            self._predictor = EstimatorPredictor(
+                self.classifier, output_types, output_shapes)
+        data, data_length = self._inputs_to_features([text])
+        features = {'len': np.array(data_length, dtype=np.int32)}
+        for index in range(nr_columns):
+            features['input_' + str(index)] = np.array(data[index],
+                                                       dtype=np.int32)
+        predictions = self._predictor.predict(features)
+        return iter([{name: value[0] for name, value in predictions.items()}])
 
     def load_saved_model(self, model_path=None):
         if model_path is None:
-            model_path = FileHelper.last_modified_folder(
-                    os.path.join(
-                            self.config['model_path'],
-                            'export',
-                            'best_exporter'
-                            )
-                    )
+            model_path = latest_export_dir(self.config)
         LOGGER.info("loading model from %s", model_path)
-        self.model = tf.contrib.predictor.from_saved_model(model_path)
+        self.model = load_predictor(
+            model_path, session_config(**get_inference_config(self.config)))
+        self.loaded_model_path = model_path
         self._load_vocab()
 
     def _load_vocab(self):
-        vocab, _ = WordVector.read_embeddings(self.config['embedding']['file'])
-        self.vocab_to_ids = WordVector.create_vocab_index_dict(vocab)
+        # the vocab written at training, to avoid reading the full embedding
+        vocab_filename = os.path.join(self.config['model_path'], 'vocab.p')
+        if os.path.isfile(vocab_filename):
+            self.vocab_to_ids = TokenIdEncoder.from_vocab_file(
+                vocab_filename).vocab_to_ids
+        else:
+            vocab, _ = WordVector.read_embeddings(
+                self.config['embedding']['file'])
+            self.vocab_to_ids = WordVector.create_vocab_index_dict(vocab)
+
+    def text_encoder(self):
+        return TokenIdEncoder(self.vocab_to_ids)
 
     def process_with_saved_model(self, input):
         data = self._input_text_to_pad_id(input)
-        result = self.model(data)
+        result = self._run_saved_model(data)
         probabilities = result['probabilities'][0]
         return probabilities.tolist()
 
+    def process_batch(self, inputs, batch_size=None):
+        '''
+        predict a list of inputs (one text per feature column) with the saved
+        model, batch by batch
+
+        output:
+            - probabilities of each input, in the class order of label mapper
+        '''
+        return self.process_encoded_batch(self.text_encoder()(inputs),
+                                          batch_size)
+
+    def process_encoded_batch(self, features, batch_size=None):
+        '''predict the token ids of a list of inputs, see text_encoder'''
+        probabilities = []
+        for batch in self._batches(features,
+                                   self._predict_batch_size(batch_size)):
+            result = self._run_saved_model(self._pad_features(batch))
+            probabilities.extend(result['probabilities'].tolist())
+        return probabilities
+
+    def _run_saved_model(self, data):
+        # models exported with a fixed length signature don't take 'len'
+        return self.model({
+            name: value for name, value in data.items()
+            if name in self.model.feed_tensors
+        })
+
+    def _serving_width(self, input_name):
+        '''input width of the saved model, None if it is variable'''
+        model = getattr(self, 'model', None)
+        if model is None:
+            return None
+        return tf.compat.dimension_value(
+            model.feed_tensors[input_name].shape[1])
+
     def _input_text_to_pad_id(self, texts):
-        features = [[
-                self.vocab_to_ids[token]
-                if token in self.vocab_to_ids else WordVector.UNK_ID
-                for token in tokenize(text)]
-                for text in texts]
-        data = [sequence.pad_sequences(
-            [feature_column],
-            maxlen=self.max_sequence_length[column_index],
-            truncating='post',
-            padding='post',
-            value=WordVector.PAD_ID)
-            for column_index, feature_column in enumerate(features)
+        return self._inputs_to_pad_id([texts])
+
+    def _inputs_to_pad_id(self, inputs):
+        return self._pad_features(self.text_encoder()(inputs))
+
+    def _pad_features(self, features):
+        '''
+        pad the ids of each input column to the longest one in the batch, or
+        to the input width of a saved model with fixed length signature
+        '''
+        data_length = [
+            [
+                min(len(feature), self.max_sequence_length[column_index])
+                for column_index, feature in enumerate(feature_item)
+            ]
+            for feature_item in features
         ]
-        return {
-                    'input_' + str(index): data[index]
-                    for index in range(len(data))
-                }
+
+        data = {}
+        for column_index, feature_column in enumerate(zip(*features)):
+            input_name = 'input_' + str(column_index)
+            width = self._serving_width(input_name)
+            if width is None:
+                width = max(1, max(
+                    length[column_index] for length in data_length))
+            data[input_name] = sequence.pad_sequences(
+                list(feature_column),
+                maxlen=width,
+                truncating='post',
+                padding='post',
+                value=WordVector.PAD_ID)
+        data['len'] = np.array(data_length, dtype=np.int32)
+        return data
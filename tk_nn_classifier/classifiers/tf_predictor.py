@@ -0,0 +1,93 @@
+'''
+Persistent estimator predictor: a long lived estimator.predict, fed by a
+generator, for the repeated predictions of single inputs on the checkpoints
+
+    - estimator.predict builds the graph, creates the session and restores
+      the checkpoint at each call; the predictor keeps one predict
+      generator open, and its input_fn reads the inputs from a python
+      generator, so each prediction is one session run
+    - the predictor is bound to the latest checkpoint of the model_dir, and
+      reloads when a newer checkpoint is written, e.g. by a running training
+'''
+import time
+import threading
+import tensorflow as tf
+from .. import LOGGER
+
+
+class EstimatorPredictor:
+    '''
+    params:
+        - estimator: the tf.estimator.Estimator
+        - output_types, output_shapes: the dtypes and shapes of the feature
+          dict of a batch, the batch dimension first
+        - reload_check_secs: check for a newer checkpoint at most once every
+          reload_check_secs seconds
+    '''
+
+    def __init__(self, estimator, output_types, output_shapes,
+                 reload_check_secs=5):
+        self.estimator = estimator
+        self.output_types = output_types
+        self.output_shapes = output_shapes
+        self.reload_check_secs = reload_check_secs
+        self.checkpoint_path = None
+        self._predictions = None
+        self._pending = None
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    def _features(self):
+        '''the generator of the input_fn, the batch given to predict'''
+        while True:
+            features, self._pending = self._pending, None
+            yield features
+
+    def _input_fn(self):
+        dataset = tf.data.Dataset.from_generator(
+            self._features, self.output_types, self.output_shapes)
+        return tf.compat.v1.data.make_one_shot_iterator(dataset).get_next()
+
+    def _latest_checkpoint(self):
+        now = time.time()
+        if self._predictions is not None and \
+                now - self._last_check < self.reload_check_secs:
+            return self.checkpoint_path
+        self._last_check = now
+        return tf.train.latest_checkpoint(self.estimator.model_dir)
+
+    def _start(self, checkpoint_path):
+        self.close()
+        LOGGER.info('predict with the checkpoint %s', checkpoint_path)
+        self.checkpoint_path = checkpoint_path
+        self._predictions = self.estimator.predict(
+            input_fn=self._input_fn,
+            checkpoint_path=checkpoint_path,
+            yield_single_examples=False)
+
+    def predict(self, features):
+        '''
+        params:
+            - features: dict of the input arrays of a batch
+
+        output:
+            - dict of the prediction arrays of the batch
+        '''
+        with self._lock:
+            checkpoint_path = self._latest_checkpoint()
+            if self._predictions is None or \
+                    checkpoint_path != self.checkpoint_path:
+                self._start(checkpoint_path)
+            self._pending = features
+            try:
+                return next(self._predictions)
+            except BaseException:
+                # the predict generator is done, restarted on the next call
+                self._predictions = None
+                raise
+
+    def close(self):
+        '''close the session of the current checkpoint'''
+        if self._predictions is not None:
+            self._predictions.close()
+            self._predictions = None
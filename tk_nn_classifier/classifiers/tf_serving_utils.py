@@ -0,0 +1,64 @@
+'''graph helpers for the variable length serving signatures'''
+import os
+import tensorflow as tf
+
+from ..data_loader import WordVector
+
+# the vocab of the token string signature, the line number is the token id
+VOCAB_FILE_NAME = 'vocab.txt'
+
+
+def non_padding_length(input_ids):
+    '''number of non padding ids of each row, padding only at the end'''
+    return tf.reduce_sum(
+        tf.cast(tf.not_equal(input_ids, WordVector.PAD_ID), tf.int32),
+        axis=1)
+
+
+def fit_to_length(input_ids, max_length, fixed=False):
+    '''
+    truncate the input to max_length, and if fixed is set, also pad the
+    input to max_length, for graphs that need a static input length
+    '''
+    input_ids = input_ids[:, :max_length]
+    if fixed:
+        input_ids = tf.pad(
+            input_ids,
+            [[0, 0], [0, max_length - tf.shape(input_ids)[1]]],
+            constant_values=WordVector.PAD_ID)
+        input_ids.set_shape([None, max_length])
+    return input_ids
+
+
+def write_vocab_file(vocab_to_ids, vocab_file):
+    '''
+    write the tokens in the id order, one token per line, renamed in place
+    once written
+    '''
+    tokens = sorted(vocab_to_ids, key=vocab_to_ids.get)
+    for token_id, token in enumerate(tokens):
+        if vocab_to_ids[token] != token_id or '\n' in token:
+            raise ValueError('token %r with id %d can not be written to '
+                             'line %d' % (token, vocab_to_ids[token],
+                                          token_id))
+    tmp_file = '%s.%d.tmp' % (vocab_file, os.getpid())
+    with open(tmp_file, 'w', encoding='utf-8') as vocab_fh:
+        for token in tokens:
+            vocab_fh.write(token + '\n')
+    os.replace(tmp_file, vocab_file)
+
+
+def tokens_to_ids(input_tokens, vocab_file):
+    '''
+    look up the token strings in the vocab file, with a table of the graph:
+    the padding '' is PAD_ID, and the unknown tokens are UNK_ID
+
+    the vocab file is added to the assets of the saved model
+    '''
+    table = tf.contrib.lookup.index_table_from_file(
+        vocabulary_file=vocab_file,
+        default_value=WordVector.UNK_ID)
+    input_ids = tf.cast(table.lookup(input_tokens), tf.int32)
+    return tf.where(tf.equal(input_tokens, ''),
+                    tf.fill(tf.shape(input_ids), WordVector.PAD_ID),
+                    input_ids)
@@ -0,0 +1,118 @@
+'''
+In-session evaluation: evaluate the model inside the training session, on a
+fixed cache of eval batches, instead of restarting an evaluation (new graph,
+checkpoint restore, full eval set) for each check
+
+    - the eval batches are fed in place of the training input, with the
+      training mode (dropout) off
+    - the best model is saved to a checkpoint, and exported, only when the
+      accuracy improves
+    - the training stops when the accuracy did not improve for
+      max_steps_without_increase steps
+'''
+import os
+import shutil
+import numpy as np
+import tensorflow as tf
+from .. import LOGGER
+
+
+class InSessionEvalHook(tf.estimator.SessionRunHook):
+    '''
+    params:
+        - features: the feature tensors of the training input
+        - classes: the predicted classes tensor
+        - training: the boolean tensor of the training mode, fed with False
+        - eval_batches: list of (features, labels), with the arrays of the
+          features by name
+        - every_steps: evaluate every every_steps steps
+        - checkpoint_prefix: checkpoint path of the best model
+        - max_steps_without_increase, min_steps: stop the training when the
+          accuracy did not increase for max_steps_without_increase steps,
+          after at least min_steps steps
+        - on_improve: called with the checkpoint path, the accuracy and the
+          step of each better model
+    '''
+
+    def __init__(self, features, classes, training, eval_batches, every_steps,
+                 checkpoint_prefix, max_steps_without_increase,
+                 min_steps=0, on_improve=None):
+        self.features = features
+        self.classes = classes
+        self.training = training
+        self.eval_batches = eval_batches
+        self.every_steps = every_steps
+        self.checkpoint_prefix = checkpoint_prefix
+        self.max_steps_without_increase = max_steps_without_increase
+        self.min_steps = min_steps
+        self.on_improve = on_improve
+        self.best_accuracy = None
+        self.best_step = None
+        self.last_eval_step = None
+        # number of steps of this training, the checks don't depend on the
+        # global step read concurrently with the train op
+        self.step = 0
+        self.global_step = None
+        self.saver = None
+
+    def begin(self):
+        self.global_step = tf.compat.v1.train.get_global_step()
+        self.saver = tf.compat.v1.train.Saver(max_to_keep=1)
+
+    def after_run(self, run_context, run_values):
+        self.step += 1
+        if self.step % self.every_steps != 0:
+            return
+        self._check(run_context.session)
+        if self._should_stop():
+            LOGGER.info('no accuracy increase since step %d, stop at step %d',
+                        self.best_step, self.step)
+            run_context.request_stop()
+
+    def end(self, session):
+        if self.last_eval_step != self.step:
+            self._check(session)
+
+    def evaluate(self, session):
+        '''accuracy on the eval batches'''
+        correct = 0
+        total = 0
+        for features, labels in self.eval_batches:
+            feed_dict = {self.features[name]: value
+                         for name, value in features.items()}
+            feed_dict[self.training] = False
+            classes = session.run(self.classes, feed_dict=feed_dict)
+            correct += int(np.sum(classes == labels))
+            total += len(labels)
+        return correct / max(1, total)
+
+    def _check(self, session):
+        step = self.step
+        self.last_eval_step = step
+        accuracy = self.evaluate(session)
+        if self.best_accuracy is not None and accuracy <= self.best_accuracy:
+            LOGGER.info('step %d: accuracy %.4f, best %.4f at step %d', step,
+                        accuracy, self.best_accuracy, self.best_step)
+            return
+        LOGGER.info('step %d: accuracy %.4f, better than %s', step, accuracy,
+                    self.best_accuracy)
+        self.best_accuracy = accuracy
+        self.best_step = step
+        checkpoint_path = self.saver.save(
+            session, self.checkpoint_prefix,
+            global_step=self.global_step)
+        if self.on_improve is not None:
+            self.on_improve(checkpoint_path, accuracy, step)
+
+    def _should_stop(self):
+        return self.best_step is not None and \
+            self.step >= self.min_steps and \
+            self.step - self.best_step >= self.max_steps_without_increase
+
+
+def keep_latest_exports(export_dir_base, exports_to_keep=2):
+    '''remove the older exports, the export folders are timestamps'''
+    exports = sorted(name for name in os.listdir(export_dir_base)
+                     if name.isdigit())
+    for name in exports[:-exports_to_keep]:
+        shutil.rmtree(os.path.join(export_dir_base, name))
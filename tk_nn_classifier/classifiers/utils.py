@@ -1,4 +1,7 @@
 import os
+import gzip
+import time
+import pickle
 import platform
 from .. import LOGGER
 
@@ -35,6 +38,81 @@ class FileHelper:
                          key=lambda x: int(creation_date(x)))
         return model_path
 
+    @staticmethod
+    def write_pickle(obj, output_file):
+        '''
+        pickle obj to output_file, renamed in place once written: the
+        processes of a distributed training never read a partial file
+        '''
+        tmp_file = '%s.%d.tmp' % (output_file, os.getpid())
+        with open(tmp_file, 'wb') as handle:
+            pickle.dump(obj, handle)
+        os.replace(tmp_file, output_file)
+
+
+class BenchmarkHelper:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def percentile(values, percent):
+        '''nearest rank percentile'''
+        values = sorted(values)
+        rank = max(0, min(len(values) - 1,
+                          int(round(percent / 100 * len(values))) - 1))
+        return values[rank]
+
+    @staticmethod
+    def measure_latency(predict, batches, warmup=2):
+        '''
+        run predict on each batch, after warmup runs on the first batch
+
+        output:
+            - p50, p99 and mean latency per batch (ms), and docs per second
+        '''
+        for _ in range(warmup):
+            predict(batches[0])
+        latencies = []
+        for batch in batches:
+            start = time.perf_counter()
+            predict(batch)
+            latencies.append(time.perf_counter() - start)
+        num_docs = sum(len(batch) for batch in batches)
+        total_latency = sum(latencies)
+        return {
+            'p50': BenchmarkHelper.percentile(latencies, 50) * 1000,
+            'p99': BenchmarkHelper.percentile(latencies, 99) * 1000,
+            'mean': total_latency / len(latencies) * 1000,
+            'docs_per_sec': num_docs / total_latency
+        }
+
+    @staticmethod
+    def written_bytes():
+        '''bytes written to disk by this process, None if not available'''
+        try:
+            with open('/proc/self/io') as io_fh:
+                for line in io_fh:
+                    name, value = line.split(':')
+                    if name == 'write_bytes':
+                        return int(value)
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def folder_size(path, compress=False):
+        '''bytes of the files in the folder, gzip compressed if compress'''
+        size = 0
+        for root, _, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(root, name)
+                if compress:
+                    with open(file_path, 'rb') as file_fh:
+                        size += len(gzip.compress(file_fh.read()))
+                else:
+                    size += os.path.getsize(file_path)
+        return size
+
 
 class TrainHelper:
     def __init__(self):
@@ -0,0 +1,152 @@
+'''
+Windowed inference: predict the token sequence of a document window by
+window, and stop as soon as the document is confidently classified
+
+    - the windows are successive, the first one has window_size tokens, each
+      next one growth times the previous one, e.g. 128, 256, 512, 128 for a
+      1024 token document
+    - all the documents of a batch are predicted window by window together,
+      the documents leave the batch once confident or out of tokens
+    - the probabilities of a document aggregate its predicted windows: the
+      mean weighted on the number of tokens, or the most confident window
+'''
+from .. import LOGGER
+
+AGGREGATIONS = ('mean', 'max')
+
+
+def window_bounds(length, window_size, growth=1, max_length=None):
+    '''
+    (start, end) of the windows of a sequence, at least one window
+
+    e.g. window_bounds(1000, 128, 2) = [(0, 128), (128, 384), (384, 896),
+    (896, 1000)]
+    '''
+    if window_size < 1:
+        raise ValueError('window_size should be positive, not %s' %
+                         window_size)
+    if growth < 1:
+        raise ValueError('growth should be at least 1, not %s' % growth)
+    if max_length is not None:
+        length = min(length, max_length)
+    bounds = []
+    start = 0
+    size = window_size
+    while start < length or not bounds:
+        bounds.append((start, min(start + size, length)))
+        start += size
+        size = max(1, int(size * growth))
+    return bounds
+
+
+class WindowedInference:
+    '''
+    params:
+        - window_size: number of tokens of the first window
+        - growth: size of each window relative to the previous one
+        - threshold: a document stops once its aggregated probability of a
+          class reaches the threshold
+        - aggregation: "mean" or "max", see the module doc
+        - max_length: the documents are truncated to max_length tokens
+    '''
+
+    def __init__(self, window_size=128, growth=2, threshold=0.9,
+                 aggregation='mean', max_length=None):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError('aggregation should be one of %s, not %s' %
+                             (', '.join(AGGREGATIONS), aggregation))
+        self.window_size = window_size
+        self.growth = growth
+        self.threshold = threshold
+        self.aggregation = aggregation
+        self.max_length = max_length
+        self.documents = 0
+        self.early_exits = 0
+        self.windows = 0
+        self.tokens = 0
+        self.total_tokens = 0
+
+    def windows_of(self, sequence):
+        return window_bounds(len(sequence), self.window_size, self.growth,
+                             self.max_length)
+
+    def confident(self, probabilities):
+        return max(probabilities) >= self.threshold
+
+    def process(self, sequences, predict):
+        '''
+        params:
+            - sequences: list of token sequences (ids or strings)
+            - predict: predicts a list of sequences, the probabilities of
+              each one
+
+        output:
+            - list of aggregated probabilities per sequence
+        '''
+        all_windows = [self.windows_of(sequence) for sequence in sequences]
+        aggregated = [None] * len(sequences)
+        # the most confident window, for max
+        best = [None] * len(sequences)
+        predicted_tokens = [0] * len(sequences)
+        active = list(range(len(sequences)))
+        step = 0
+        while active:
+            windows = [all_windows[index][step] for index in active]
+            results = predict([sequences[index][start:end]
+                               for index, (start, end)
+                               in zip(active, windows)])
+            still_active = []
+            for index, (start, end), probabilities in zip(active, windows,
+                                                          results):
+                self._aggregate(index, end - start, list(probabilities),
+                                aggregated, best, predicted_tokens)
+                if self.confident(aggregated[index]):
+                    if step + 1 < len(all_windows[index]):
+                        self.early_exits += 1
+                elif step + 1 < len(all_windows[index]):
+                    still_active.append(index)
+            self.windows += len(active)
+            active = still_active
+            step += 1
+
+        self.documents += len(sequences)
+        self.tokens += sum(predicted_tokens)
+        self.total_tokens += sum(windows[-1][1] for windows in all_windows)
+        return aggregated
+
+    def _aggregate(self, index, num_tokens, probabilities, aggregated, best,
+                   predicted_tokens):
+        if self.aggregation == 'max':
+            if best[index] is None or \
+                    max(probabilities) > max(best[index]):
+                best[index] = probabilities
+            aggregated[index] = best[index]
+        elif aggregated[index] is None:
+            aggregated[index] = probabilities
+        else:
+            # mean weighted on the number of tokens, an empty document has
+            # a single empty window
+            total = predicted_tokens[index] + num_tokens
+            aggregated[index] = [
+                (previous * predicted_tokens[index] + current * num_tokens) /
+                max(1, total)
+                for previous, current in zip(aggregated[index], probabilities)]
+        predicted_tokens[index] += num_tokens
+
+    def stats(self):
+        return {
+            'documents': self.documents,
+            'early_exits': self.early_exits,
+            'early_exit_rate': self.early_exits / max(1, self.documents),
+            'windows_per_doc': self.windows / max(1, self.documents),
+            'tokens_per_doc': self.tokens / max(1, self.documents),
+            'full_tokens_per_doc': self.total_tokens / max(1, self.documents)
+        }
+
+    def report(self):
+        stats = self.stats()
+        LOGGER.info('windowed inference: %d documents, %.1f%% early exits, '
+                    '%.2f windows and %.1f tokens per document (%.1f without '
+                    'windows)', stats['documents'],
+                    stats['early_exit_rate'] * 100, stats['windows_per_doc'],
+                    stats['tokens_per_doc'], stats['full_tokens_per_doc'])
@@ -14,6 +14,7 @@ DEFAULTS = {
     "dropout_rate": 0.2,
     "num_epochs": 20,
     "max_lines": 50,
+    "predict_batch_size": 128,
 
     "spacy": {
         "language": "en",
@@ -24,6 +25,144 @@ DEFAULTS = {
     "split_ratio": 0.8
 }
 
+SERVING_DEFAULTS = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    # micro batching: dispatch when max_batch_size requests are queued, or
+    # when the oldest one waited max_wait_ms
+    "max_batch_size": 64,
+    "max_wait_ms": 10,
+    # back-pressure: reject new requests when the queue is full
+    "max_queue_size": 1024,
+    # seconds before a request gets a timeout response
+    "request_timeout": 10.0,
+    # input of the exported tensorflow models: "ids" (the token ids), or
+    # "tokens" (the normalized token strings, looked up in the graph)
+    "input": "ids"
+}
+
+PREDICT_DEFAULTS = {
+    # number of encoding processes, default to the number of cores - 1
+    "workers": None,
+    # number of batches buffered between the pipeline stages
+    "queue_size": 8,
+    # output format: tsv or jsonl
+    "format": "tsv",
+    # number of records per committed chunk of the score command
+    "chunk_size": 10000
+}
+
+PREDICTION_CACHE_DEFAULTS = {
+    "enabled": True,
+    # number of predictions kept in memory
+    "max_size": 100000,
+    # sqlite file to keep the predictions between runs, e.g.
+    # "models/prediction_cache.sqlite"
+    "path": None
+}
+
+EVALUATION_DEFAULTS = {
+    # "estimator": train_and_evaluate, each check restores the last
+    # checkpoint in a new eval graph, and runs the best exporter
+    # "in_session": evaluate in the training session, see tf_session_eval
+    "mode": "estimator",
+    # in session: number of eval examples cached, sampled from the eval set,
+    # None for all
+    "max_examples": None,
+    # in session: batch size of the eval batches, default to batch_size
+    "batch_size": None
+}
+
+BEST_EXPORT_DEFAULTS = {
+    # export the best model only once, at the end of the training
+    "deferred": False,
+    # export a better model at most once every min_interval_secs seconds
+    "min_interval_secs": 0,
+    "exports_to_keep": 2
+}
+
+KERAS_DEFAULTS = {
+    # input of the keras models: "ids" (the padded token ids, embedded by a
+    # frozen Embedding layer), or "vectors" (the padded token vectors, as the
+    # models trained before)
+    "input": "ids"
+}
+
+INFERENCE_DEFAULTS = {
+    # session threads of the tensorflow predictors, None for the tensorflow
+    # default (the number of cores)
+    "intra_op_threads": None,
+    "inter_op_threads": None
+}
+
+CASCADE_DEFAULTS = {
+    # config file of the cheap first stage model, None for no cascade, the
+    # model of the config is the second stage; both models need the same
+    # label mapper
+    "first_stage": None,
+    # the documents with a first stage probability of class_id in the band
+    # [low, high] are predicted by the second stage
+    "band": [0.2, 0.8],
+    "class_id": 1
+}
+
+ADVERTISER_INDEX_DEFAULTS = {
+    # index file of the known advertisers, None for no index
+    "path": None,
+    # fields of the records (extra fields of the data sets) with the
+    # organization name and the url or domain, None if not available
+    "org_field": None,
+    "domain_field": None,
+    # build: minimal number of labelled records of an advertiser
+    "min_count": 5,
+    # prediction: minimal confidence of an advertiser to skip the model
+    "min_confidence": 0.95
+}
+
+WINDOWED_INFERENCE_DEFAULTS = {
+    # predict the documents of the tensorflow models window by window, and
+    # stop once confident, instead of on the max_sequence_length tokens
+    "enabled": False,
+    # tokens of the first window, each next window is growth times larger
+    "window_size": 128,
+    "growth": 2,
+    # stop once the aggregated probability of a class reaches the threshold
+    "threshold": 0.9,
+    # aggregation of the windows: "mean" (weighted on the number of tokens),
+    # or "max" (the most confident window)
+    "aggregation": "mean"
+}
+
+DISTILLATION_DEFAULTS = {
+    # config file of the trained teacher model, the model of the config is
+    # the student, a tensorflow model with the same label mapper
+    "teacher": None,
+    # unlabeled data sets labelled by the teacher, default to the train set
+    "corpus": [],
+    # maximal number of documents of the corpus, None for all
+    "max_docs": None,
+    # soft label file, default to model_path/teacher.soft.jsonl
+    "soft_labels": None,
+    # temperature of the teacher probabilities, > 1 for softer labels
+    "temperature": 1.0
+}
+
+DISTRIBUTED_DEFAULTS = {
+    # distributed training of the tensorflow models, with the cluster and
+    # the task of the process in the TF_CONFIG environment variable:
+    # "parameter_server", "collective" (all-reduce across the workers), or
+    # None to train in a single process
+    "strategy": None,
+    # local cluster (train-distributed): seconds given to the evaluator to
+    # evaluate the last checkpoint, once the workers are done
+    "evaluator_grace_secs": 120
+}
+
+DISTRIBUTED_STRATEGIES = ('parameter_server', 'collective')
+
+# recommended inference options, written by tune-inference in the model_path
+TUNED_CONFIG_NAME = 'serving_config.json'
+
 poc_spacy_lang_model = {
     'en': 'en_core_web_sm',
     'de': 'de_core_news_sm',
@@ -43,6 +182,201 @@ def get_default_config():
     return config
 
 
+def get_predict_batch_size(config, batch_size=None):
+    '''
+    get the number of texts per model call: batch_size if given, else the
+    "predict_batch_size" of the config
+    '''
+    if batch_size is None:
+        batch_size = config.get('predict_batch_size',
+                                DEFAULTS['predict_batch_size'])
+    return batch_size
+
+
+def get_serving_config(config):
+    '''
+    get the serving options: the "serving" block of the config on top of the
+    serving defaults
+    '''
+    serving_config = copy.deepcopy(SERVING_DEFAULTS)
+    serving_config.update(config.get('serving') or {})
+    return serving_config
+
+
+def get_predict_config(config):
+    '''
+    get the options of the predict pipeline: the "predict" block of the
+    config on top of the predict defaults
+    '''
+    predict_config = copy.deepcopy(PREDICT_DEFAULTS)
+    predict_config.update(config.get('predict') or {})
+    return predict_config
+
+
+def get_prediction_cache_config(config):
+    '''
+    get the prediction cache options: the "prediction_cache" block of the
+    config on top of the prediction cache defaults
+    '''
+    cache_config = copy.deepcopy(PREDICTION_CACHE_DEFAULTS)
+    cache_config.update(config.get('prediction_cache') or {})
+    return cache_config
+
+
+def get_evaluation_config(config):
+    '''
+    get the evaluation options of the training: the "evaluation" block of
+    the config on top of the evaluation defaults
+    '''
+    evaluation_config = copy.deepcopy(EVALUATION_DEFAULTS)
+    evaluation_config.update(config.get('evaluation') or {})
+    if evaluation_config['mode'] not in ('estimator', 'in_session'):
+        raise ConfigError('evaluation/mode',
+                          'use "estimator" or "in_session", not %s' %
+                          evaluation_config['mode'])
+    return evaluation_config
+
+
+def get_best_export_config(config):
+    '''
+    get the schedule of the best model exports: the "best_export" block of
+    the config on top of the best export defaults
+    '''
+    export_config = copy.deepcopy(BEST_EXPORT_DEFAULTS)
+    export_config.update(config.get('best_export') or {})
+    return export_config
+
+
+def get_keras_config(config):
+    '''
+    get the keras options: the "keras" block of the config on top of the
+    keras defaults
+    '''
+    keras_config = copy.deepcopy(KERAS_DEFAULTS)
+    keras_config.update(config.get('keras') or {})
+    if keras_config['input'] not in ('ids', 'vectors'):
+        raise ConfigError('keras/input',
+                          'use "ids" or "vectors", not %s' %
+                          keras_config['input'])
+    return keras_config
+
+
+def get_inference_config(config):
+    '''
+    get the inference options: the "inference" block of the config on top of
+    the inference defaults
+    '''
+    inference_config = copy.deepcopy(INFERENCE_DEFAULTS)
+    inference_config.update(config.get('inference') or {})
+    return inference_config
+
+
+def get_cascade_config(config):
+    '''
+    get the inference cascade options: the "cascade" block of the config on
+    top of the cascade defaults
+    '''
+    cascade_config = copy.deepcopy(CASCADE_DEFAULTS)
+    cascade_config.update(config.get('cascade') or {})
+    return cascade_config
+
+
+def get_advertiser_index_config(config):
+    '''
+    get the known advertiser index options: the "advertiser_index" block of
+    the config on top of the advertiser index defaults
+    '''
+    index_config = copy.deepcopy(ADVERTISER_INDEX_DEFAULTS)
+    index_config.update(config.get('advertiser_index') or {})
+    return index_config
+
+
+def get_windowed_inference_config(config):
+    '''
+    get the windowed inference options: the "windowed_inference" block of
+    the config on top of the windowed inference defaults
+    '''
+    windowed_config = copy.deepcopy(WINDOWED_INFERENCE_DEFAULTS)
+    windowed_config.update(config.get('windowed_inference') or {})
+    if windowed_config['aggregation'] not in ('mean', 'max'):
+        raise ConfigError('windowed_inference/aggregation',
+                          'use "mean" or "max", not %s' %
+                          windowed_config['aggregation'])
+    if windowed_config['window_size'] < 1:
+        raise ConfigError('windowed_inference/window_size',
+                          'should be positive, not %s' %
+                          windowed_config['window_size'])
+    if windowed_config['growth'] < 1:
+        raise ConfigError('windowed_inference/growth',
+                          'should be at least 1, the windows would shrink, '
+                          'not %s' % windowed_config['growth'])
+    if not 0 < windowed_config['threshold'] <= 1:
+        raise ConfigError('windowed_inference/threshold',
+                          'should be in ]0, 1], not %s' %
+                          windowed_config['threshold'])
+    return windowed_config
+
+
+def get_distillation_config(config):
+    '''
+    get the distillation options: the "distillation" block of the config on
+    top of the distillation defaults
+    '''
+    distillation_config = copy.deepcopy(DISTILLATION_DEFAULTS)
+    distillation_config.update(config.get('distillation') or {})
+    if distillation_config['temperature'] <= 0:
+        raise ConfigError('distillation/temperature',
+                          'should be positive, not %s' %
+                          distillation_config['temperature'])
+    if isinstance(distillation_config['corpus'], str):
+        distillation_config['corpus'] = [distillation_config['corpus']]
+    return distillation_config
+
+
+def get_distributed_config(config):
+    '''
+    get the distributed training options: the "distributed" block of the
+    config on top of the distributed defaults
+    '''
+    distributed_config = copy.deepcopy(DISTRIBUTED_DEFAULTS)
+    distributed_config.update(config.get('distributed') or {})
+    strategy = distributed_config['strategy']
+    if strategy is not None and strategy not in DISTRIBUTED_STRATEGIES:
+        raise ConfigError('distributed/strategy',
+                          'use one of %s, not %s' %
+                          (', '.join(DISTRIBUTED_STRATEGIES), strategy))
+    return distributed_config
+
+
+def apply_tuned_config(config):
+    '''
+    update the config with the options of the tuned config file of the
+    model, if any, unless "use_tuned_config" is false
+
+    the blocks (e.g. "predict") are merged, the tuned options win
+
+    output:
+        - the path of the applied tuned config, None if not applied
+    '''
+    tuned_config_path = os.path.join(config['model_path'], TUNED_CONFIG_NAME)
+    if not config.get('use_tuned_config', True) or \
+            not os.path.isfile(tuned_config_path):
+        return None
+    with open(tuned_config_path) as tuned_fh:
+        tuned_config = json.load(tuned_fh)
+    for field, value in tuned_config.items():
+        if field == 'measured':
+            # the measurements of the tuning, for information
+            continue
+        if isinstance(value, dict):
+            block = dict(config.get(field) or {})
+            block.update(value)
+            config[field] = block
+        else:
+            config[field] = value
+    return tuned_config_path
+
+
 def spacy_lang_model_consistency(config):
     '''
     check the consistency of the language and pretrained model:
@@ -3,6 +3,7 @@ from .spacy_data_reader import SpacyDataReader
 from .tf_data_reader import TFDataReader
 from .word_vector import WordVector
 from .tokenizer import tokenize
+from .token_encoder import TokenEncoder, TokenIdEncoder
 from .embedding_utils import download_tk_embedding
 
 __all__ = [
@@ -11,6 +12,8 @@ __all__ = [
     'SpacyDataReader',
     'TFDataReader',
     'tokenize',
+    'TokenEncoder',
+    'TokenIdEncoder',
     'download_tk_embedding']
 
 name = 'data_loader'
@@ -1,8 +1,8 @@
 import os
 
 from .label_class_mapper import LabelClassMapper
-from .trxml_loader import TRXMLLoader
 from .csv_loader import CSVLoader
+from .jsonl_loader import JSONLLoader
 
 
 class DataReader():
@@ -22,12 +22,16 @@ class DataReader():
 
     def _data_reader_by_input_type(self, data_path):
         if os.path.isdir(data_path):
+            # xml_miner is only imported for trxml input
+            from .trxml_loader import TRXMLLoader
             data_reader = TRXMLLoader(self.config)
         elif os.path.isfile(data_path):
             if data_path.endswith('.csv'):
                 data_reader = CSVLoader(self.config)
             elif data_path.endswith('.tsv'):
                 data_reader = CSVLoader(self.config)
+            elif data_path.endswith(('.jsonl', '.ndjson')):
+                data_reader = JSONLLoader(self.config)
             else:
                 raise ValueError(f'{data_path} is not supported type')
         else:
@@ -47,8 +51,12 @@ class DataReader():
         return list(data_reader.get_train_data(data_path))
 
     def get_data_set_with_detail(self, data_path):
+        return list(self.iter_data_set_with_detail(data_path))
+
+    def iter_data_set_with_detail(self, data_path):
+        '''stream the records with detail, one record at a time'''
         data_reader = self._data_reader_by_input_type(data_path)
-        return list(data_reader.get_details(data_path))
+        return data_reader.get_details(data_path)
 
     def get_split_data(self):
         data_path = self.config['datasets']['all_data']
@@ -0,0 +1,188 @@
+''' JSONL file reader: import data from json lines files'''
+import os
+import json
+import random
+import codecs
+from array import array
+from .. import LOGGER
+from .base_loader import BaseLoader
+
+
+class JSONLLoader(BaseLoader):
+    '''
+    read json lines files, one json object per line
+
+    fields are configured in "jsonl_fields", nested keys are joined with a
+    dot, and a numeric part indexes into a list, e.g. "source.urls.0"
+
+    the byte offset of each line can be kept in a line index, so that the
+    records can be split, sampled, or sharded without parsing the json
+    '''
+    INDEX_SUFFIX = '.idx'
+
+    def _train_fields(self):
+        return super()._get_train_fields('jsonl_fields')
+
+    def _detail_fields(self):
+        return super()._get_detail_fields('jsonl_fields')
+
+    def get_train_data(self, data_path, offsets=None):
+        return self._get_values_from_jsonl(self._train_fields(), data_path,
+                                           offsets)
+
+    def get_details(self, data_path, offsets=None):
+        return self._get_values_from_jsonl(self._detail_fields(), data_path,
+                                           offsets)
+
+    def _get_values_from_jsonl(self, fields, data_path, offsets=None):
+        for record in self._iter_records(data_path, offsets):
+            yield [
+                self._get_value(record, field) if isinstance(field, str) else
+                [
+                    self._prepare_input_text(
+                        self._get_value(record, sub_field), index == 0)
+                    for sub_field in field
+                ]
+                for index, field in enumerate(fields)
+            ]
+
+    @staticmethod
+    def _get_value(record, field):
+        '''lookup a (nested) key, return None if any part is missing'''
+        value = record
+        for key in field.split('.'):
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and key.isdigit() and \
+                    int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return None
+            if value is None:
+                return None
+        return value
+
+    @staticmethod
+    def _iter_lines(data_path, offsets=None):
+        with open(data_path, 'rb') as jsonl_fh:
+            if offsets is None:
+                for line in jsonl_fh:
+                    if line.strip():
+                        yield line
+            else:
+                for offset in offsets:
+                    jsonl_fh.seek(offset)
+                    yield jsonl_fh.readline()
+
+    @classmethod
+    def _iter_records(cls, data_path, offsets=None):
+        for line in cls._iter_lines(data_path, offsets):
+            # to skip some file with BOM <U+FEFF> in the beginning
+            yield json.loads(line.lstrip(codecs.BOM_UTF8).decode('utf-8'))
+
+    @staticmethod
+    def build_line_index(data_path):
+        '''scan the file once, and collect the byte offset of each record'''
+        offsets = array('Q')
+        position = 0
+        with open(data_path, 'rb') as jsonl_fh:
+            for line in jsonl_fh:
+                if line.strip():
+                    offsets.append(position)
+                position += len(line)
+        return offsets
+
+    @classmethod
+    def load_line_index(cls, data_path, cache=True):
+        '''
+        get the line index of the data file
+
+        params:
+            - data_path: the jsonl file
+            - cache: reuse or write the index file next to the data file
+
+        output:
+            - array of byte offsets, one per record
+        '''
+        index_path = data_path + cls.INDEX_SUFFIX
+        if cache and os.path.isfile(index_path) and \
+                os.path.getmtime(index_path) >= os.path.getmtime(data_path):
+            offsets = array('Q')
+            with open(index_path, 'rb') as index_fh:
+                offsets.frombytes(index_fh.read())
+            return offsets
+
+        offsets = cls.build_line_index(data_path)
+        if cache:
+            LOGGER.info('write line index of %s to %s', data_path, index_path)
+            with open(index_path, 'wb') as index_fh:
+                offsets.tofile(index_fh)
+        return offsets
+
+    def line_index(self, data_path):
+        '''line index, cached on disk if "line_index" is set in the config'''
+        cache = self.config['jsonl_fields'].get('line_index', False)
+        return self.load_line_index(data_path, cache=cache)
+
+    @staticmethod
+    def shard_offsets(offsets, num_shards, shard_id):
+        '''offsets of the records in the shard_id-th of num_shards shards'''
+        if not 0 <= shard_id < num_shards:
+            raise ValueError('shard %d out of %d shards' %
+                             (shard_id, num_shards))
+        return offsets[shard_id::num_shards]
+
+    @staticmethod
+    def sample_offsets(offsets, size, seed=None):
+        '''offsets of a random sample of records, in file order'''
+        size = min(size, len(offsets))
+        return sorted(random.Random(seed).sample(list(offsets), size))
+
+    def get_shard(self, data_path, num_shards, shard_id, detail=False):
+        offsets = self.shard_offsets(self.line_index(data_path),
+                                     num_shards, shard_id)
+        if detail:
+            return self.get_details(data_path, offsets)
+        return self.get_train_data(data_path, offsets)
+
+    def _split_docs_on_ratio(self, data_path, ratio, random_shuffle=False):
+        offsets = list(self.line_index(data_path))
+        if not offsets:
+            raise ValueError('no records in %s, please check config' %
+                             data_path)
+        if random_shuffle is True:
+            random.shuffle(offsets)
+        split_point = int(len(offsets) * ratio)
+        train_offsets = offsets[:split_point]
+        eval_offsets = offsets[split_point:]
+
+        LOGGER.info('split %d records into %d train and %d eval',
+                    len(offsets),
+                    len(train_offsets),
+                    len(eval_offsets)
+                    )
+        return train_offsets, eval_offsets
+
+    def split_data(self, data_path, ratio=0.8, des='models'):
+        '''split the data into train and evel, copy lines without parsing'''
+        train_offsets, eval_offsets = self._split_docs_on_ratio(
+            data_path, ratio, random_shuffle=True)
+
+        if des:
+            os.makedirs(des, exist_ok=True)
+            train_file = os.path.join(des, 'train.jsonl')
+            eval_file = os.path.join(des, 'eval.jsonl')
+            LOGGER.info('write the train data to train file %s' % train_file)
+            LOGGER.info('write the eval data to eval file %s' % eval_file)
+        else:
+            raise ValueError('train/eval destination needs to be specified')
+
+        for output_file, offsets in [(train_file, train_offsets),
+                                     (eval_file, eval_offsets)]:
+            with open(output_file, 'wb') as output_fh:
+                for line in self._iter_lines(data_path, offsets):
+                    if not line.endswith(b'\n'):
+                        line += b'\n'
+                    output_fh.write(line)
+
+        return train_file, eval_file
@@ -0,0 +1,51 @@
+'''
+Token encoders: map texts to the normalized tokens, or to their ids in a
+vocab
+'''
+import pickle
+from .tokenizer import tokenize
+from .word_vector import WordVector
+
+
+class TokenEncoder:
+    '''
+    encode texts to the normalized tokens, for the models looking up the
+    token ids in the graph
+    '''
+
+    def encode(self, text):
+        return tokenize(text)
+
+    def __call__(self, inputs):
+        '''
+        encode a list of inputs, each input is either a text, or a list of
+        texts (one text per feature column)
+        '''
+        return [
+            self.encode(item) if isinstance(item, str) else
+            [self.encode(text) for text in item]
+            for item in inputs
+        ]
+
+
+class TokenIdEncoder(TokenEncoder):
+    '''
+    encode texts to token ids, only holds the vocab, so it is cheap to send
+    to the encoding worker processes
+    '''
+
+    def __init__(self, vocab_to_ids):
+        self.vocab_to_ids = vocab_to_ids
+
+    @classmethod
+    def from_vocab_file(cls, vocab_file):
+        '''load the pickled vocab_to_index, as written at training'''
+        with open(vocab_file, 'rb') as handle:
+            return cls(pickle.load(handle))
+
+    def encode(self, text):
+        return [
+            self.vocab_to_ids[token]
+            if token in self.vocab_to_ids else WordVector.UNK_ID
+            for token in tokenize(text)
+        ]
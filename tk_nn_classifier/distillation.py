@@ -0,0 +1,171 @@
+'''
+Knowledge distillation: a trained teacher model labels an unlabeled corpus
+with its probabilities (the soft labels), and a smaller tensorflow student
+model (shorter sequences, fewer filters, tf_fast_bow...) is trained on them
+
+    - the soft label file is a json lines file, one {"text", "probabilities"}
+      per document, recognized on its suffix by the tensorflow classifiers
+    - the temperature softens (> 1) or sharpens (< 1) the teacher
+      probabilities, as the softmax of the logits divided by the temperature
+    - the report compares the speed of both models, and the accuracy of the
+      student against the teacher and the gold labels of the test sets
+'''
+import os
+import json
+import itertools
+from . import LOGGER
+from .classifiers.utils import BenchmarkHelper
+
+SOFT_LABEL_SUFFIX = '.soft.jsonl'
+
+
+def is_soft_label_file(data_path):
+    return isinstance(data_path, str) and data_path.endswith(SOFT_LABEL_SUFFIX)
+
+
+def soften(probabilities, temperature=1.0):
+    '''the probabilities at the temperature, renormalized'''
+    if temperature <= 0:
+        raise ValueError('temperature should be positive, not %s' %
+                         temperature)
+    if temperature == 1.0:
+        return list(probabilities)
+    scaled = [probability ** (1.0 / temperature)
+              for probability in probabilities]
+    total = sum(scaled)
+    if total == 0:
+        return [1.0 / len(scaled)] * len(scaled)
+    return [value / total for value in scaled]
+
+
+def write_soft_labels(teacher, texts, output_file, batch_size=None,
+                      chunk_size=1000, temperature=1.0):
+    '''
+    predict the texts with the teacher, chunk by chunk, and write the soft
+    label file, renamed in place once complete
+
+    params:
+        - teacher: the model with process_batch, e.g. Model
+        - texts: iterable of texts
+
+    output:
+        - number of documents written
+    '''
+    if not is_soft_label_file(output_file):
+        raise ValueError('the soft label file %s should end with %s' %
+                         (output_file, SOFT_LABEL_SUFFIX))
+    texts = iter(texts)
+    num_docs = 0
+    tmp_file = '%s.%d.tmp' % (output_file, os.getpid())
+    with open(tmp_file, 'w') as output_fh:
+        while True:
+            chunk = list(itertools.islice(texts, chunk_size))
+            if not chunk:
+                break
+            chunk = [text for text in chunk if text]
+            if not chunk:
+                continue
+            for text, probabilities in zip(
+                    chunk, teacher.process_batch(chunk, batch_size)):
+                output_fh.write(json.dumps({
+                    'text': text,
+                    'probabilities': soften(probabilities, temperature)
+                }) + '\n')
+            num_docs += len(chunk)
+            LOGGER.info('soft labels of %d documents', num_docs)
+    os.replace(tmp_file, output_file)
+    return num_docs
+
+
+def read_soft_labels(data_path):
+    '''
+    output:
+        - texts, and the soft labels of each text
+    '''
+    texts = []
+    soft_labels = []
+    with open(data_path) as input_fh:
+        for line in input_fh:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            texts.append(record['text'])
+            soft_labels.append(record['probabilities'])
+    return texts, soft_labels
+
+
+def predicted_class(probabilities):
+    return max(range(len(probabilities)), key=probabilities.__getitem__)
+
+
+def compare(teacher, student, test_sets, label_mapper, batch_size=None):
+    '''
+    params:
+        - teacher, student: the models with process_batch, e.g. Model
+        - test_sets: {name: records (text, label, ...)}
+        - label_mapper: the label mapper of both models
+
+    output:
+        - dict of the docs per second of both models on the first test set,
+          the speedup of the student, and for each test set, the accuracy of
+          both models and the agreement of the student with the teacher
+    '''
+    report = {'test_sets': {}}
+    for name, records in test_sets.items():
+        texts = [text for text, *_ in records]
+        gold = [label for _, label, *_ in records]
+        teacher_classes = [predicted_class(probabilities) for probabilities
+                           in teacher.process_batch(texts, batch_size)]
+        student_classes = [predicted_class(probabilities) for probabilities
+                           in student.process_batch(texts, batch_size)]
+        report['test_sets'][name] = {
+            'documents': len(texts),
+            'teacher_accuracy': _accuracy(teacher_classes, gold,
+                                          label_mapper),
+            'student_accuracy': _accuracy(student_classes, gold,
+                                          label_mapper),
+            'agreement': sum(
+                teacher_class == student_class
+                for teacher_class, student_class
+                in zip(teacher_classes, student_classes)) /
+            max(1, len(texts))
+        }
+
+    texts = [text for text, *_ in next(iter(test_sets.values()), [])]
+    if texts:
+        batch_size = batch_size or 128
+        batches = [texts[start:start + batch_size]
+                   for start in range(0, len(texts), batch_size)]
+        for role, model in [('teacher', teacher), ('student', student)]:
+            latency = BenchmarkHelper.measure_latency(
+                lambda batch: model.process_batch(batch, batch_size),
+                batches)
+            report[role + '_docs_per_sec'] = latency['docs_per_sec']
+            report[role + '_p50_ms'] = latency['p50']
+        report['speedup'] = report['student_docs_per_sec'] / \
+            report['teacher_docs_per_sec']
+    return report
+
+
+def _accuracy(classes, gold, label_mapper):
+    '''None without gold labels'''
+    if not any(label is not None for label in gold):
+        return None
+    return sum(label_mapper.label_name(predicted) == label
+               for predicted, label in zip(classes, gold)) / \
+        max(1, len(gold))
+
+
+def print_report(report):
+    if 'speedup' in report:
+        print('teacher {:.1f} docs/s, student {:.1f} docs/s, speedup '
+              '{:.2f}x'.format(report['teacher_docs_per_sec'],
+                               report['student_docs_per_sec'],
+                               report['speedup']))
+    print('\t'.join(['test_set', 'docs', 'acc_teacher', 'acc_student',
+                     'agreement']))
+    for name, result in report['test_sets'].items():
+        print('\t'.join([name, str(result['documents'])] + [
+            'n/a' if result[field] is None else '{:.4f}'.format(result[field])
+            for field in ['teacher_accuracy', 'student_accuracy',
+                          'agreement']]))
@@ -0,0 +1,205 @@
+'''
+Distributed training of the tensorflow models, driven by TF_CONFIG
+
+each process of the training reads the cluster, and its own task, from the
+TF_CONFIG environment variable, e.g.:
+    {"cluster": {"chief": ["host0:2222"],
+                 "worker": ["host1:2222", "host2:2222"],
+                 "ps": ["host3:2222"]},
+     "task": {"type": "worker", "index": 0}}
+
+    - chief and workers train, each on its own shard of the training data
+    - ps: parameter servers, only with the "parameter_server" strategy
+    - evaluator: evaluates the checkpoints and exports the best model, it is
+      not part of the cluster
+
+in production, set TF_CONFIG and run "tk-nn-classifier train" on each node;
+LocalCluster starts the same processes on one machine, for testing
+'''
+import os
+import sys
+import json
+import time
+import subprocess
+from . import LOGGER
+
+TF_CONFIG = 'TF_CONFIG'
+TRAINING_TASKS = ('chief', 'worker')
+
+
+def get_tf_config(environ=None):
+    '''the parsed TF_CONFIG of the process, {} if not set'''
+    environ = os.environ if environ is None else environ
+    tf_config = environ.get(TF_CONFIG)
+    return json.loads(tf_config) if tf_config else {}
+
+
+def cluster_spec(num_workers, num_ps=0, host='localhost', base_port=2222):
+    '''
+    cluster on one host: a chief, num_workers - 1 workers, and num_ps
+    parameter servers, on consecutive ports from base_port
+    '''
+    if num_workers < 1:
+        raise ValueError('at least one worker is needed, the chief')
+    ports = iter(range(base_port, base_port + num_workers + num_ps))
+    cluster = {
+        'chief': ['%s:%d' % (host, next(ports))],
+        'worker': ['%s:%d' % (host, next(ports))
+                   for _ in range(num_workers - 1)]
+    }
+    if num_ps:
+        cluster['ps'] = ['%s:%d' % (host, next(ports))
+                         for _ in range(num_ps)]
+    return {task_type: addresses for task_type, addresses in cluster.items()
+            if addresses}
+
+
+def task_tf_config(cluster, task_type, task_index=0):
+    return json.dumps({'cluster': cluster,
+                       'task': {'type': task_type, 'index': task_index}})
+
+
+def data_shard(tf_config):
+    '''
+    shard of the training data of the task: (num_shards, shard_index), the
+    chief first, then the workers
+
+    output:
+        - (1, 0) without cluster, None if the task does not train
+    '''
+    if not tf_config:
+        return (1, 0)
+    task = tf_config['task']
+    if task['type'] not in TRAINING_TASKS:
+        return None
+    cluster = tf_config['cluster']
+    num_chiefs = len(cluster.get('chief', []))
+    num_shards = num_chiefs + len(cluster.get('worker', []))
+    if task['type'] == 'chief':
+        return (num_shards, task['index'])
+    return (num_shards, num_chiefs + task['index'])
+
+
+def is_chief(tf_config):
+    '''
+    the chief saves the checkpoints and runs the tasks after the training,
+    the first worker if the cluster has no chief
+    '''
+    if not tf_config:
+        return True
+    task = tf_config['task']
+    if task['type'] == 'chief':
+        return True
+    return task['type'] == 'worker' and task['index'] == 0 and \
+        not tf_config['cluster'].get('chief')
+
+
+class LocalCluster:
+    '''
+    run the processes of a distributed training on the local machine, each
+    one with its TF_CONFIG
+
+    params:
+        - command: the command of each process, e.g. the train command
+        - num_workers: number of training processes, the chief included
+        - num_ps: number of parameter servers
+        - evaluator: also run an evaluator, for the evaluation, the early
+          stopping and the best model exports
+        - base_port: first port of the cluster
+        - evaluator_grace_secs: seconds for the evaluator to evaluate the last
+          checkpoint once the training is done, before it is stopped
+    '''
+
+    def __init__(self, command, num_workers, num_ps=0, evaluator=True,
+                 base_port=2222, evaluator_grace_secs=120):
+        self.command = command
+        self.cluster = cluster_spec(num_workers, num_ps,
+                                    base_port=base_port)
+        self.evaluator = evaluator
+        self.evaluator_grace_secs = evaluator_grace_secs
+        self.processes = {}
+
+    def tasks(self):
+        '''(task_type, task_index) of each process'''
+        tasks = [(task_type, index)
+                 for task_type in ('ps', 'chief', 'worker')
+                 for index in range(len(self.cluster.get(task_type, [])))]
+        if self.evaluator:
+            tasks.append(('evaluator', 0))
+        return tasks
+
+    def task_environ(self, task_type, task_index):
+        environ = dict(os.environ)
+        environ[TF_CONFIG] = task_tf_config(self.cluster, task_type,
+                                            task_index)
+        return environ
+
+    def start(self):
+        for task_type, index in self.tasks():
+            LOGGER.info('start %s %d', task_type, index)
+            self.processes[(task_type, index)] = subprocess.Popen(
+                self.command, env=self.task_environ(task_type, index))
+
+    def wait(self, poll_secs=1):
+        '''
+        wait for the training processes, then stop the evaluator and the
+        parameter servers, which do not stop by themselves; the cluster is
+        stopped as soon as a training process or a parameter server fails,
+        the other processes would wait for it forever
+
+        output:
+            - the return codes of the training processes, and of the failed
+              parameter servers
+        '''
+        return_codes = {}
+        training = {task: process for task, process in self.processes.items()
+                    if task[0] in TRAINING_TASKS}
+        while training:
+            for task, process in list(training.items()):
+                if process.poll() is not None:
+                    return_codes[task] = training.pop(task).returncode
+                    LOGGER.info('%s %d exited with %d', *task,
+                                return_codes[task])
+            for task, process in self.processes.items():
+                if task[0] == 'ps' and process.poll():
+                    return_codes[task] = process.returncode
+            failed = [task for task, return_code in return_codes.items()
+                      if return_code != 0]
+            if failed:
+                LOGGER.error('%s %d failed with %d, stop the cluster',
+                             *failed[0], return_codes[failed[0]])
+                self.stop()
+                return return_codes
+            if training:
+                time.sleep(poll_secs)
+        evaluator = self.processes.get(('evaluator', 0))
+        if evaluator is not None:
+            deadline = time.time() + self.evaluator_grace_secs
+            while evaluator.poll() is None and time.time() < deadline:
+                time.sleep(poll_secs)
+        self.stop()
+        return return_codes
+
+    def stop(self):
+        for task, process in self.processes.items():
+            if process.poll() is None:
+                LOGGER.info('stop %s %d', *task)
+                process.terminate()
+                process.wait()
+
+    def run(self):
+        '''output: True if all the training processes succeeded'''
+        self.start()
+        try:
+            return_codes = self.wait()
+        finally:
+            self.stop()
+        return all(code == 0 for code in return_codes.values())
+
+
+def train_command(config_file, strategy=None):
+    '''the train command of each process of the local cluster'''
+    command = [sys.executable, '-m', 'tk_nn_classifier', 'train', config_file]
+    if strategy is not None:
+        command += ['--strategy', strategy]
+    return command
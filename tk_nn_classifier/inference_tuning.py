@@ -0,0 +1,138 @@
+'''
+Inference tuning: sweep the inference options of a saved model on a sample
+of documents, and recommend the options with the best throughput
+
+    - the session threads (intra_op, inter_op) and the batch size, measured
+      with the latency of each batch
+    - the number of encoding workers of the predict pipeline, measured with
+      the throughput of the pipeline
+
+the recommendation is written as the tuned config of the model, which is read
+back by the predict, score and serve commands (see apply_tuned_config)
+'''
+import copy
+import json
+import time
+from . import LOGGER
+from .model import Model
+from .predict_pipeline import PredictionPipeline
+from .classifiers.utils import BenchmarkHelper
+
+
+def _load_model(config, intra_op_threads=None, inter_op_threads=None):
+    config = copy.deepcopy(config)
+    config['action'] = 'predict'
+    config['inference'] = {'intra_op_threads': intra_op_threads,
+                           'inter_op_threads': inter_op_threads}
+    # the options are the ones swept, and every batch is predicted
+    config['use_tuned_config'] = False
+    config['prediction_cache'] = {'enabled': False}
+    model = Model(config)
+    model.load()
+    return model
+
+
+class InferenceTuner:
+    '''
+    params:
+        - config: config of the model
+        - texts: sample of documents
+        - threads: list of (intra_op_threads, inter_op_threads)
+        - batch_sizes: list of batch sizes
+        - workers: list of numbers of encoding processes
+        - max_p99_ms: only recommend the options with a p99 batch latency
+          below, None for no limit
+    '''
+
+    def __init__(self, config, texts, threads, batch_sizes, workers,
+                 max_p99_ms=None):
+        if not texts:
+            raise ValueError('no documents to tune on')
+        self.config = config
+        self.texts = texts
+        self.threads = threads
+        self.batch_sizes = batch_sizes
+        self.workers = workers
+        self.max_p99_ms = max_p99_ms
+        self.results = []
+
+    def _batches(self, batch_size):
+        return [self.texts[start:start + batch_size]
+                for start in range(0, len(self.texts), batch_size)]
+
+    def sweep_sessions(self):
+        '''latency and throughput of each threads and batch size'''
+        for intra_op, inter_op in self.threads:
+            model = _load_model(self.config, intra_op, inter_op)
+            for batch_size in self.batch_sizes:
+                result = BenchmarkHelper.measure_latency(
+                    lambda batch: model.process_batch(batch, batch_size),
+                    self._batches(batch_size))
+                result.update({'intra_op_threads': intra_op,
+                               'inter_op_threads': inter_op,
+                               'batch_size': batch_size})
+                LOGGER.info('threads %s/%s, batch size %d: p50 %.1fms, '
+                            'p99 %.1fms, %.1f docs/s', intra_op, inter_op,
+                            batch_size, result['p50'], result['p99'],
+                            result['docs_per_sec'])
+                self.results.append(result)
+        return self.results
+
+    def best_session(self):
+        '''the fastest threads and batch size within the latency limit'''
+        candidates = [result for result in self.results
+                      if self.max_p99_ms is None or
+                      result['p99'] <= self.max_p99_ms]
+        if not candidates:
+            LOGGER.warning('no options with a p99 latency below %.1fms, use '
+                           'the lowest latency', self.max_p99_ms)
+            return min(self.results, key=lambda result: result['p99'])
+        return max(candidates, key=lambda result: result['docs_per_sec'])
+
+    def sweep_workers(self, session):
+        '''pipeline throughput of each number of workers, on a session'''
+        model = _load_model(self.config, session['intra_op_threads'],
+                            session['inter_op_threads'])
+        throughputs = {}
+        for workers in self.workers:
+            pipeline = PredictionPipeline(model,
+                                          batch_size=session['batch_size'],
+                                          workers=workers)
+            start = time.perf_counter()
+            count = pipeline.run(((text,) for text in self.texts),
+                                 lambda record, probabilities: None)
+            throughputs[workers] = count / (time.perf_counter() - start)
+            LOGGER.info('%d workers: %.1f docs/s', workers,
+                        throughputs[workers])
+        return throughputs
+
+    def tune(self):
+        '''
+        output:
+            - the recommended config: the "inference" threads, the batch size
+              of predict and serve, and the predict workers
+        '''
+        self.sweep_sessions()
+        session = self.best_session()
+        throughputs = self.sweep_workers(session)
+        workers = max(throughputs, key=throughputs.get)
+        return {
+            'inference': {
+                'intra_op_threads': session['intra_op_threads'],
+                'inter_op_threads': session['inter_op_threads']
+            },
+            'predict_batch_size': session['batch_size'],
+            'predict': {'workers': workers},
+            'serving': {'max_batch_size': session['batch_size']},
+            'measured': {
+                'p50_ms': session['p50'],
+                'p99_ms': session['p99'],
+                'docs_per_sec': throughputs[workers]
+            }
+        }
+
+
+def write_tuned_config(tuned_config, output_file):
+    with open(output_file, 'w') as output_fh:
+        json.dump(tuned_config, output_fh, indent=2)
+    LOGGER.info('tuned config written to %s', output_file)
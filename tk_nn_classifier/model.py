@@ -3,40 +3,34 @@ Model class:
     hub to integrate methods from both spaCy and Tensorflow frame
 '''
 import os
-import tensorflow as tf
 from shutil import copy
 from . import LOGGER
 from .config import load_config, spacy_lang_model_consistency
-from .classifiers import TFClassifier, SpacyClassifier, TFMultiFeatClassifier, KerasClassifier
+from .config import get_prediction_cache_config, apply_tuned_config
+from .config import get_cascade_config, get_advertiser_index_config
+from .config import get_windowed_inference_config, get_predict_batch_size
+from .prediction_cache import PredictionCache, model_identity
+from .cascade import Cascade
+from .advertiser_index import AdvertiserIndex, AdvertiserLookup
+from .classifiers import get_classifier_class
 
 
 class Model:
     def __init__(self, config):
 
         self.config = config
+        self.cache = None
+        self.cascade = None
+        self.advertiser_index = None
+        self.advertiser_lookups = []
 
-        if self.config['model_type'] .startswith('tf_multi_feat'):
-            LOGGER.info('use tensorflow with multi feature %s' % self.config['model_type'] )
-            self.classifier = TFMultiFeatClassifier(self.config)
-            tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.INFO)
-
-        elif self.config['model_type'] .startswith('tf'):
-            LOGGER.info('use tensorflow %s' % self.config['model_type'] )
-            self.classifier = TFClassifier(self.config)
-            tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.INFO)
-
-        elif self.config['model_type'] .startswith('keras'):
-            LOGGER.info('use tensorflow %s' % self.config['model_type'] )
-            self.classifier = KerasClassifier(self.config)
-            tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.INFO)
-
-        elif self.config['model_type'] .startswith('spacy'):
-            LOGGER.info('use spacy %s' % self.config['model_type'] )
+        model_type = self.config['model_type']
+        if model_type.startswith('spacy'):
             spacy_lang_model_consistency(self.config)
-            self.classifier = SpacyClassifier(self.config)
-
-        else:
-            raise ValueError("unknown classifier type [{}]".format(self.config['model_type'] ))
+        # only the framework of the model type is imported
+        classifier_class = get_classifier_class(model_type)
+        LOGGER.info('use %s for %s', classifier_class.__name__, model_type)
+        self.classifier = classifier_class(self.config)
 
     def build_graph(self):
         self.classifier.build_graph()
@@ -59,10 +53,171 @@ class Model:
         self.classifier.evaluate(test_data_path)
 
     def load(self, model_path=None):
+        tuned_config_path = apply_tuned_config(self.config)
+        if tuned_config_path is not None:
+            LOGGER.info('use the tuned inference options of %s',
+                        tuned_config_path)
         self.classifier.load_saved_model(model_path)
+        self.cascade = self._load_cascade()
+        self.advertiser_index = self._load_advertiser_index()
+        self.cache = self._load_prediction_cache()
+
+    def _load_advertiser_index(self):
+        index_path = get_advertiser_index_config(self.config)['path']
+        if index_path is None:
+            return None
+        if not os.path.isfile(index_path):
+            LOGGER.warning('no advertiser index %s, build it with '
+                           'build-index', index_path)
+            return None
+        index = AdvertiserIndex(index_path)
+        LOGGER.info('advertiser index %s: %d keys', index_path, len(index))
+        return index
+
+    def advertiser_lookup(self, detail_fields, label_mapper):
+        '''
+        the lookup of the known advertisers of the records with the
+        detail_fields, None without index
+
+        output:
+            - callable on a list of records, the probabilities of each
+              record, None if the model is needed
+        '''
+        if self.advertiser_index is None:
+            return None
+        index_config = get_advertiser_index_config(self.config)
+        lookup = AdvertiserLookup(
+            self.advertiser_index,
+            detail_fields,
+            index_config['org_field'],
+            index_config['domain_field'],
+            label_mapper,
+            len(label_mapper.classid_to_label),
+            index_config['min_confidence'])
+        self.advertiser_lookups.append(lookup)
+        return lookup
+
+    def has_stages(self):
+        '''whether the predictions record the stage which decided'''
+        return self.cascade is not None or self.advertiser_index is not None
+
+    def _load_cascade(self):
+        cascade_config = get_cascade_config(self.config)
+        if cascade_config['first_stage'] is None:
+            return None
+        LOGGER.info('cascade: first stage %s, band %s',
+                    cascade_config['first_stage'], cascade_config['band'])
+        first_stage_config = load_config(cascade_config['first_stage'])
+        first_stage_config['action'] = 'predict'
+        # the predictions of the cascade are cached
+        first_stage_config['prediction_cache'] = {'enabled': False}
+        first_stage = Model(first_stage_config)
+        first_stage.load()
+        return Cascade(first_stage,
+                       band=cascade_config['band'],
+                       class_id=cascade_config['class_id'])
+
+    def _load_prediction_cache(self):
+        cache_config = get_prediction_cache_config(self.config)
+        if not cache_config['enabled'] or \
+                self.classifier.loaded_model_path is None:
+            return None
+        options = {option: self.config.get(option)
+                   for option in ['model_type', 'max_sequence_length']}
+        if self.cascade is not None:
+            options['cascade'] = {
+                'first_stage':
+                    self.cascade.first_stage.classifier.loaded_model_path,
+                'band': self.cascade.band,
+                'class_id': self.cascade.class_id}
+        windowed_config = get_windowed_inference_config(self.config)
+        if windowed_config['enabled']:
+            options['windowed_inference'] = windowed_config
+        model_id = model_identity(self.classifier.loaded_model_path, options)
+        return PredictionCache(model_id,
+                               max_size=cache_config['max_size'],
+                               path=cache_config['path'])
 
     def process_with_saved_model(self, input):
-        return self.classifier.process_with_saved_model(input)
+        if self.cache is None:
+            return self.classifier.process_with_saved_model(input)
+        return self.cache.process(
+            [input],
+            lambda inputs: [
+                self.classifier.process_with_saved_model(inputs[0])])[0]
+
+    def predict_batch_size(self, batch_size=None):
+        '''the number of texts per model call, default to the config'''
+        return get_predict_batch_size(self.config, batch_size)
+
+    def process_batch(self, texts, batch_size=None):
+        '''
+        predict a list of texts with the saved model
+
+        params:
+            - texts: list of input texts
+            - batch_size: number of texts per model call, default to the
+              config "predict_batch_size"
+
+        output:
+            - list of probabilities per text, in the class order of the
+              label mapper, with the stage which decided in a cascade
+        '''
+        if self.cache is None:
+            return self._process_batch(texts, batch_size)
+        return self.cache.process(
+            texts,
+            lambda inputs: self._process_batch(inputs, batch_size))
+
+    def _process_batch(self, texts, batch_size=None):
+        if self.cascade is None:
+            return self.classifier.process_batch(texts, batch_size)
+        return self.cascade.process(
+            texts,
+            lambda inputs: self.classifier.process_batch(inputs, batch_size),
+            batch_size)
+
+    def text_encoder(self):
+        '''
+        picklable callable to encode a list of texts for
+        process_encoded_batch, None if the classifier takes the raw texts
+        '''
+        if self.cascade is not None:
+            return self.cascade.text_encoder()
+        return self.classifier.text_encoder()
+
+    def process_encoded_batch(self, encoded, batch_size=None):
+        '''like process_batch, on the output of text_encoder'''
+        if self.cascade is not None:
+            texts, first_stage_encoded = encoded
+            return self.cascade.process(
+                texts,
+                lambda inputs: self.classifier.process_batch(inputs,
+                                                             batch_size),
+                batch_size,
+                first_stage_encoded)
+        return self.classifier.process_encoded_batch(encoded, batch_size)
+
+    def cached_predictions(self, texts):
+        '''the cached probabilities of each text, None if not cached'''
+        if self.cache is None:
+            return [None] * len(texts)
+        return self.cache.get_many(texts)
+
+    def cache_predictions(self, texts, all_probabilities):
+        if self.cache is not None:
+            self.cache.put_many(texts, all_probabilities)
+
+    def report_stats(self):
+        if self.cache is not None:
+            self.cache.report()
+        if self.cascade is not None:
+            self.cascade.report()
+        windowed = getattr(self.classifier, 'windowed', None)
+        if windowed is not None:
+            windowed.report()
+        for lookup in self.advertiser_lookups:
+            lookup.report()
 
     def predict_on_text(self, text):
         return self.classifier.predict_on_text(text)
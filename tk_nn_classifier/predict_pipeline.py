@@ -0,0 +1,311 @@
+'''
+Prediction pipeline: stream the records through the stages
+
+    reader -> encoders -> model -> writer
+
+the stages are connected with bounded queues, so the memory stays constant for
+any input size, and the encoding (tokenization) runs in a pool of worker
+processes while the model predicts the previous batches
+'''
+import csv
+import json
+import queue
+import threading
+import multiprocessing
+from . import LOGGER
+from .cascade import decided_by
+
+# the encoder of a worker process, set once by the pool initializer
+_ENCODER = None
+
+
+def _init_encoder(encoder):
+    global _ENCODER
+    _ENCODER = encoder
+
+
+def _encode(texts):
+    return _ENCODER(texts)
+
+
+class _Stopped(Exception):
+    '''another stage failed'''
+
+
+class _Encoded:
+    '''encoded texts computed in the current thread, same api as AsyncResult'''
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class PredictionPipeline:
+    '''
+    predict a stream of records with a loaded model
+
+    params:
+        - model: object with process_batch, and optionally text_encoder and
+          process_encoded_batch, e.g. Model
+        - batch_size: number of records per model call
+        - workers: number of encoding processes, 0 to encode in a thread
+        - queue_size: number of batches buffered between two stages
+    '''
+    _END = object()
+
+    def __init__(self, model, batch_size=128, workers=1, queue_size=8):
+        self.model = model
+        self.batch_size = batch_size
+        self.workers = workers
+        self.queue_size = queue_size
+        self._stopped = threading.Event()
+        self._errors = []
+
+    def run(self, records, write, lookup=None):
+        '''
+        params:
+            - records: iterable of records, the first field is the model input
+            - write: called with (record, probabilities), in the input order
+            - lookup: called with a batch of records, before the encoding,
+              the known probabilities of each record (None if unknown), e.g.
+              the known advertisers, the model is skipped for the known ones
+
+        output:
+            - number of predicted records
+        '''
+        self._stopped.clear()
+        self._errors = []
+        encoder = getattr(self.model, 'text_encoder', lambda: None)()
+        pool = None
+        if encoder is not None and self.workers > 0:
+            # started before the stage threads, the workers are forked
+            pool = multiprocessing.Pool(self.workers,
+                                        initializer=_init_encoder,
+                                        initargs=(encoder,))
+        read_queue = queue.Queue(self.queue_size)
+        encoded_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+        threads = [
+            threading.Thread(target=self._stage,
+                             args=(self._read, records, read_queue)),
+            threading.Thread(target=self._stage,
+                             args=(self._encode, read_queue, encoded_queue,
+                                   encoder, pool, lookup)),
+            threading.Thread(target=self._stage,
+                             args=(self._write, write_queue, write))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            # the model runs in the calling thread
+            count = self._stage(self._predict, encoded_queue, write_queue)
+        finally:
+            for thread in threads:
+                thread.join()
+            if pool is not None:
+                if self._errors:
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+        if self._errors:
+            raise self._errors[0]
+        return count
+
+    def _stage(self, func, *args):
+        try:
+            return func(*args)
+        except _Stopped:
+            pass
+        except Exception as error:
+            LOGGER.exception('prediction pipeline failed')
+            self._errors.append(error)
+            self._stopped.set()
+
+    def _put(self, output_queue, item):
+        while not self._stopped.is_set():
+            try:
+                output_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise _Stopped()
+
+    def _get(self, input_queue):
+        # after a failure, the items produced before are still processed,
+        # e.g. the predicted batches are written
+        while True:
+            try:
+                return input_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise _Stopped()
+
+    def _read(self, records, read_queue):
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == self.batch_size:
+                self._put(read_queue, batch)
+                batch = []
+        if batch:
+            self._put(read_queue, batch)
+        self._put(read_queue, self._END)
+
+    def _encode(self, read_queue, encoded_queue, encoder, pool, lookup=None):
+        while True:
+            batch = self._get(read_queue)
+            if batch is self._END:
+                break
+            texts = [record[0] for record in batch]
+            # only the texts not known, nor in the prediction cache, are
+            # encoded
+            known = [None] * len(batch) if lookup is None else lookup(batch)
+            cached = iter(self._cached_predictions(
+                [text for text, probabilities in zip(texts, known)
+                 if probabilities is None]))
+            cached = [next(cached) if probabilities is None else probabilities
+                      for probabilities in known]
+            texts = [text for text, probabilities in zip(texts, cached)
+                     if probabilities is None]
+            if encoder is None or not texts:
+                encoded = _Encoded(texts)
+            elif pool is None:
+                encoded = _Encoded(encoder(texts))
+            else:
+                # the bounded queue limits the number of batches in flight
+                encoded = pool.apply_async(_encode, (texts,))
+            self._put(encoded_queue, (batch, cached, encoded))
+        self._put(encoded_queue, self._END)
+
+    def _cached_predictions(self, texts):
+        cached_predictions = getattr(self.model, 'cached_predictions', None)
+        if cached_predictions is None:
+            return [None] * len(texts)
+        return cached_predictions(texts)
+
+    def _predict(self, encoded_queue, write_queue):
+        count = 0
+        while True:
+            item = self._get(encoded_queue)
+            if item is self._END:
+                break
+            batch, cached, encoded = item
+            encoded = encoded.get()
+            predicted = iter(self._predict_encoded(batch, cached, encoded))
+            probabilities = [
+                next(predicted) if probabilities is None else probabilities
+                for probabilities in cached]
+            self._put(write_queue, (batch, probabilities))
+            count += len(batch)
+        self._put(write_queue, self._END)
+        return count
+
+    def _predict_encoded(self, batch, cached, encoded):
+        if not encoded:
+            return []
+        if hasattr(self.model, 'process_encoded_batch'):
+            probabilities = self.model.process_encoded_batch(
+                encoded, self.batch_size)
+        else:
+            probabilities = self.model.process_batch(
+                encoded, self.batch_size)
+        if hasattr(self.model, 'cache_predictions'):
+            self.model.cache_predictions(
+                [record[0] for record, cached_probabilities
+                 in zip(batch, cached) if cached_probabilities is None],
+                probabilities)
+        return probabilities
+
+    def _write(self, write_queue, write):
+        while True:
+            item = self._get(write_queue)
+            if item is self._END:
+                break
+            for record, probabilities in zip(*item):
+                write(record, probabilities)
+
+
+class PredictionWriter:
+    '''
+    write the predictions, one row per record:
+        doc_id, new (predicted label), old (label of the input), extra
+        fields, [stage], probabilities
+
+    with stages, the stage of the cascade which decided (first, second, or
+    cache for the cached predictions without a recorded stage)
+    '''
+    FORMATS = ('tsv', 'jsonl')
+
+    def __init__(self, output_fh, detail_fields, label_mapper=None,
+                 stages=False):
+        self.output_fh = output_fh
+        self.detail_fields = detail_fields
+        self.label_mapper = label_mapper
+        self.stages = stages
+
+    @classmethod
+    def create(cls, output_format, output_fh, detail_fields,
+               label_mapper=None, stages=False):
+        if output_format == 'tsv':
+            return TSVPredictionWriter(output_fh, detail_fields, label_mapper,
+                                       stages)
+        if output_format == 'jsonl':
+            return JSONLPredictionWriter(output_fh, detail_fields,
+                                         label_mapper, stages)
+        raise ValueError('unknown output format %s, use one of %s' %
+                         (output_format, ', '.join(cls.FORMATS)))
+
+    def predicted_label(self, probabilities):
+        predicted_class = max(range(len(probabilities)),
+                              key=probabilities.__getitem__)
+        if self.label_mapper is None:
+            return str(predicted_class)
+        return self.label_mapper.label_name(predicted_class)
+
+    def stage_fields(self, probabilities):
+        if not self.stages:
+            return []
+        return [decided_by(probabilities, 'cache')]
+
+    def write(self, record, probabilities):
+        raise NotImplementedError('write needs to be implemented')
+
+
+class TSVPredictionWriter(PredictionWriter):
+    def __init__(self, output_fh, detail_fields, label_mapper=None,
+                 stages=False):
+        super().__init__(output_fh, detail_fields, label_mapper, stages)
+        self.csv_writer = csv.writer(output_fh,
+                                     delimiter="\t",
+                                     quoting=csv.QUOTE_MINIMAL)
+        self.csv_writer.writerow(
+            [detail_fields[2], 'new', 'old'] + list(detail_fields[3:]) +
+            (['stage'] if stages else []) + ['probabilities'])
+
+    def write(self, record, probabilities):
+        _, category, doc_id, *extra = record
+        self.csv_writer.writerow([
+            entry if entry is not None else ''
+            for entry in [doc_id, self.predicted_label(probabilities),
+                          category, *extra,
+                          *self.stage_fields(probabilities),
+                          str(probabilities)]
+        ])
+
+
+class JSONLPredictionWriter(PredictionWriter):
+    def write(self, record, probabilities):
+        _, category, doc_id, *extra = record
+        prediction = {
+            'id': doc_id,
+            'new': self.predicted_label(probabilities),
+            'old': category
+        }
+        prediction.update(zip(self.detail_fields[3:], extra))
+        if self.stages:
+            prediction['stage'] = decided_by(probabilities, 'cache')
+        prediction['probabilities'] = probabilities
+        self.output_fh.write(json.dumps(prediction) + '\n')
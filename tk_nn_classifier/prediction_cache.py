@@ -0,0 +1,199 @@
+'''
+Prediction cache: the probabilities of texts already predicted by the same
+model, keyed by a hash of the model identity and the normalized text
+
+    - an in-memory LRU tier
+    - an optional on-disk (sqlite) tier, shared between runs
+    - the stage of the cascade which decided is kept with the probabilities
+'''
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from . import LOGGER
+from .cascade import StagedProbabilities, decided_by
+
+
+def normalize_text(text):
+    '''collapse the white spaces, a list of texts is joined by a separator'''
+    if isinstance(text, str):
+        return ' '.join(text.split())
+    return '\x1f'.join(normalize_text(part) for part in text)
+
+
+def model_identity(model_path, options=None):
+    '''
+    identity of a model bundle: the path, size and modification time of its
+    files, plus the options affecting the prediction (e.g. the max length)
+    '''
+    sha1 = hashlib.sha1()
+    sha1.update(json.dumps(options or {}, sort_keys=True).encode('utf-8'))
+    model_path = os.path.abspath(model_path)
+    if os.path.isfile(model_path):
+        files = [model_path]
+    else:
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(model_path)
+            for name in names)
+    for file_path in files:
+        stat = os.stat(file_path)
+        sha1.update('{}\t{}\t{}\n'.format(
+            file_path, stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+    return sha1.hexdigest()
+
+
+def _copy(probabilities):
+    '''a copy of the probabilities, with their stage'''
+    stage = decided_by(probabilities)
+    if stage is None:
+        return list(probabilities)
+    return StagedProbabilities(probabilities, stage)
+
+
+class PredictionCache:
+    '''
+    params:
+        - model_id: identity of the model, see model_identity
+        - max_size: number of predictions kept in memory
+        - path: sqlite file of the on-disk tier, None to keep only in memory
+    '''
+
+    def __init__(self, model_id, max_size=100000, path=None):
+        self.model_id = model_id
+        self.max_size = max_size
+        self.memory = OrderedDict()
+        # the batches can be predicted in another thread than the one loading
+        # the model, e.g. by the server
+        self.lock = threading.Lock()
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS predictions '
+                '(key TEXT PRIMARY KEY, probabilities TEXT, stage TEXT)')
+            columns = [column[1] for column in self.connection.execute(
+                'PRAGMA table_info(predictions)')]
+            # cache file written before the stages were recorded
+            if 'stage' not in columns:
+                self.connection.execute(
+                    'ALTER TABLE predictions ADD COLUMN stage TEXT')
+            self.connection.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        sha1 = hashlib.sha1(self.model_id.encode('utf-8'))
+        sha1.update(b'\0')
+        sha1.update(normalize_text(text).encode('utf-8'))
+        return sha1.hexdigest()
+
+    def get_many(self, texts):
+        '''the cached probabilities of each text, None if not cached'''
+        return self._lookup([self.key(text) for text in texts])
+
+    def _lookup(self, keys):
+        results = [None] * len(keys)
+        with self.lock:
+            on_disk = {}
+            for index, key in enumerate(keys):
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    results[index] = _copy(self.memory[key])
+                    self.hits += 1
+                else:
+                    on_disk.setdefault(key, []).append(index)
+            if on_disk and self.connection is not None:
+                for key, probabilities, stage in self._select(list(on_disk)):
+                    probabilities = json.loads(probabilities)
+                    if stage is not None:
+                        probabilities = StagedProbabilities(probabilities,
+                                                            stage)
+                    self._remember(key, probabilities)
+                    for index in on_disk.pop(key):
+                        results[index] = _copy(probabilities)
+                        self.disk_hits += 1
+            self.misses += sum(len(indices) for indices in on_disk.values())
+        return results
+
+    def _select(self, keys, size=500):
+        # sqlite limits the number of query parameters
+        for start in range(0, len(keys), size):
+            part = keys[start:start + size]
+            yield from self.connection.execute(
+                'SELECT key, probabilities, stage FROM predictions '
+                'WHERE key IN ({})'.format(','.join('?' * len(part))), part)
+
+    def put_many(self, texts, all_probabilities):
+        self._store([self.key(text) for text in texts], all_probabilities)
+
+    def _store(self, keys, all_probabilities):
+        items = [(key, _copy(probabilities))
+                 for key, probabilities in zip(keys, all_probabilities)]
+        with self.lock:
+            for key, probabilities in items:
+                self._remember(key, probabilities)
+            if self.connection is not None:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)',
+                    [(key, json.dumps(probabilities),
+                      decided_by(probabilities))
+                     for key, probabilities in items])
+                self.connection.commit()
+
+    def _remember(self, key, probabilities):
+        self.memory[key] = probabilities
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def process(self, texts, predict):
+        '''
+        the probabilities of the texts, only the texts not in the cache are
+        predicted, once per distinct text; the predictions of the missing
+        texts are returned as predicted, with their stage
+
+        params:
+            - texts: list of inputs
+            - predict: function to predict a list of inputs
+        '''
+        keys = [self.key(text) for text in texts]
+        results = self._lookup(keys)
+        missing = OrderedDict()
+        for index, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                missing.setdefault(key, []).append(index)
+        if missing:
+            predictions = predict([texts[indices[0]]
+                                   for indices in missing.values()])
+            self._store(list(missing), predictions)
+            for indices, probabilities in zip(missing.values(), predictions):
+                for index in indices:
+                    results[index] = probabilities
+        return results
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate
+        }
+
+    def report(self):
+        LOGGER.info('prediction cache: %d hits (%d from disk), %d misses, '
+                    'hit rate %.1f%%', self.hits + self.disk_hits,
+                    self.disk_hits, self.misses, self.hit_rate * 100)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
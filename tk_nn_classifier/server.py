@@ -0,0 +1,274 @@
+'''
+Prediction server:
+    an asyncio http front end, the requests are collected by a micro batching
+    queue, and predicted with the batched model path in a worker thread
+
+api:
+    - GET /health
+    - POST /predict {"text": "..."} or {"texts": ["...", ...]}
+
+the requests only have the texts: the known advertiser index is not looked
+up, all the texts are predicted by the model
+'''
+import json
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from . import LOGGER
+from .cascade import decided_by
+
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout'
+}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class MicroBatcher:
+    '''
+    collect the queued texts into batches of up to max_batch_size texts, or
+    the texts queued within max_wait_ms after the first one, and predict each
+    batch with process_batch in a worker thread
+    '''
+
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=10,
+                 max_queue_size=1024):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        # the model is not thread safe, one worker thread runs all batches
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.closing = False
+        self._task = None
+
+    async def start(self):
+        # the queue is bound to the running loop
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def predict(self, texts, timeout=None):
+        '''
+        queue the texts, and wait for their probabilities
+
+        raise:
+            - QueueFullError: the queue has no space for all texts, or the
+              batcher is shutting down
+            - asyncio.TimeoutError: no result within timeout seconds
+        '''
+        if self.closing or \
+                self.queue.qsize() + len(texts) > self.max_queue_size:
+            raise QueueFullError('prediction queue is full')
+        loop = asyncio.get_event_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future))
+            futures.append(future)
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), timeout)
+        finally:
+            # the cancelled requests are skipped by the batch loop
+            for future in futures:
+                future.cancel()
+
+    async def _next_batch(self):
+        '''
+        wait for the next batch, a batch of None means the batcher is stopped
+        '''
+        loop = asyncio.get_event_loop()
+        item = await self.queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                # put the stop signal back, handle it after this batch
+                self.queue.put_nowait(None)
+                break
+            batch.append(item)
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self._next_batch()
+            if batch is None:
+                break
+            batch = [(text, future) for text, future in batch
+                     if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(
+                    self.executor,
+                    self.process_batch,
+                    [text for text, _ in batch]
+                )
+            except Exception as error:
+                LOGGER.exception('failed to process a batch of %d',
+                                 len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    async def stop(self):
+        '''reject new texts, and finish all queued texts'''
+        self.closing = True
+        if self._task is not None:
+            await self.queue.put(None)
+            await self._task
+        self.executor.shutdown(wait=True)
+
+
+class PredictionServer:
+    '''
+    http server around the batched model path
+
+    params:
+        - model: object with process_batch(texts), e.g. Model
+        - serving_config: serving options, see config.get_serving_config
+        - labels: label names in the class order, to name the predicted class
+    '''
+
+    def __init__(self, model, serving_config, labels=None):
+        self.serving_config = serving_config
+        self.labels = labels
+        self.batcher = MicroBatcher(
+            model.process_batch,
+            max_batch_size=serving_config['max_batch_size'],
+            max_wait_ms=serving_config['max_wait_ms'],
+            max_queue_size=serving_config['max_queue_size']
+        )
+        self.server = None
+
+    @property
+    def port(self):
+        '''the bound port, also when the configured port is 0'''
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start(self):
+        await self.batcher.start()
+        self.server = await asyncio.start_server(
+            self._handle,
+            self.serving_config['host'],
+            self.serving_config['port']
+        )
+        LOGGER.info('serving on %s:%d',
+                    self.serving_config['host'], self.port)
+
+    async def stop(self):
+        '''graceful shutdown: stop accepting, and finish the queued requests'''
+        LOGGER.info('shutting down the server')
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    def serve_forever(self):
+        '''serve until SIGINT or SIGTERM'''
+        loop = asyncio.get_event_loop()
+        stopped = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stopped.set)
+        loop.run_until_complete(self.start())
+        loop.run_until_complete(stopped.wait())
+        loop.run_until_complete(self.stop())
+
+    def _prediction(self, probabilities):
+        prediction = {'probabilities': probabilities}
+        if self.labels is not None:
+            prediction['label'] = self.labels[
+                max(range(len(probabilities)), key=probabilities.__getitem__)]
+        stage = decided_by(probabilities)
+        if stage is not None:
+            prediction['stage'] = stage
+        return prediction
+
+    async def _dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'closing' if self.batcher.closing
+                         else 'ok'}
+        if path != '/predict':
+            return 404, {'error': 'unknown path %s' % path}
+        if method != 'POST':
+            return 405, {'error': 'use POST for predictions'}
+
+        try:
+            request = json.loads(body.decode('utf-8'))
+            if 'texts' in request:
+                texts = request['texts']
+            else:
+                texts = [request['text']]
+            if not texts or not all(isinstance(text, str) for text in texts):
+                raise ValueError('texts should be a non-empty list of strings')
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return 400, {'error': 'invalid request: %s' % error}
+
+        try:
+            results = await self.batcher.predict(
+                texts, self.serving_config['request_timeout'])
+        except QueueFullError as error:
+            return 503, {'error': str(error)}
+        except asyncio.TimeoutError:
+            return 504, {'error': 'request timeout'}
+        except Exception as error:
+            return 500, {'error': str(error)}
+
+        predictions = [self._prediction(result) for result in results]
+        if 'texts' in request:
+            return 200, {'predictions': predictions}
+        return 200, predictions[0]
+
+    async def _handle(self, reader, writer):
+        '''one request per connection'''
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(
+                int(headers.get('content-length', 0)))
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {'error': 'malformed http request'}
+        else:
+            status, payload = await self._dispatch(method, path, body)
+
+        content = json.dumps(payload).encode('utf-8')
+        writer.write(
+            ('HTTP/1.1 {} {}\r\n'
+             'Content-Type: application/json\r\n'
+             'Content-Length: {}\r\n'
+             'Connection: close\r\n\r\n').format(
+                status, HTTP_REASONS[status], len(content)
+            ).encode('latin-1') + content)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()